@@ -0,0 +1,169 @@
+import re
+from typing import List, NamedTuple, Optional
+
+# Все регулярные выражения компилируются один раз при импорте модуля,
+# а не при каждом вызове extract_address_from_text.
+
+# Маркеры с обязательным пробелом после сокращений (чтобы "пр" не захватывалось в "проблема")
+# \s? после сокращений означает опциональный пробел (для конца текста/предложения)
+# Расширенные окончания для разных падежей (у, е, ом, у и т.д.)
+MARKERS = r"(?i:улиц[а-я]{1,4}\s?|ул\.\s?|проспект[а-я]{0,3}\s?|пр-?т?\.\s?|набережн[а-я]{2,4}\s?|наб\.\s?|переул[а-я]{2,3}\s?|пер\.\s?|площад[ьи]\s?|пл\.\s?|шоссе\s?|ш\.\s?|алле[яие]\s?|проезд[а-я]{0,3}\s?|дворец\s+спорта\s?|дворц[а-я]{1,2}\s+спорта\s?|стадион[а-я]{0,3}\s?|парк[а-я]{0,2}\s?|сквер[а-я]{0,2}\s?|театр[а-я]{0,2}\s?|музе[йяю]\s?|тц\s?|трц\s?)"
+# Название улицы: 1-3 слова (первое с большой буквы, остальные могут быть с маленькой - для "Обуховской обороны")
+NAME = r"((?:[А-ЯЁ][а-яё]+(?:-[а-яё]+)?|[0-9]{1,3}-?[а-яё]{0,2})(?:\s+[а-яА-Яё]+(?:-[а-яё]+)?){0,2})"
+HOUSE = r"(\d+[а-яА-ЯёЁ]?(?:[/\-]\d+)?)"
+
+# Захват "дома №33 по " или "д. 5 на " или "у дома №441"
+PREFIX_HOUSE = r"(?:(?i:д\.|дом[а-я]{0,2}|д|у\s+дома)\s*(?:№)?\s*" + HOUSE + r"\s+(?:по\s+|на\s+)?)?"
+
+# Захват номера дома после: "ул. Ленина, д. 5", "ул. Ленина №33", "ул. Вологодская, 1/2"
+# Также захватываем просто цифру после названия улицы (например "Ленинградский проспект 441")
+# И конструкцию "у дома №441" в конце
+# \s* в начале потому что маркер уже включает пробел после себя
+SUFFIX_HOUSE = r"(?:\s*(?:[,]\s*(?:(?i:д\.|дом[а-я]{0,2}|д\.?|№))?\s*|(?i:д\.|дом[а-я]{0,2}|д\.?|№|у\s+дома)\s*)" + HOUSE + r")?"
+
+NEAR_HOUSE = r"(?i:у\s+дома)"
+
+
+class _Pattern(NamedTuple):
+    kind: str
+    regex: "re.Pattern"
+    name_group: int
+    house_groups: tuple
+    needs_digit: bool
+    needs_near_house: bool
+
+
+# Порядок шаблонов важен: он задаёт приоритет кандидатов с номером дома.
+_PATTERNS = [
+    # ул. Ленина
+    _Pattern("marker_name", re.compile(r"\b" + PREFIX_HOUSE + r"(?:" + MARKERS + r")\s+" + NAME + SUFFIX_HOUSE), 2, (1, 3), False, False),
+    # Троицкий проспект
+    _Pattern("name_marker", re.compile(r"\b" + PREFIX_HOUSE + NAME + r"\s+(?:" + MARKERS + r")\b" + SUFFIX_HOUSE), 2, (1, 3), False, False),
+    # Ленинградский проспект 441 (название + маркер + номер).
+    # Требует номер дома после маркера, чтобы избежать ложных срабатываний типа "Автобус пр..."
+    _Pattern("name_marker_house", re.compile(r"\b" + NAME + r"\s+(?:" + MARKERS + r")" + HOUSE), 1, (2,), True, False),
+    # на улице Ленина 5 (предлог + маркер + название + номер)
+    _Pattern("prep_marker_name_house", re.compile(r"(?i:на|у)\s+(?:" + MARKERS + r")" + NAME + r"\s+" + HOUSE), 1, (2,), True, False),
+    # улица Ленина, проспект Обуховской обороны (маркер + название БЕЗ номера).
+    # Здесь название должно быть минимум 2 слова или второе слово с большой буквы
+    _Pattern("marker_title", re.compile(r"\b(?:" + MARKERS + r")([А-ЯЁ][а-яё]+(?:\s+[А-ЯЁ][а-яё]+)?)(?:\s|$)"), 1, (), False, False),
+    # ул. Ленина 5, проспект Обуховской обороны 12 (маркер + название + номер)
+    _Pattern("marker_name_house", re.compile(r"\b(?:" + MARKERS + r")([А-ЯЁ][а-яё]+(?:\s+[а-яА-Яё]+)?)\s+" + HOUSE), 1, (2,), True, False),
+    # у дома 441 на Ленинградском проспекте
+    _Pattern("near_house_marker_name", re.compile(NEAR_HOUSE + r"\s*(?:№)?\s*" + HOUSE + r"\s+(?:на\s+)?" + r"(?:" + MARKERS + r")\s+" + NAME), 2, (1,), True, True),
+    # На Ленинградском проспекте у дома 441 (маркер + название + у дома)
+    _Pattern("marker_name_near_house", re.compile(r"(?:" + MARKERS + r")\s+" + NAME + r"\s+" + NEAR_HOUSE + r"\s*(?:№)?\s*" + HOUSE + r"?"), 1, (2,), False, True),
+    # на/На Ленинградском проспекте у дома 441 (предлог + название + маркер + у дома).
+    # \b в начале чтобы не захватывать "Авария на..."
+    _Pattern("prep_name_marker_near_house", re.compile(r"\b(?i:на\s+)" + NAME + r"\s+(?:" + MARKERS + r")\s+" + NEAR_HOUSE + r"\s*(?:№)?\s*" + HOUSE + r"?"), 1, (2,), False, True),
+]
+
+# Быстрые префильтры: каждый шаблон содержит маркер, поэтому без маркера в тексте
+# ни один шаблон не сработает. Аналогично для цифр и конструкции "у дома".
+_MARKERS_RE = re.compile(MARKERS)
+_DIGIT_RE = re.compile(r"\d")
+_NEAR_HOUSE_RE = re.compile(NEAR_HOUSE)
+
+# Фильтруем ложные срабатывания типа "ул. Ленина 2024" (год)
+_YEAR_RE = re.compile(r'^(19|20)\d{2}$')
+_TRAILING_YEAR_RE = re.compile(r'\s+(19|20)\d{2}$')
+# Маркер улицы (с пробелом после!) для кандидатов без номера дома
+_STREET_MARKER_RE = re.compile(r"(?i:улиц[а-я]{1,3}\s|ул\.\s|проспект[а-я]{0,2}\s|пр-?т?\.\s|набережн[а-я]{2,3}\s|наб\.\s|переул[а-я]{2}\s|пер\.\s|площад[ьи]\s|пл\.\s|шоссе\s|ш\.\s)")
+
+
+class AddressCandidate(NamedTuple):
+    text: str
+    house: Optional[str]
+    kind: str
+    start: int
+
+
+def _active_patterns(text: str) -> List[_Pattern]:
+    if not _MARKERS_RE.search(text):
+        return []
+    has_digit = _DIGIT_RE.search(text) is not None
+    has_near_house = _NEAR_HOUSE_RE.search(text) is not None
+    return [
+        p for p in _PATTERNS
+        if (has_digit or not p.needs_digit) and (has_near_house or not p.needs_near_house)
+    ]
+
+
+def _iter_candidates(text: str):
+    """Кандидаты в порядке шаблонов, внутри шаблона — в порядке появления в тексте."""
+    for pattern in _active_patterns(text):
+        for match in pattern.regex.finditer(text):
+            if "архангельск" in match.group(pattern.name_group).lower():
+                continue
+            house = None
+            for group in pattern.house_groups:
+                house = house or match.group(group)
+            yield AddressCandidate(match.group(0).strip(), house, pattern.kind, match.start())
+
+
+def _has_valid_house(candidate: AddressCandidate) -> bool:
+    return bool(candidate.house) and not _YEAR_RE.match(candidate.house)
+
+
+def _is_named_street(candidate: AddressCandidate) -> bool:
+    """Кандидат без номера дома, но с маркером улицы и нормальным названием."""
+    if candidate.house or not candidate.text:
+        return False
+    if not _STREET_MARKER_RE.search(candidate.text):
+        return False
+    # Проверяем, что название не слишком короткое (минимум 4 символа)
+    return any(len(word) > 3 and word[0].isupper() for word in candidate.text.split())
+
+
+def _strip_trailing_year(found_str: str) -> str:
+    # Если случайно захватился год в конце адреса, отрежем его для надежности
+    year_match = _TRAILING_YEAR_RE.search(found_str)
+    if year_match:
+        return found_str[:year_match.start()]
+    return found_str
+
+
+def find_candidates(text: str) -> List[AddressCandidate]:
+    """Возвращает все найденные упоминания адресов (без ранжирования)."""
+    return list(_iter_candidates(text))
+
+
+def rank_candidates(text: str) -> List[AddressCandidate]:
+    """
+    Ранжирует кандидатов по правилам приоритета:
+    1. адреса с логичным номером дома (не год);
+    2. адреса без номера, но с маркером улицы и названием;
+    3. остальные в порядке нахождения (с отрезанным годом в конце).
+    Первый элемент совпадает с результатом extract_address.
+    """
+    candidates = find_candidates(text)
+    with_house = [c for c in candidates if _has_valid_house(c)]
+    named = [c for c in candidates if _is_named_street(c)]
+    rest = [
+        c._replace(text=_strip_trailing_year(c.text))
+        for c in candidates
+        if not _has_valid_house(c) and not _is_named_street(c)
+    ]
+    return with_house + named + rest
+
+
+def extract_address(text: str) -> Optional[str]:
+    """
+    Ищет адрес в тексте. Возвращает приоритетно адрес с номером дома,
+    иначе адрес с маркером улицы, иначе первый найденный.
+    Шаблоны проверяются лениво: первый кандидат с номером дома сразу возвращается.
+    """
+    seen = []
+    for candidate in _iter_candidates(text):
+        if _has_valid_house(candidate):
+            return candidate.text
+        seen.append(candidate)
+
+    if not seen:
+        return None
+
+    for candidate in seen:
+        if _is_named_street(candidate):
+            return candidate.text
+
+    return _strip_trailing_year(seen[0].text)
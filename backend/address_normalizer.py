@@ -0,0 +1,222 @@
+import re
+import logging
+from typing import List, NamedTuple, Optional, Tuple
+
+from gazetteer import (Gazetteer, TOKEN_RE, FILLER_WORDS, DEFAULT_CITY, CITY_PREFIXES, city_of, find_house, named_city,
+                       street_type, tokenize)
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Слова адреса с сохранением регистра: по нему отличаем название от окружающего текста
+WORD_RE = re.compile(TOKEN_RE.pattern, re.IGNORECASE)
+ORDINAL_RE = re.compile(r"^\d+-[а-я]{1,2}$")
+# Глагол после названия — уже текст новости ("Шоссе Окружное закроют", "перекрыт")
+VERB_ENDINGS = ("ют", "ут", "ят", "ат", "ет", "ит", "ил", "ила", "ило", "или", "ся", "сь")
+STOP_WORDS = FILLER_WORDS | frozenset(("и", "к", "с", "о", "об", "за", "от", "до", "из", "при", "через"))
+MAX_NAME_WORDS = 3
+
+# Род типа улицы: с ним согласуется прилагательное в названии ("Садовая улица", "Московский проспект")
+TYPE_GENDERS = {"улица": "femn", "набережная": "femn", "площадь": "femn", "аллея": "femn",
+                "проспект": "masc", "переулок": "masc", "проезд": "masc", "шоссе": "neut"}
+
+# Окончания прилагательных по роду и падежу (падежи — граммемы pymorphy)
+ADJECTIVE_ENDINGS = {
+    "masc": {"gent": ("ого", "его"), "datv": ("ому", "ему"), "ablt": ("ым", "им"), "loct": ("ом", "ем")},
+    "femn": {"gent": ("ой", "ей"), "datv": ("ой", "ей"), "accs": ("ую", "юю"), "ablt": ("ой", "ей", "ою", "ею"),
+             "loct": ("ой", "ей")},
+    "neut": {"gent": ("ого", "его"), "datv": ("ому", "ему"), "ablt": ("ым", "им"), "loct": ("ом", "ем")},
+}
+NOMINATIVE_ENDINGS = ("ый", "ий", "ой", "ая", "яя", "ое", "ее")
+# Множественное число только распознаётся ("Советских космонавтов"), не приводится
+PLURAL_ENDINGS = ("ые", "ие", "ых", "их")
+SOFT_ENDINGS = frozenset(("его", "ему", "ем", "им", "ей", "юю", "ею"))
+OBLIQUE_CASES = ("gent", "datv", "accs", "ablt", "loct")
+
+# Падеж по форме слова-типа. Форма в именительном — () (название уже в нём); сокращение
+# ("ул.", "пр-т") падежа не показывает — None: приводим всё, кроме родительного, в котором
+# стоят названия-фамилии ("проспект Чумбарова-Лучинского", "улица Урицкого")
+TYPE_FORM_CASES = {
+    "улица": (), "улицы": ("gent",), "улице": ("datv", "loct"), "улицу": ("accs",), "улицей": ("ablt",),
+    "проспект": (), "проспекта": ("gent",), "проспекту": ("datv",), "проспектом": ("ablt",), "проспекте": ("loct",),
+    "переулок": (), "переулка": ("gent",), "переулку": ("datv",), "переулком": ("ablt",), "переулке": ("loct",),
+    "проезд": (), "проезда": ("gent",), "проезду": ("datv",), "проездом": ("ablt",), "проезде": ("loct",),
+    "набережная": (), "набережной": ("gent", "datv", "ablt", "loct"), "набережную": ("accs",),
+    "площадь": (), "площади": ("gent", "datv", "loct"), "площадью": ("ablt",),
+    "аллея": (), "аллеи": ("gent",), "аллее": ("datv", "loct"), "аллею": ("accs",), "аллеей": ("ablt",),
+    # Шоссе не склоняется: падеж видно только по прилагательному
+    "шоссе": OBLIQUE_CASES,
+}
+
+# С Natasha (pymorphy) прилагательное ставится в именительный по словарю — в том числе с ударным
+# окончанием ("Морском" -> "Морской"); без неё — по таблице окончаний
+_morph = None
+_morph_loaded = False
+
+
+def _morph_vocab():
+    global _morph, _morph_loaded
+    if not _morph_loaded:
+        _morph_loaded = True
+        try:
+            from natasha import MorphVocab
+            _morph = MorphVocab()
+        except Exception as e:
+            logger.info(f"[NORMALIZE] Natasha недоступна ({e}), окончания приводятся по таблице")
+    return _morph
+
+
+class Word(NamedTuple):
+    text: str
+    lower: str
+    # Перед словом стоит знак препинания: название на нём заканчивается
+    after_punct: bool
+
+
+class NormalizedAddress(NamedTuple):
+    city: str
+    type: str
+    name: str
+    house: Optional[str]
+
+    @property
+    def query(self) -> str:
+        """Канонический адрес: ключ кэша геокодера и запрос к Яндексу"""
+        street = f"{self.city}, {self.type} {self.name}"
+        return f"{street}, {self.house}" if self.house else street
+
+
+def _words(address: str) -> List[Word]:
+    text = address.replace("ё", "е").replace("Ё", "Е")
+    words, last = [], 0
+    for m in WORD_RE.finditer(text):
+        words.append(Word(m.group(), m.group().lower(), bool(text[last:m.start()].strip())))
+        last = m.end()
+    return words
+
+
+def _is_adjective(lower: str) -> bool:
+    return lower.endswith(NOMINATIVE_ENDINGS + PLURAL_ENDINGS) or any(
+        lower.endswith(endings) for cases in ADJECTIVE_ENDINGS.values() for endings in cases.values()
+    )
+
+
+def _is_name_start(word: Word) -> bool:
+    return (word.text[0].isupper() or ORDINAL_RE.match(word.lower) is not None) and word.lower not in STOP_WORDS
+
+
+def _is_city(word: Word) -> bool:
+    return word.lower.startswith(tuple(prefix for prefix, _ in CITY_PREFIXES))
+
+
+def _name_after(words: List[Word], i: int) -> List[int]:
+    """Название сразу после типа: слова с большой буквы, после прилагательного — одно строчное ("Обуховской обороны")"""
+    name = []
+    while i < len(words) and len(name) < MAX_NAME_WORDS:
+        word = words[i]
+        if _is_city(word) or street_type(word.lower) is not None or (name and word.after_punct):
+            break
+        if _is_name_start(word) and not (name and ORDINAL_RE.match(word.lower)):
+            name.append(i)
+        elif (name and _is_adjective(words[name[-1]].lower) and words[name[-1]].text[0].isupper()
+              and word.lower.isalpha() and len(word.lower) > 2 and word.lower not in STOP_WORDS
+              and not word.lower.endswith(VERB_ENDINGS)):
+            name.append(i)
+            break
+        else:
+            break
+        i += 1
+    return name
+
+
+def _name_before(words: List[Word], i: int) -> List[int]:
+    """Название перед типом ("Ленинградском проспекте", "Ломоносова пр."): слова с большой буквы"""
+    name = []
+    j = i - 1
+    while j >= 0 and len(name) < MAX_NAME_WORDS and not words[j + 1].after_punct:
+        word = words[j]
+        if _is_city(word) or not _is_name_start(word) or street_type(word.lower) is not None:
+            break
+        name.insert(0, j)
+        j -= 1
+    return name
+
+
+def _title(word: str, like: str) -> str:
+    """Регистр по слову адреса like: "ЛЕНИНА" -> "Ленина", "Чумбарова-лучинского" -> "Чумбарова-Лучинского" """
+    if not like[0].isupper():
+        return word.lower()
+    return "-".join(part.capitalize() if part[:1].isalpha() else part for part in word.lower().split("-"))
+
+
+def _nominative_ending(stem: str, gender: str, soft: bool) -> str:
+    if gender == "masc":
+        return "ий" if soft or stem[-1] in "кгхжшчщ" else "ый"
+    if gender == "femn":
+        return "яя" if soft and stem[-1] not in "жшчщц" else "ая"
+    return "ее" if soft and stem[-1] not in "жшчщц" else "ое"
+
+
+def _to_nominative(word: str, gender: str, cases: Tuple[str, ...]) -> str:
+    """Прилагательное в одном из падежей cases -> именительный падеж того же рода; иначе слово как есть"""
+    morph = _morph_vocab()
+    if morph is not None:
+        for parse in morph.parse(word):
+            if "ADJF" in parse.tag and parse.tag.case in cases and parse.tag.gender == gender:
+                form = parse.inflect({"nomn", "sing", gender})
+                if form is not None:
+                    return form.word
+        return word
+    endings = sorted({e for case in cases for e in ADJECTIVE_ENDINGS[gender].get(case, ())}, key=len, reverse=True)
+    for ending in endings:
+        stem = word[:-len(ending)]
+        if word.endswith(ending) and len(stem) >= 3:
+            return stem + _nominative_ending(stem, gender, ending in SOFT_ENDINGS)
+    return word
+
+
+def _canonical_name(words: List[Word], name: List[int], kind: str, type_word: str) -> str:
+    texts = [_title(words[i].text, words[i].text) for i in name]
+    cases = TYPE_FORM_CASES.get(type_word, None)
+    if cases is None:
+        cases = tuple(case for case in OBLIQUE_CASES if case != "gent")
+    # Согласуются с типом только названия из одних прилагательных; в "набережной Северной Двины"
+    # прилагательное относится к следующему слову и остаётся как есть
+    if cases and all(_is_adjective(words[i].lower) for i in name):
+        gender = TYPE_GENDERS[kind]
+        texts = [_title(_to_nominative(words[i].lower, gender, cases), words[i].text) for i in name]
+    return " ".join(texts)
+
+
+def normalize_address(address: str, gazetteer: Optional[Gazetteer] = None) -> Optional[NormalizedAddress]:
+    """
+    Канонический вид адреса из extract_address: город, тип улицы полным словом, название в
+    именительном падеже, номер дома без "д."/"№" ("на Ленинградском проспекте у дома 441" и
+    "пр. Ленинградский, д. 441" -> "Архангельск, проспект Ленинградский, 441"). Улица из справочника
+    берётся с его написанием. None — в адресе нет типа улицы или названия (ТЦ, парки, театры).
+    """
+    if not address:
+        return None
+    if gazetteer is not None:
+        match = gazetteer.match(address)
+        # Улица справочника в другом городе не годится: город, названный в адресе, важнее
+        if match is not None and named_city(tokenize(address)) in (None, match.street.city):
+            return NormalizedAddress(match.street.city, match.street.type, match.street.name, match.house)
+
+    words = _words(address)
+    tokens = [word.lower for word in words]
+    for i, token in enumerate(tokens):
+        kind = street_type(token)
+        if kind is None:
+            continue
+        name = _name_after(words, i + 1) or _name_before(words, i)
+        if not name:
+            continue
+        start, end = min(name[0], i), max(name[-1], i) + 1
+        return NormalizedAddress(
+            city=city_of(tokens, DEFAULT_CITY),
+            type=kind,
+            name=_canonical_name(words, name, kind, token),
+            house=find_house(tokens, start, end),
+        )
+    return None
@@ -0,0 +1,61 @@
+import json
+import sqlite3
+import logging
+import argparse
+
+from gazetteer import Gazetteer, GAZETTEER_PATH
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - [GAZETTEER] - %(message)s')
+logger = logging.getLogger("GAZETTEER")
+
+# Центр улицы пересчитывается как среднее известных домов, когда их не меньше
+MIN_HOUSES_FOR_CENTROID = 3
+
+
+def write_streets(path: str, data: dict):
+    """Тот же формат, что в репозитории: одна улица на строку, чтобы изменения было удобно смотреть в diff"""
+    lines = [json.dumps(street, ensure_ascii=False) for street in data["streets"]]
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('{\n  "description": ' + json.dumps(data["description"], ensure_ascii=False) + ',\n  "streets": [\n')
+        f.write(",\n".join("    " + line for line in lines) + "\n  ]\n}\n")
+
+
+# Пополнение справочника улиц координатами домов, которые уже вернул Яндекс (записи кэша
+# геокодера со статусом ok). Запускать время от времени: такие адреса дальше не уходят в сеть.
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cache", default="geo_cache.db")
+    parser.add_argument("--gazetteer", default=GAZETTEER_PATH)
+    parser.add_argument("--centroids", action="store_true", help="пересчитать центры улиц по известным домам")
+    args = parser.parse_args()
+
+    with open(args.gazetteer, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    gazetteer = Gazetteer.load(args.gazetteer)
+    index_of = {id(street): i for i, street in enumerate(gazetteer.streets)}
+
+    conn = sqlite3.connect(args.cache)
+    rows = conn.execute(
+        "SELECT query, lat, lon FROM geo_cache WHERE (status IS NULL OR status = 'ok') AND lat IS NOT NULL"
+    ).fetchall()
+
+    added = rejected = 0
+    for query, lat, lon in rows:
+        match = gazetteer.match(query)
+        if match is None or match.house is None or match.precision == "house":
+            continue
+        if not gazetteer.learn(match, [lat, lon]):
+            rejected += 1
+            continue
+        data["streets"][index_of[id(match.street)]]["houses"][match.house] = [lat, lon]
+        added += 1
+
+    if args.centroids:
+        for street in data["streets"]:
+            houses = list(street["houses"].values())
+            if len(houses) >= MIN_HOUSES_FOR_CENTROID:
+                street["centroid"] = [round(sum(h[0] for h in houses) / len(houses), 6),
+                                      round(sum(h[1] for h in houses) / len(houses), 6)]
+
+    write_streets(args.gazetteer, data)
+    logger.info(f"Записей кэша: {len(rows)}, добавлено домов: {added}, отброшено (далеко от улицы): {rejected}")
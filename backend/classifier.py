@@ -0,0 +1,123 @@
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# === СЛОВАРИ И ДАННЫЕ ===
+# Корни слов по категориям. Порядок категорий задаёт приоритет при равном счёте.
+CATEGORIES = {
+    "дтп": ["дтп", "авари", "столкнов", "сбил", "наезд", "опрокинул", "лобовое", "гибдд", "дорожно-транспорт", "въехал в"],
+    "происшествия": ["пожар", "возгоран", "мчс", "чп", "утонул", "пропал", "наводнен", "взрыв", "обрушен", "скорая", "погиб", "смерт", "спасател", "труп", "эвакуаци"],
+    "криминал": ["полици", "задержан", "краж", "грабеж", "ограбл", "наркоти", "суд", "приговор", "уголовн", "мошенни", "убийств", "коррупц", "прокуратур", "мвд", "фсб"],
+    "политика": ["мэр ", "губернатор", "депутат", "дума", "выборы", "администраци", "законопроект", "власт", "чиновник", "цыбульск", "морев"],
+    "жкх": ["отоплен", "теплоснабж", "водоканал", "тариф", "жкх", "прорыв труб", "тгк-2", "рвк-", "электроснабж", "управляющая компани", "коммунальн", "снег", "уборка"],
+    "экономика": ["бюджет", "инвестици", "строительств", "аквилон", "порт", "экономи", "лдк", "завод", "предприяти", "бизнес", "налог", "финанс"],
+    "общество": ["жител", "праздник", "акци", "ветеран", "пенсионер", "волонтер", "помор", "благоустройств", "парк", "сквер", "общественн"],
+    "спорт": ["водник", "матч", "хоккей", "стадион", "турнир", "соревновани", "чемпионат", "медал", "тренер", "фитнес", "спорт"],
+    "культура": ["театр", "концерт", "фестивал", "музей", "выставк", "чумабаровк", "искусств", "художник", "писател", "музыкант", "премьер"],
+    "образование": ["сафу", "сгму", "университет", "студент", "школ", "лицей", "егэ", "учител", "педагог", "образовани", "колледж", "детский сад"]
+}
+
+# Вес одного попадания корня категории (по умолчанию 1.0).
+# Узкие "событийные" категории весят чуть больше общих, чтобы "жители" не перебивали "ДТП".
+CATEGORY_WEIGHTS = {
+    "дтп": 1.5,
+    "происшествия": 1.3,
+    "криминал": 1.3,
+    "общество": 0.8,
+}
+
+DEFAULT_CATEGORY = "другое"
+
+
+class KeywordAutomaton:
+    """
+    Автомат Ахо-Корасик: находит все вхождения всех ключевых слов за один проход по тексту.
+    Каждому ключевому слову сопоставлено произвольное значение (payload).
+    """
+
+    def __init__(self, keywords: Iterable[Tuple[str, object]]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[object]] = [[]]
+
+        for word, payload in keywords:
+            state = 0
+            for ch in word:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = nxt
+            self._out[state].append(payload)
+
+        # Суффиксные ссылки строим обходом в ширину; выходы наследуются по ним,
+        # так что при сканировании не нужно ходить по цепочке fail-ссылок.
+        # У детей корня fail-ссылка всегда ведёт в корень.
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def iter_payloads(self, text: str):
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                yield from out[state]
+
+
+class CategoryClassifier:
+    """
+    Категоризация новости по корням слов. Все корни всех категорий собраны в один автомат,
+    текст сканируется один раз, категории оцениваются по числу попаданий с учётом веса.
+    """
+
+    def __init__(self, categories: Dict[str, List[str]] = CATEGORIES,
+                 weights: Optional[Dict[str, float]] = None,
+                 default: str = DEFAULT_CATEGORY):
+        weights = CATEGORY_WEIGHTS if weights is None else weights
+        self.default = default
+        self._names = list(categories)
+        self._automaton = KeywordAutomaton(
+            (word, (index, weights.get(name, 1.0)))
+            for index, (name, words) in enumerate(categories.items())
+            for word in words
+        )
+
+    def _totals(self, text: str) -> List[float]:
+        totals = [0.0] * len(self._names)
+        for index, weight in self._automaton.iter_payloads(text.lower()):
+            totals[index] += weight
+        return totals
+
+    def scores(self, text: str) -> Dict[str, float]:
+        return {name: total for name, total in zip(self._names, self._totals(text)) if total}
+
+    def classify_text(self, text: str) -> str:
+        totals = self._totals(text)
+        # При равном счёте побеждает категория, стоящая раньше в CATEGORIES
+        best = max(range(len(totals)), key=lambda i: (totals[i], -i), default=None)
+        if best is None or not totals[best]:
+            return self.default
+        return self._names[best]
+
+    def classify(self, title: str, preview: str = "") -> str:
+        return self.classify_text(f"{title or ''} {preview or ''}")
+
+    def classify_many(self, items: Iterable[Tuple[str, str]]) -> List[str]:
+        """Пакетная категоризация пар (заголовок, превью)."""
+        return [self.classify(title, preview) for title, preview in items]
+
+
+default_classifier = CategoryClassifier()
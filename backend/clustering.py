@@ -0,0 +1,134 @@
+import math
+import time
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+
+import database
+
+# Каждый тайл карты (256 px) делится на сетку CELLS_PER_TILE x CELLS_PER_TILE ячеек по 32 px
+CELLS_PER_TILE = 8
+MAX_ZOOM = 18
+MAX_TILES_PER_REQUEST = 64
+REPRESENTATIVES = 3
+CACHE_SIZE = 4096
+# Подстраховка для записей из других процессов (run_geocoder.py): их версия здесь не видна
+CACHE_TTL = 60
+
+MAX_MERCATOR_LAT = 85.05112878
+
+
+def lon_to_tile_x(lon: float, zoom: int) -> int:
+    n = 2 ** zoom
+    return min(n - 1, max(0, int((lon + 180.0) / 360.0 * n)))
+
+
+def lat_to_tile_y(lat: float, zoom: int) -> int:
+    n = 2 ** zoom
+    lat = max(-MAX_MERCATOR_LAT, min(MAX_MERCATOR_LAT, lat))
+    rad = math.radians(lat)
+    return min(n - 1, max(0, int((1.0 - math.asinh(math.tan(rad)) / math.pi) / 2.0 * n)))
+
+
+def tile_bounds(x: int, y: int, zoom: int) -> Tuple[float, float, float, float]:
+    """(min_lat, max_lat, min_lon, max_lon) тайла в проекции Web Mercator"""
+    n = 2 ** zoom
+    min_lon = x / n * 360.0 - 180.0
+    max_lon = (x + 1) / n * 360.0 - 180.0
+    max_lat = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+    min_lat = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + 1) / n))))
+    return min_lat, max_lat, min_lon, max_lon
+
+
+def tiles_for_bbox(min_lat: float, max_lat: float, min_lon: float, max_lon: float, zoom: int) -> List[Tuple[int, int]]:
+    x0, x1 = lon_to_tile_x(min_lon, zoom), lon_to_tile_x(max_lon, zoom)
+    # Ось Y тайлов направлена на юг
+    y0, y1 = lat_to_tile_y(max_lat, zoom), lat_to_tile_y(min_lat, zoom)
+    return [(x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1)]
+
+
+def cluster_tile(zoom: int, x: int, y: int) -> List[Dict]:
+    """Сеточная кластеризация точек одного тайла; агрегирует SQLite, а не Python"""
+    min_lat, max_lat, min_lon, max_lon = tile_bounds(x, y, zoom)
+    # Внутри тайла широта считается линейной: на масштабе 1/8 тайла искажение пренебрежимо
+    lon_scale = CELLS_PER_TILE / (max_lon - min_lon)
+    lat_scale = CELLS_PER_TILE / (max_lat - min_lat)
+
+    with database.read_scope() as conn:
+        rows = conn.execute("""
+            SELECT cx, cy, id, cnt, avg_lat, avg_lon FROM (
+                SELECT cx, cy, id,
+                       ROW_NUMBER() OVER (PARTITION BY cx, cy ORDER BY id DESC) AS rn,
+                       COUNT(*) OVER cell AS cnt,
+                       AVG(lat) OVER cell AS avg_lat,
+                       AVG(lon) OVER cell AS avg_lon
+                FROM (
+                    SELECT id, min_lat AS lat, min_lon AS lon,
+                           MIN(:cells - 1, CAST((min_lon - :min_lon) * :lon_scale AS INTEGER)) AS cx,
+                           MIN(:cells - 1, CAST((:max_lat - min_lat) * :lat_scale AS INTEGER)) AS cy
+                    FROM news_geo
+                    WHERE min_lat >= :min_lat AND min_lat < :max_lat
+                      AND min_lon >= :min_lon AND min_lon < :max_lon
+                )
+                WINDOW cell AS (PARTITION BY cx, cy)
+            )
+            WHERE rn <= :reps
+            ORDER BY cy, cx, rn
+        """, {
+            "cells": CELLS_PER_TILE, "reps": REPRESENTATIVES,
+            "min_lat": min_lat, "max_lat": max_lat, "min_lon": min_lon, "max_lon": max_lon,
+            "lat_scale": lat_scale, "lon_scale": lon_scale,
+        }).fetchall()
+
+    clusters = OrderedDict()
+    for cx, cy, news_id, count, avg_lat, avg_lon in rows:
+        cluster = clusters.get((cx, cy))
+        if cluster is None:
+            cluster = clusters[(cx, cy)] = {
+                "lat": round(avg_lat, 6), "lon": round(avg_lon, 6), "count": count, "ids": []
+            }
+        cluster["ids"].append(news_id)
+    return list(clusters.values())
+
+
+class ClusterCache:
+    """Кэш кластеров по (zoom, x, y). Сбрасывается при изменении координат в БД."""
+
+    def __init__(self, size: int = CACHE_SIZE, ttl: float = CACHE_TTL):
+        self.size = size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_tile(self, zoom: int, x: int, y: int) -> List[Dict]:
+        key = (zoom, x, y)
+        version = database.coords_version()
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] == version and now - entry[1] < self.ttl:
+                self._entries.move_to_end(key)
+                return entry[2]
+
+        clusters = cluster_tile(zoom, x, y)
+        with self._lock:
+            self._entries[key] = (version, now, clusters)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+        return clusters
+
+
+cluster_cache = ClusterCache()
+
+
+def get_clusters(min_lat: float, max_lat: float, min_lon: float, max_lon: float, zoom: int) -> List[Dict]:
+    """Кластеры всех тайлов, пересекающих видимую область"""
+    zoom = max(0, min(MAX_ZOOM, zoom))
+    tiles = tiles_for_bbox(min_lat, max_lat, min_lon, max_lon, zoom)
+    if len(tiles) > MAX_TILES_PER_REQUEST:
+        raise ValueError(f"Слишком большая область для zoom={zoom}: {len(tiles)} тайлов")
+    clusters = []
+    for x, y in tiles:
+        clusters.extend(cluster_cache.get_tile(zoom, x, y))
+    return clusters
@@ -0,0 +1,195 @@
+import html
+import re
+import logging
+from typing import List, NamedTuple
+
+from bs4 import BeautifulSoup, CData, NavigableString, SoupStrainer
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# С lxml страница разбирается напрямую (на порядок быстрее BeautifulSoup); без него —
+# BeautifulSoup с html.parser, ограниченный SoupStrainer'ом
+try:
+    import lxml.html
+    PARSER = "lxml"
+    _LXML_PARSER = lxml.html.HTMLParser(encoding="utf-8")
+except ImportError:
+    PARSER = "html.parser"
+
+# Контейнер текста статьи в порядке приоритета
+CONTENT_CLASSES = ("news-text", "fulltext")
+CONTENT_TAG = "article"
+# Конец такого блока (и <br>) — граница абзаца
+BLOCK_TAGS = frozenset(("p", "div", "h1", "h2", "h3", "li"))
+SKIP_TAGS = frozenset(("script", "style"))
+TEXT_TYPES = (NavigableString, CData)
+# Ссылки на другие новости в конце статьи: пропускаем короткие строки после этих заголовков
+RELATED_MARKERS = ("новости по теме", "читайте также")
+
+NO_TEXT = "Текст не найден"
+TAG_RE = re.compile(r"<[^>]+>")
+
+
+class ArticleContent(NamedTuple):
+    html: str
+    text: str
+
+
+EMPTY_ARTICLE = ArticleContent("", "")
+
+
+class ContentStrainer(SoupStrainer):
+    """
+    Разбор только нужных частей страницы: контейнеры статьи и отдельные <p> (для запасного варианта).
+    Меню, подвал и прочая разметка вне них в дерево не попадают.
+    """
+
+    def allow_tag_creation(self, nsprefix, name, attrs) -> bool:
+        if name == "p" or name == CONTENT_TAG:
+            return True
+        if name != "div" or not attrs:
+            return False
+        classes = attrs.get("class") or ""
+        if not isinstance(classes, str):
+            classes = " ".join(classes)
+        return any(cls in CONTENT_CLASSES for cls in classes.split())
+
+
+def _collect_text(node, parts: List[str]):
+    """Строки узла (для get_text(" ")) с переводом строки после блоков и на месте <br>"""
+    for child in node.children:
+        if type(child) in TEXT_TYPES:
+            parts.append(child)
+        elif child.name is None or child.name in SKIP_TAGS:
+            continue
+        elif child.name == "br":
+            parts.append("\n")
+        else:
+            _collect_text(child, parts)
+            if child.name in BLOCK_TAGS:
+                parts.append("\n")
+
+
+def _paragraphs(lines, min_length: int, resume_length: int) -> List[str]:
+    """Непустые строки без блока "Новости по теме": он кончается на первой длинной (> resume_length) строке"""
+    paragraphs = []
+    skip_mode = False
+    for line in lines:
+        clean_line = " ".join(line.split())
+        if clean_line.lower().startswith(RELATED_MARKERS):
+            skip_mode = True
+            continue
+        if skip_mode:
+            if len(clean_line) <= resume_length:
+                continue
+            skip_mode = False
+        if len(clean_line) > min_length:
+            paragraphs.append(clean_line)
+    return paragraphs
+
+
+def _collect_lxml(element, parts: List[str], blocks: bool = True):
+    """То же для элемента lxml: его текст, потомки и хвосты (tail) детей; комментарии пропускаются"""
+    if element.text:
+        parts.append(element.text)
+    for child in element:
+        tag = child.tag
+        if isinstance(tag, str) and tag not in SKIP_TAGS:
+            if tag == "br":
+                if blocks:
+                    parts.append("\n")
+            else:
+                _collect_lxml(child, parts, blocks)
+                if blocks and tag in BLOCK_TAGS:
+                    parts.append("\n")
+        if child.tail:
+            parts.append(child.tail)
+
+
+def _paragraphs_lxml(page: str) -> List[str]:
+    if not page or not page.strip():
+        return []
+    root = lxml.html.document_fromstring(page.encode("utf-8"), parser=_LXML_PARSER)
+    for cls in CONTENT_CLASSES:
+        found = root.xpath(f"//div[contains(concat(' ', normalize-space(@class), ' '), ' {cls} ')]")
+        if found:
+            break
+    else:
+        found = root.xpath(f"//{CONTENT_TAG}")
+    if found:
+        parts = []
+        _collect_lxml(found[0], parts)
+        return _paragraphs(" ".join(parts).split("\n"), 5, 90)
+
+    texts = []
+    for tag in root.iter("p"):
+        parts = []
+        _collect_lxml(tag, parts, blocks=False)
+        texts.append(" ".join(parts))
+    paragraphs = _paragraphs(texts, 5, 90)
+    if not paragraphs:
+        # Нет подходящих абзацев: длинные строки всей страницы
+        parts = []
+        _collect_lxml(root, parts, blocks=False)
+        paragraphs = _paragraphs("\n".join(parts).split("\n"), 40, 100)
+    return paragraphs
+
+
+def _find_container(soup):
+    for cls in CONTENT_CLASSES:
+        container = soup.find("div", class_=cls)
+        if container is not None:
+            return container
+    return soup.find(CONTENT_TAG)
+
+
+def _paragraphs_bs4(page: str) -> List[str]:
+    soup = BeautifulSoup(page, "html.parser", parse_only=ContentStrainer())
+    container = _find_container(soup)
+    if container is not None:
+        parts = []
+        _collect_text(container, parts)
+        return _paragraphs(" ".join(parts).split("\n"), 5, 90)
+
+    paragraphs = _paragraphs((tag.get_text(separator=" ") for tag in soup.find_all("p")), 5, 90)
+    if not paragraphs:
+        # Нет подходящих абзацев: длинные строки всей страницы
+        full = BeautifulSoup(page, "html.parser")
+        paragraphs = _paragraphs(full.get_text(separator="\n").split("\n"), 40, 100)
+    return paragraphs
+
+
+def extract_content(page: str) -> ArticleContent:
+    """
+    Текст статьи со страницы news29.ru: HTML из абзацев <p>...</p> и тот же текст без разметки.
+    Берётся контейнер статьи (div.news-text, div.fulltext, article), иначе все <p>, иначе длинные
+    строки страницы. Один разбор страницы и один обход контейнера; без lxml в дерево BeautifulSoup
+    попадают только контейнеры и <p>. Пустой результат — текст не найден.
+    """
+    paragraphs = _paragraphs_lxml(page) if PARSER == "lxml" else _paragraphs_bs4(page)
+    return ArticleContent(
+        html="".join(f"<p>{html.escape(p, quote=False)}</p>\n" for p in paragraphs),
+        text=" ".join(paragraphs),
+    )
+
+
+def content_text(content: str) -> str:
+    """Текст без разметки для сохранённого content (набора <p>...</p>) — без разбора в дерево"""
+    return " ".join(html.unescape(TAG_RE.sub(" ", content or "")).split())
+
+
+def fetch_article(session, url: str, headers: dict = None, timeout: float = 15) -> ArticleContent:
+    """
+    Загружает статью и извлекает текст. Ошибка загрузки -> EMPTY_ARTICLE (пустой content
+    не сохраняется, геокодер скачает статью позже); текст не найден -> NO_TEXT вместо html.
+    """
+    try:
+        resp = session.get(url, headers=headers, timeout=timeout)
+        resp.raise_for_status()
+        resp.encoding = resp.apparent_encoding
+        article = extract_content(resp.text)
+    except Exception as e:
+        logger.error(f"[CONTENT] Ошибка загрузки контента {url}: {e}")
+        return EMPTY_ARTICLE
+    return article if article.html else ArticleContent(NO_TEXT, "")
@@ -1,132 +1,641 @@
 import sqlite3
 import json
+import base64
+import zlib
 import logging
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime
 from typing import List, Dict, Optional
 
+import text_search
+
 DB_PATH = "news.db"
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def init_db():
-    conn = sqlite3.connect(DB_PATH)
-    conn.execute("PRAGMA journal_mode=WAL")
-    cursor = conn.cursor()
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS news (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            url TEXT UNIQUE NOT NULL,
-            title TEXT NOT NULL,
-            preview TEXT,
-            date TEXT NOT NULL,
-            source TEXT DEFAULT 'news29.ru',
-            image TEXT,
-            category TEXT DEFAULT 'другое',
-            content TEXT,
-            coords TEXT,
-            address TEXT,
-            parsed_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-            geocoded_at DATETIME
+# Соединения переиспользуются в пределах потока (FastAPI-воркеры, поток парсера, поток геокодера)
+_local = threading.local()
+STATEMENT_CACHE_SIZE = 256
+BUSY_TIMEOUT_MS = 30000
+# Ограничение SQLite на число параметров в одном запросе (для старых сборок — 999)
+SQL_VARIABLES_CHUNK = 500
+# Тексты статей хранятся сжатыми в news_content, отдельно от "горячей" таблицы news
+CONTENT_COMPRESSION_LEVEL = 6
+CONTENT_MIGRATION_BATCH = 200
+COORDS_MIGRATION_BATCH = 1000
+# Аренда новостей геокодерами (main.py и любое число run_geocoder.py): взятая новость
+# закреплена за воркером до lease_expires; после ошибки — повтор с экспоненциальной паузой
+GEO_LEASE_SECONDS = 300
+GEO_RETRY_BASE = 60
+GEO_RETRY_MAX = 6 * 3600
+GEO_MAX_ATTEMPTS = 5
+
+# Версия координат: растёт после каждой транзакции, изменившей news_geo (для кэшей кластеров)
+_coords_version = 0
+_version_lock = threading.Lock()
+
+# Версия данных: растёт после каждой транзакции записи, которая что-то изменила (для кэша ответов)
+_data_version = 0
+# Отдельное соединение-наблюдатель: его PRAGMA data_version меняется после коммитов любых
+# других соединений, в том числе из другого процесса (run_geocoder.py)
+_watcher = None
+_watcher_path = None
+_watcher_lock = threading.Lock()
+
+# Текущее число новостей: считаем один раз, дальше поддерживаем при вставках
+_news_count = None
+_count_lock = threading.Lock()
+
+
+def get_connection() -> sqlite3.Connection:
+    """Возвращает соединение текущего потока, открывая его при первом обращении."""
+    conn = getattr(_local, "conn", None)
+    if conn is None or _local.path != DB_PATH:
+        if conn is not None:
+            conn.close()
+        # isolation_level=None: транзакциями управляем явно через read_scope/write_scope
+        conn = sqlite3.connect(DB_PATH, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None,
+                               cached_statements=STATEMENT_CACHE_SIZE)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+        _local.conn = conn
+        _local.path = DB_PATH
+    return conn
+
+
+def close_connection():
+    """Закрывает соединение текущего потока (например, перед завершением потока)."""
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        conn.close()
+        _local.conn = None
+
+
+@contextmanager
+def read_scope():
+    """Транзакция чтения: все запросы внутри видят один и тот же снимок БД."""
+    conn = get_connection()
+    if conn.in_transaction:
+        yield conn
+        return
+    conn.execute("BEGIN")
+    try:
+        yield conn
+    finally:
+        conn.execute("COMMIT")
+
+
+@contextmanager
+def write_scope():
+    """Транзакция записи. BEGIN IMMEDIATE сразу берёт блокировку, чтобы не ловить SQLITE_BUSY посреди транзакции."""
+    conn = get_connection()
+    if conn.in_transaction:
+        yield conn
+        return
+    conn.execute("BEGIN IMMEDIATE")
+    _local.coords_changed = False
+    changes_before = conn.total_changes
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        _local.coords_changed = False
+        raise
+    conn.execute("COMMIT")
+    # Версии поднимаем только после COMMIT, чтобы кэш не сохранил старые данные под новой версией
+    if conn.total_changes != changes_before:
+        _bump_data_version()
+    if _local.coords_changed:
+        _local.coords_changed = False
+        _bump_coords_version()
+
+
+def _bump_coords_version():
+    global _coords_version
+    with _version_lock:
+        _coords_version += 1
+
+
+def coords_version() -> int:
+    """Текущая версия координат в этом процессе"""
+    return _coords_version
+
+
+def _bump_data_version():
+    global _data_version
+    with _version_lock:
+        _data_version += 1
+
+
+def _external_data_version() -> int:
+    global _watcher, _watcher_path
+    with _watcher_lock:
+        if _watcher is None or _watcher_path != DB_PATH:
+            if _watcher is not None:
+                _watcher.close()
+            _watcher = sqlite3.connect(DB_PATH, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None,
+                                       check_same_thread=False)
+            _watcher_path = DB_PATH
+        return _watcher.execute("PRAGMA data_version").fetchone()[0]
+
+
+def data_version():
+    """
+    Версия данных БД для кэшей ответов: меняется после любой записи.
+    Счётчик процесса дополнен PRAGMA data_version, чтобы видеть и коммиты других процессов.
+    """
+    return _data_version, _external_data_version()
+
+
+def _sync_geo_index(conn: sqlite3.Connection, news_id: int, coords: Optional[list]):
+    """Держит news_geo в согласии с news.lat/lon (вызывается внутри транзакции записи)"""
+    _local.coords_changed = True
+    if coords:
+        lat, lon = coords[0], coords[1]
+        conn.execute("INSERT OR REPLACE INTO news_geo (id, min_lat, max_lat, min_lon, max_lon) VALUES (?, ?, ?, ?, ?)",
+                     (news_id, lat, lat, lon, lon))
+    else:
+        conn.execute("DELETE FROM news_geo WHERE id = ?", (news_id,))
+
+
+def _pack_content(content: Optional[str]) -> Optional[bytes]:
+    return zlib.compress(content.encode("utf-8"), CONTENT_COMPRESSION_LEVEL) if content else None
+
+
+def _unpack_content(body: Optional[bytes]) -> Optional[str]:
+    return zlib.decompress(body).decode("utf-8") if body else None
+
+
+def _store_content(conn: sqlite3.Connection, news_id: int, content: Optional[str]):
+    """Сохраняет текст статьи в news_content (пустой текст — удаляет запись)"""
+    body = _pack_content(content)
+    if body:
+        conn.execute("INSERT OR REPLACE INTO news_content (id, body) VALUES (?, ?)", (news_id, body))
+    else:
+        conn.execute("DELETE FROM news_content WHERE id = ?", (news_id,))
+
+
+def _migrate_inline_content():
+    """
+    Переносит тексты из старой колонки news.content в news_content.
+    Идёт пачками по возрастанию id, каждая пачка — своя короткая транзакция,
+    так что API и геокодер продолжают работать во время миграции.
+    Колонка остаётся (пустой): её удаление переписало бы всю таблицу под одной блокировкой.
+    """
+    with read_scope() as conn:
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(news)")}
+    if "content" not in columns:
+        return
+
+    last_id, moved = 0, 0
+    while True:
+        with write_scope() as conn:
+            rows = conn.execute(
+                "SELECT id, content FROM news WHERE id > ? AND content IS NOT NULL ORDER BY id LIMIT ?",
+                (last_id, CONTENT_MIGRATION_BATCH)
+            ).fetchall()
+            if not rows:
+                break
+            conn.executemany("INSERT OR REPLACE INTO news_content (id, body) VALUES (?, ?)",
+                             [(r[0], _pack_content(r[1])) for r in rows if r[1]])
+            conn.executemany("UPDATE news SET content = NULL WHERE id = ?", [(r[0],) for r in rows])
+        last_id = rows[-1][0]
+        moved += len(rows)
+    if moved:
+        logger.info(f"Тексты {moved} новостей перенесены в news_content")
+
+
+def _migrate_json_coords():
+    """
+    Переносит координаты из старой текстовой колонки news.coords ("[lat, lon]") в lat/lon.
+    Как и перенос текстов, идёт короткими транзакциями по возрастанию id; колонка остаётся пустой.
+    """
+    with read_scope() as conn:
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(news)")}
+    if "coords" not in columns:
+        return
+
+    last_id, moved = 0, 0
+    while True:
+        with write_scope() as conn:
+            ids = [r[0] for r in conn.execute(
+                "SELECT id FROM news WHERE id > ? AND coords IS NOT NULL ORDER BY id LIMIT ?",
+                (last_id, COORDS_MIGRATION_BATCH)
+            )]
+            if not ids:
+                break
+            marks = ",".join("?" * len(ids))
+            conn.execute(f"""
+                UPDATE news
+                SET lat = CASE WHEN json_valid(coords) THEN json_extract(coords, '$[0]') END,
+                    lon = CASE WHEN json_valid(coords) THEN json_extract(coords, '$[1]') END,
+                    coords = NULL
+                WHERE id IN ({marks})
+            """, ids)
+        last_id = ids[-1]
+        moved += len(ids)
+    if moved:
+        logger.info(f"Координаты {moved} новостей перенесены в lat/lon")
+
+
+def _sync_search_index(conn: sqlite3.Connection, news_ids: List[int]):
+    """Переиндексирует новости в news_fts (вызывается внутри транзакции записи)"""
+    for chunk_start in range(0, len(news_ids), SQL_VARIABLES_CHUNK):
+        chunk = news_ids[chunk_start:chunk_start + SQL_VARIABLES_CHUNK]
+        marks = ",".join("?" * len(chunk))
+        rows = conn.execute(f"""
+            SELECT n.id, n.title, n.preview, c.body
+            FROM news n LEFT JOIN news_content c ON c.id = n.id
+            WHERE n.id IN ({marks})
+        """, chunk).fetchall()
+        conn.execute(f"DELETE FROM news_fts WHERE rowid IN ({marks})", chunk)
+        conn.executemany(
+            "INSERT INTO news_fts (rowid, title, preview, content) VALUES (?, ?, ?, ?)",
+            [(r[0], text_search.stem_text(r[1]), text_search.stem_text(r[2]),
+              text_search.stem_text(text_search.html_to_text(_unpack_content(r[3])))) for r in rows]
         )
-    """)
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_date ON news (date DESC)')
-    
-    try: cursor.execute("ALTER TABLE news ADD COLUMN parsed_at DATETIME")
-    except Exception: pass
-    try: cursor.execute("ALTER TABLE news ADD COLUMN geocoded_at DATETIME")
-    except Exception: pass
-
-    conn.commit()
-    conn.close()
+
+
+def init_db():
+    with write_scope() as conn:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS news (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                url TEXT UNIQUE NOT NULL,
+                title TEXT NOT NULL,
+                preview TEXT,
+                date TEXT NOT NULL,
+                source TEXT DEFAULT 'news29.ru',
+                image TEXT,
+                category TEXT DEFAULT 'другое',
+                lat REAL,
+                lon REAL,
+                address TEXT,
+                parsed_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                geocoded_at DATETIME
+            )
+        """)
+        # Составные индексы под ORDER BY date DESC, id DESC: keyset-пагинация читает ровно одну страницу
+        conn.execute('DROP INDEX IF EXISTS idx_date')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_date_id ON news (date DESC, id DESC)')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_category_date_id ON news (category, date DESC, id DESC)')
+
+        try: conn.execute("ALTER TABLE news ADD COLUMN parsed_at DATETIME")
+        except Exception: pass
+        try: conn.execute("ALTER TABLE news ADD COLUMN geocoded_at DATETIME")
+        except Exception: pass
+        try: conn.execute("ALTER TABLE news ADD COLUMN lat REAL")
+        except Exception: pass
+        try: conn.execute("ALTER TABLE news ADD COLUMN lon REAL")
+        except Exception: pass
+        for column in ("lease_owner TEXT", "lease_expires REAL", "geo_attempts INTEGER DEFAULT 0", "next_attempt_at REAL"):
+            try: conn.execute(f"ALTER TABLE news ADD COLUMN {column}")
+            except Exception: pass
+
+        # Частичный индекс очереди геокодера: только необработанные новости, свежие первыми
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_uncoded ON news (date DESC, id DESC) WHERE lat IS NULL AND address IS NULL
+        """)
+        # Покрывающий индекс для выгрузки всех точек в heatmap.py (только геокодированные новости)
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_news_points ON news (category, date, lon, lat) WHERE lat IS NOT NULL
+        """)
+
+        # Пространственный индекс по координатам новостей (точка = вырожденный прямоугольник)
+        conn.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS news_geo USING rtree(
+                id, min_lat, max_lat, min_lon, max_lon
+            )
+        """)
+        # Тексты статей (zlib): читаются только карточкой новости и геокодером
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS news_content (
+                id INTEGER PRIMARY KEY REFERENCES news (id),
+                body BLOB NOT NULL
+            )
+        """)
+
+        # Полнотекстовый поиск: хранит основы слов (text_search.stem_text), rowid = news.id
+        has_fts = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'news_fts'").fetchone()
+        conn.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS news_fts USING fts5(
+                title, preview, content, tokenize = 'unicode61 remove_diacritics 2'
+            )
+        """)
+        if not has_fts and conn.execute("SELECT 1 FROM news LIMIT 1").fetchone():
+            logger.info("Поисковый индекс пуст, заполните его: python reindex_search.py")
+
+        # Валидаторы HTTP-кэша для условного опроса RSS (ETag / Last-Modified)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS feed_state (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                checked_at DATETIME
+            )
+        """)
+
+    _migrate_inline_content()
+    _migrate_json_coords()
+    with write_scope() as conn:
+        # Дозаполняем индекс для новостей, геокодированных до его появления
+        cursor = conn.execute("""
+            INSERT INTO news_geo (id, min_lat, max_lat, min_lon, max_lon)
+            SELECT id, lat, lat, lon, lon FROM news
+            WHERE lat IS NOT NULL AND id NOT IN (SELECT id FROM news_geo)
+        """)
+        if cursor.rowcount > 0:
+            _local.coords_changed = True
+    _reset_news_count()
     logger.info(f"БД инициализирована: {DB_PATH}")
 
 def save_news(data: Dict, content: str = None, coords: list = None, address: str = None) -> bool:
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        
-        # Используем INSERT OR IGNORE, чтобы не перезаписывать существующие новости
-        # и не менять их ID (что сбрасывало бы результаты геокодера)
-        cursor.execute("""
-            INSERT OR IGNORE INTO news 
-            (url, title, preview, date, source, image, category, content, coords, address, parsed_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-        """, (
-            data["url"], 
-            data["title"], 
-            data["preview"], 
-            data["date"],
-            data.get("source", "news29.ru"), 
-            data.get("image"), 
-            data.get("category", "другое"),
-            content, 
-            json.dumps(coords) if coords else None,
-            address
-        ))
-        
-        # Если строка была вставлена, rowcount будет 1. Если проигнорирована - 0.
-        if cursor.rowcount > 0:
-            conn.commit()
-            conn.close()
-            return True
-        else:
-            conn.close()
-            return False
+        with write_scope() as conn:
+            # Используем INSERT OR IGNORE, чтобы не перезаписывать существующие новости
+            # и не менять их ID (что сбрасывало бы результаты геокодера)
+            cursor = conn.execute("""
+                INSERT OR IGNORE INTO news
+                (url, title, preview, date, source, image, category, lat, lon, address, parsed_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+            """, (
+                data["url"],
+                data["title"],
+                data["preview"],
+                data["date"],
+                data.get("source", "news29.ru"),
+                data.get("image"),
+                data.get("category", "другое"),
+                coords[0] if coords else None,
+                coords[1] if coords else None,
+                address
+            ))
+            # Если строка была вставлена, rowcount будет 1. Если проигнорирована - 0.
+            inserted = cursor.rowcount > 0
+            if inserted:
+                _store_content(conn, cursor.lastrowid, content)
+                _sync_search_index(conn, [cursor.lastrowid])
+            if inserted and coords:
+                _sync_geo_index(conn, cursor.lastrowid, coords)
+        if inserted:
+            _add_to_news_count(1)
+        return inserted
     except Exception as e:
         logger.error(f"Ошибка сохранения новости {data.get('url')}: {e}")
         return False
 
+def _news_row(data: Dict):
+    return (
+        data["url"],
+        data["title"],
+        data["preview"],
+        data["date"],
+        data.get("source", "news29.ru"),
+        data.get("image"),
+        data.get("category", "другое"),
+    )
+
+def get_existing_urls(urls: List[str]) -> set:
+    """Возвращает те URL из списка, которые уже есть в БД"""
+    existing = set()
+    with read_scope() as conn:
+        for i in range(0, len(urls), SQL_VARIABLES_CHUNK):
+            chunk = urls[i:i + SQL_VARIABLES_CHUNK]
+            placeholders = ",".join("?" * len(chunk))
+            rows = conn.execute(f"SELECT url FROM news WHERE url IN ({placeholders})", chunk).fetchall()
+            existing.update(r[0] for r in rows)
+    return existing
+
+def save_news_batch(items: List[Dict]) -> List[int]:
+    """
+    Сохраняет пачку новостей одной транзакцией.
+    Уже существующие URL отсеиваются одним запросом, новые вставляются через executemany.
+    Возвращает ID вставленных новостей. Ошибка записи пробрасывается: транзакция откатана,
+    и вызывающий не должен считать ленту обработанной.
+    """
+    # Убираем дубликаты внутри самой пачки (первое вхождение побеждает)
+    unique = {}
+    for item in items:
+        unique.setdefault(item["url"], item)
+    if not unique:
+        return []
+
+    try:
+        with write_scope() as conn:
+            existing = get_existing_urls(list(unique))
+            rows = [_news_row(item) for url, item in unique.items() if url not in existing]
+            if not rows:
+                return []
+
+            # Под BEGIN IMMEDIATE никто другой не вставляет, а AUTOINCREMENT выдаёт id по возрастанию,
+            # поэтому всё, что больше прежнего максимума, — наши строки
+            last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM news").fetchone()[0]
+            conn.executemany("""
+                INSERT OR IGNORE INTO news
+                (url, title, preview, date, source, image, category, parsed_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+            """, rows)
+            inserted = conn.execute("SELECT id, url FROM news WHERE id > ? ORDER BY id", (last_id,)).fetchall()
+            inserted_ids = [r[0] for r in inserted]
+            contents = [(r[0], _pack_content(unique[r[1]].get("content"))) for r in inserted]
+            conn.executemany("INSERT OR REPLACE INTO news_content (id, body) VALUES (?, ?)",
+                             [(news_id, body) for news_id, body in contents if body])
+            _sync_search_index(conn, inserted_ids)
+    except Exception as e:
+        logger.error(f"Ошибка пакетного сохранения {len(unique)} новостей: {e}")
+        raise
+
+    _add_to_news_count(len(inserted_ids))
+    return inserted_ids
+
+def get_feed_validators(url: str) -> Dict:
+    """ETag и Last-Modified последнего успешного ответа ленты"""
+    with read_scope() as conn:
+        row = conn.execute("SELECT etag, last_modified FROM feed_state WHERE url = ?", (url,)).fetchone()
+    if not row:
+        return {}
+    return {"etag": row[0], "last_modified": row[1]}
+
+def save_feed_validators(url: str, etag: Optional[str], last_modified: Optional[str]):
+    with write_scope() as conn:
+        conn.execute("""
+            INSERT OR REPLACE INTO feed_state (url, etag, last_modified, checked_at)
+            VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+        """, (url, etag, last_modified))
+
+def _news_list_item(r) -> Dict:
+    return {
+        "id": r[0], "title": r[1], "url": r[2], "preview": r[3],
+        "date": r[4], "source": r[5], "image": r[6], "category": r[7],
+        "coords": [r[8], r[9]] if r[8] is not None else None
+    }
+
+def encode_cursor(date: str, news_id: int) -> str:
+    """Непрозрачный курсор страницы: позиция (date, id) последней отданной новости"""
+    raw = json.dumps([date, news_id], ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str):
+    """Обратное к encode_cursor; ValueError для повреждённого курсора"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        date, news_id = json.loads(raw.decode("utf-8"))
+    except Exception:
+        raise ValueError("Некорректный курсор")
+    if not isinstance(date, str) or not isinstance(news_id, int):
+        raise ValueError("Некорректный курсор")
+    return date, news_id
+
+def get_news_page(limit: int = 200, category: str = None, cursor: str = None):
+    """
+    Страница ленты в порядке (date DESC, id DESC) и курсор следующей страницы (None на последней).
+    Позиция задаётся курсором, а не OFFSET, поэтому глубокие страницы стоят столько же, сколько первая.
+    """
+    query = "SELECT id, title, url, preview, date, source, image, category, lat, lon FROM news"
+    where, params = [], []
+
+    if category and category.lower() != "все":
+        where.append("category = ?")
+        params.append(category.lower())
+    if cursor:
+        date, news_id = decode_cursor(cursor)
+        # Сравнение строк значений (row values) SQLite решает поиском по индексу
+        where.append("(date, id) < (?, ?)")
+        params.extend([date, news_id])
+
+    if where:
+        query += " WHERE " + " AND ".join(where)
+    # Берём на одну запись больше, чтобы знать, есть ли следующая страница
+    query += " ORDER BY date DESC, id DESC LIMIT ?"
+    params.append(limit + 1)
+
+    with read_scope() as conn:
+        rows = conn.execute(query, params).fetchall()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][4], rows[-1][0])
+    return [_news_list_item(r) for r in rows], next_cursor
+
 def get_all_news(limit: int = 200, category: str = None) -> List[Dict]:
     """Возвращает список новостей для клиентской пагинации"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    query = "SELECT id, title, url, preview, date, source, image, category, coords FROM news"
-    params = []
-    
+    return get_news_page(limit, category)[0]
+
+def get_news_in_bbox(min_lat: float, max_lat: float, min_lon: float, max_lon: float,
+                     category: str = None, date_from: str = None, date_to: str = None,
+                     limit: int = 500) -> List[Dict]:
+    """Новости с координатами внутри прямоугольника (через R*Tree-индекс news_geo)"""
+    query = """
+        SELECT n.id, n.title, n.url, n.preview, n.date, n.source, n.image, n.category, n.lat, n.lon
+        FROM news_geo g JOIN news n ON n.id = g.id
+        WHERE g.max_lat >= ? AND g.min_lat <= ? AND g.max_lon >= ? AND g.min_lon <= ?
+    """
+    params = [min_lat, max_lat, min_lon, max_lon]
+
     if category and category.lower() != "все":
-        query += " WHERE category = ?"
+        query += " AND n.category = ?"
         params.append(category.lower())
+    if date_from:
+        query += " AND n.date >= ?"
+        params.append(date_from)
+    if date_to:
+        query += " AND n.date <= ?"
+        params.append(date_to)
 
-    query += " ORDER BY date DESC, id DESC LIMIT ?"
+    query += " ORDER BY n.date DESC, n.id DESC LIMIT ?"
     params.append(limit)
 
-    cursor.execute(query, params)
-    rows = cursor.fetchall()
-    conn.close()
+    with read_scope() as conn:
+        rows = conn.execute(query, params).fetchall()
 
-    return [
-        {
-            "id": r[0], "title": r[1], "url": r[2], "preview": r[3], 
-            "date": r[4], "source": r[5], "image": r[6], "category": r[7],
-            "coords": json.loads(r[8]) if r[8] else None
-        } 
-        for r in rows
-    ]
+    return [_news_list_item(r) for r in rows]
+
+def search_news(query: str, category: str = None, geo_only: bool = False,
+                limit: int = 20, offset: int = 0) -> List[Dict]:
+    """
+    Полнотекстовый поиск по заголовку, превью и тексту статьи с учётом словоформ.
+    Результаты отсортированы по bm25: совпадение в заголовке весит больше, чем в тексте.
+    """
+    match = text_search.build_match_query(query)
+    if not match:
+        return []
+
+    sql = """
+        SELECT n.id, n.title, n.url, n.preview, n.date, n.source, n.image, n.category, n.lat, n.lon
+        FROM news_fts f JOIN news n ON n.id = f.rowid
+        WHERE news_fts MATCH ?
+    """
+    params = [match]
+    if category and category.lower() != "все":
+        sql += " AND n.category = ?"
+        params.append(category.lower())
+    if geo_only:
+        sql += " AND n.lat IS NOT NULL"
+    sql += " ORDER BY bm25(news_fts, 10.0, 4.0, 1.0), n.date DESC LIMIT ? OFFSET ?"
+    params.extend([limit, offset])
+
+    with read_scope() as conn:
+        rows = conn.execute(sql, params).fetchall()
+    return [_news_list_item(r) for r in rows]
+
+def rebuild_search_index(batch_size: int = 1000) -> int:
+    """Заново заполняет news_fts для всех новостей; каждая пачка — отдельная транзакция"""
+    with write_scope() as conn:
+        conn.execute("DELETE FROM news_fts")
+    last_id, total = 0, 0
+    while True:
+        with write_scope() as conn:
+            ids = [r[0] for r in conn.execute(
+                "SELECT id FROM news WHERE id > ? ORDER BY id LIMIT ?", (last_id, batch_size))]
+            if not ids:
+                break
+            _sync_search_index(conn, ids)
+        last_id = ids[-1]
+        total += len(ids)
+        logger.info(f"Поисковый индекс: {total} новостей")
+    return total
+
+def _reset_news_count():
+    global _news_count
+    with _count_lock:
+        _news_count = None
+
+def _add_to_news_count(delta: int):
+    global _news_count
+    with _count_lock:
+        if _news_count is not None:
+            _news_count += delta
 
 def get_news_count() -> int:
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("SELECT COUNT(*) FROM news")
-    count = cursor.fetchone()[0]
-    conn.close()
+    """Число новостей. COUNT(*) выполняется только при первом вызове, дальше счётчик ведут вставки."""
+    global _news_count
+    with _count_lock:
+        if _news_count is not None:
+            return _news_count
+    with read_scope() as conn:
+        count = conn.execute("SELECT COUNT(*) FROM news").fetchone()[0]
+    with _count_lock:
+        _news_count = count
     return count
 
 def get_news_by_id(news_id: int) -> Optional[Dict]:
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT id, url, title, date, source, image, category, content, coords, address 
-        FROM news WHERE id = ?
-    """, (news_id,))
-    row = cursor.fetchone()
-    conn.close()
-    
+    with read_scope() as conn:
+        row = conn.execute("""
+            SELECT n.id, n.url, n.title, n.date, n.source, n.image, n.category, c.body, n.lat, n.lon, n.address
+            FROM news n LEFT JOIN news_content c ON c.id = n.id
+            WHERE n.id = ?
+        """, (news_id,)).fetchone()
+
     if not row:
         return None
-        
+
     return {
         "id": row[0],
         "url": row[1],
@@ -135,92 +644,199 @@ def get_news_by_id(news_id: int) -> Optional[Dict]:
         "source": row[4],
         "image": row[5],
         "category": row[6],
-        "content": row[7],
-        "coords": json.loads(row[8]) if row[8] else None,
-        "address": row[9] if len(row) > 9 else None
+        "content": _unpack_content(row[7]),
+        "coords": [row[8], row[9]] if row[8] is not None else None,
+        "address": row[10]
     }
 
-def get_uncoded_news(limit=10):
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-    # Check if 'address' column exists (it should, but just in case)
-    # We select news where Coords are NULL AND Address is NULL (we haven't tried yet)
-    # This prevents looping over items that we already processed but found nothing (Address="Архангельск", Coords=None)
-    c.execute("SELECT * FROM news WHERE coords IS NULL AND (address IS NULL OR address = '') ORDER BY date DESC LIMIT ?", (limit,))
-    rows = c.fetchall()
-    conn.close()
-    return [dict(row) for row in rows]
+def update_news_content_and_coords(news_id, content, coords, address=None, owner: Optional[str] = None) -> bool:
+    """
+    Записывает текст статьи и координаты. owner — воркер, который арендовал новость
+    (claim_uncoded_news): запись проходит, только пока аренда за ним. Если новость уже взял другой,
+    её обработали или сбросили (reset_news_geocode), ничего не пишется и возвращается False.
+    owner=None — запись без аренды, только в неарендованную строку.
+    """
+    lat, lon = (coords[0], coords[1]) if coords else (None, None)
+    # Снятая аренда (NULL) не означает, что строка снова наша: её мог успеть обработать другой воркер
+    lease_check = "lease_owner IS NULL" if owner is None else "lease_owner = ?"
+    lease_args = () if owner is None else (owner,)
 
-def update_news_content_and_coords(news_id, content, coords, address=None):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    coords_json = json.dumps(coords) if coords else None
-    
-    # Если передан адрес, обновляем и его. И ставим время геокодирования
-    if address:
-        c.execute("""
-            UPDATE news 
-            SET content = ?, coords = ?, address = ?, geocoded_at = CURRENT_TIMESTAMP
-            WHERE id = ?
-        """, (content, coords_json, address, news_id))
-    else:
-        c.execute("""
-            UPDATE news 
-            SET content = ?, coords = ?
-            WHERE id = ?
-        """, (content, coords_json, news_id))
-    conn.commit()
-    conn.close()
+    with write_scope() as conn:
+        # Если передан адрес, обновляем и его. И ставим время геокодирования
+        if address:
+            # Новость обработана: аренда и счётчик попыток больше не нужны
+            cursor = conn.execute(f"""
+                UPDATE news
+                SET lat = ?, lon = ?, address = ?, geocoded_at = CURRENT_TIMESTAMP,
+                    lease_owner = NULL, lease_expires = NULL, geo_attempts = 0, next_attempt_at = NULL
+                WHERE id = ? AND {lease_check}
+            """, (lat, lon, address, news_id, *lease_args))
+        else:
+            cursor = conn.execute(f"""
+                UPDATE news
+                SET lat = ?, lon = ?
+                WHERE id = ? AND {lease_check}
+            """, (lat, lon, news_id, *lease_args))
+        if cursor.rowcount == 0:
+            return False
+        _store_content(conn, news_id, content)
+        _sync_geo_index(conn, news_id, coords)
+        _sync_search_index(conn, [news_id])
+    return True
+
+def iter_news_for_classification(batch_size: int = 1000):
+    """Отдаёт (id, title, preview, category) всех новостей пачками по возрастанию id"""
+    last_id = 0
+    while True:
+        with read_scope() as conn:
+            rows = conn.execute(
+                "SELECT id, title, preview, category FROM news WHERE id > ? ORDER BY id LIMIT ?",
+                (last_id, batch_size)
+            ).fetchall()
+        if not rows:
+            return
+        yield [dict(row) for row in rows]
+        last_id = rows[-1]["id"]
+
+def update_categories(updates: List[tuple]):
+    """Массово обновляет категории: список пар (category, id) одной транзакцией"""
+    if not updates:
+        return
+    with write_scope() as conn:
+        conn.executemany("UPDATE news SET category = ? WHERE id = ?", updates)
 
 def get_admin_logs(limit=200):
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-    c.execute("SELECT id, title, address, parsed_at, geocoded_at FROM news ORDER BY id DESC LIMIT ?", (limit,))
-    rows = c.fetchall()
-    conn.close()
+    with read_scope() as conn:
+        rows = conn.execute("SELECT id, title, address, parsed_at, geocoded_at FROM news ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
     return [dict(row) for row in rows]
 
 def reset_news_geocode(news_id: int) -> bool:
-    """Очищает данные геокодирования для новости, заставляя парсер искать координаты заново"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    # Сбрасываем address в NULL (не в пустую строку!), чтобы геокодер снова обработал новость
-    # Также сбрасываем coords и geocoded_at
-    cursor.execute("""
-        UPDATE news
-        SET address = NULL, coords = NULL, geocoded_at = NULL
-        WHERE id = ?
-    """, (news_id,))
-    success = cursor.rowcount > 0
-    conn.commit()
-    conn.close()
-    return success
-
-def get_uncoded_news(limit=10):
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-    # Выбираем новости, где координаты не найдены И адрес ещё не установлен (NULL)
-    # Это включает новости, которые никогда не обрабатывались, и новости после сброса
-    # NOT_FOUND означает что геокодер уже искал и ничего не нашел - такие новости не берем
-    c.execute("SELECT * FROM news WHERE coords IS NULL AND address IS NULL ORDER BY date DESC LIMIT ?", (limit,))
-    rows = c.fetchall()
-    conn.close()
-    return [dict(row) for row in rows]
+    """
+    Очищает данные геокодирования для новости, заставляя парсер искать координаты заново.
+    Аренда тоже снимается: воркер, который держал новость, больше не сможет записать в неё
+    устаревший результат (update_news_content_and_coords проверяет владельца).
+    """
+    with write_scope() as conn:
+        # Сбрасываем address в NULL (не в пустую строку!), чтобы геокодер снова обработал новость
+        # Также сбрасываем координаты и geocoded_at
+        cursor = conn.execute("""
+            UPDATE news
+            SET address = NULL, lat = NULL, lon = NULL, geocoded_at = NULL,
+                lease_owner = NULL, lease_expires = NULL, geo_attempts = 0, next_attempt_at = NULL
+            WHERE id = ?
+        """, (news_id,))
+        _sync_geo_index(conn, news_id, None)
+        return cursor.rowcount > 0
 
-def force_geocode_news(news_id: int):
-    """Принудительно запускает геокодирование для конкретной новости"""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-    c.execute("SELECT * FROM news WHERE id = ?", (news_id,))
-    row = c.fetchone()
-    conn.close()
-    
-    if not row:
-        return None
-    
-    item = dict(row)
-    return item
\ No newline at end of file
+# Поля новости, нужные геокодеру (вместо SELECT *: без служебных колонок)
+_GEOCODE_ITEM_COLUMNS = "n.id, n.url, n.title, n.preview, n.date, n.category, n.lat, n.lon, n.address, c.body"
+
+def _geocode_item(row) -> Dict:
+    item = dict(zip(("id", "url", "title", "preview", "date", "category"), row[:6]))
+    item["coords"] = [row[6], row[7]] if row[6] is not None else None
+    item["address"] = row[8]
+    item["content"] = _unpack_content(row[9])
+    return item
+
+# Новость можно взять в работу: не обработана, не арендована другим воркером и пауза после ошибки прошла
+_CLAIMABLE = """
+    lat IS NULL AND address IS NULL
+    AND (lease_expires IS NULL OR lease_expires < :now)
+    AND (next_attempt_at IS NULL OR next_attempt_at <= :now)
+"""
+
+def get_uncoded_ids(limit: int = 200) -> List[int]:
+    """ID новостей, которые можно взять в работу, свежие первыми (по частичному индексу idx_uncoded)"""
+    with read_scope() as conn:
+        rows = conn.execute(f"""
+            SELECT id FROM news WHERE {_CLAIMABLE}
+            ORDER BY date DESC, id DESC LIMIT :limit
+        """, {"now": time.time(), "limit": limit}).fetchall()
+    return [r[0] for r in rows]
+
+def claim_uncoded_news(owner: str, limit: int = 10, news_ids: List[int] = None,
+                       lease_seconds: float = None) -> List[Dict]:
+    """
+    Атомарно арендует до limit новостей для воркера owner и возвращает их (с текстом статьи).
+    news_ids — взять только из этого списка (в его порядке), иначе свежие первыми.
+    BEGIN IMMEDIATE сериализует аренду между процессами: одну новость получает один воркер.
+    Аренда снимается записью результата (update_news_content_and_coords с адресом и owner)
+    или release_news_lease; если воркер упал — истекает сама.
+    """
+    now = time.time()
+    lease_seconds = GEO_LEASE_SECONDS if lease_seconds is None else lease_seconds
+    with write_scope() as conn:
+        if news_ids is None:
+            ids = [r[0] for r in conn.execute(f"""
+                SELECT id FROM news WHERE {_CLAIMABLE}
+                ORDER BY date DESC, id DESC LIMIT :limit
+            """, {"now": now, "limit": limit})]
+        else:
+            ids = []
+            for i in range(0, len(news_ids), SQL_VARIABLES_CHUNK):
+                chunk = news_ids[i:i + SQL_VARIABLES_CHUNK]
+                params = {"now": now, **{f"id{n}": news_id for n, news_id in enumerate(chunk)}}
+                marks = ",".join(f":id{n}" for n in range(len(chunk)))
+                ids.extend(r[0] for r in conn.execute(
+                    f"SELECT id FROM news WHERE id IN ({marks}) AND {_CLAIMABLE}", params))
+            found = set(ids)
+            ids = [news_id for news_id in news_ids if news_id in found][:limit]
+        if not ids:
+            return []
+
+        marks = ",".join("?" * len(ids))
+        conn.execute(f"""
+            UPDATE news
+            SET lease_owner = ?, lease_expires = ?, geo_attempts = COALESCE(geo_attempts, 0) + 1
+            WHERE id IN ({marks})
+        """, [owner, now + lease_seconds, *ids])
+        rows = conn.execute(f"""
+            SELECT {_GEOCODE_ITEM_COLUMNS}, n.geo_attempts
+            FROM news n LEFT JOIN news_content c ON c.id = n.id
+            WHERE n.id IN ({marks})
+        """, ids).fetchall()
+
+    items = {}
+    for row in rows:
+        item = _geocode_item(row)
+        item["attempts"] = row[10]
+        items[item["id"]] = item
+    return [items[news_id] for news_id in ids]
+
+def release_news_lease(news_id: int, owner: str, failed: bool = True,
+                       retry_after: Optional[float] = None) -> bool:
+    """
+    Снимает аренду воркера owner. failed=True — попытка не удалась: следующая не раньше
+    чем через GEO_RETRY_BASE * 2^(попытки - 1) с, а после GEO_MAX_ATTEMPTS новость
+    помечается NOT_FOUND. retry_after — отложить на столько секунд, не засчитывая попытку
+    (лимит API геокодера). Возвращает False, если аренда уже не принадлежит owner.
+    """
+    now = time.time()
+    with write_scope() as conn:
+        row = conn.execute("SELECT geo_attempts FROM news WHERE id = ? AND lease_owner = ?",
+                           (news_id, owner)).fetchone()
+        if not row:
+            return False
+        attempts = row[0] or 0
+        if retry_after is not None:
+            conn.execute("""
+                UPDATE news SET lease_owner = NULL, lease_expires = NULL, next_attempt_at = ?,
+                                geo_attempts = MAX(0, geo_attempts - 1)
+                WHERE id = ?
+            """, (now + retry_after, news_id))
+        elif not failed:
+            conn.execute("UPDATE news SET lease_owner = NULL, lease_expires = NULL WHERE id = ?", (news_id,))
+        elif attempts >= GEO_MAX_ATTEMPTS:
+            logger.warning(f"Новость #{news_id}: {attempts} неудачных попыток геокодирования, больше не пробуем")
+            conn.execute("""
+                UPDATE news SET lease_owner = NULL, lease_expires = NULL, address = 'NOT_FOUND',
+                                geocoded_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            """, (news_id,))
+        else:
+            delay = min(GEO_RETRY_MAX, GEO_RETRY_BASE * 2 ** max(0, attempts - 1))
+            conn.execute("""
+                UPDATE news SET lease_owner = NULL, lease_expires = NULL, next_attempt_at = ?
+                WHERE id = ?
+            """, (now + delay, news_id))
+    return True
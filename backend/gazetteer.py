@@ -0,0 +1,254 @@
+import os
+import re
+import json
+import math
+import logging
+import threading
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+GAZETTEER_PATH = os.getenv("GAZETTEER_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "streets.json"))
+DEFAULT_CITY = "Архангельск"
+# Город по слову адреса ("в Северодвинске", "Архангельск,")
+CITY_PREFIXES = (("северодвинск", "Северодвинск"), ("архангельск", "Архангельск"))
+# Ответ геокодера дальше этого от центра улицы считаем ошибкой и домом не запоминаем
+MAX_HOUSE_DISTANCE_KM = 8.0
+
+# Слова и номера домов ("95", "12а", "1/2") или порядковые части названий ("23-й")
+TOKEN_RE = re.compile(r"\d+(?:-[а-я]{1,2}|[а-я](?![а-я]))?(?:/\d+)?|[а-яa-z]+(?:-[а-яa-z]+)*")
+HOUSE_RE = re.compile(r"^\d+[а-я]?(?:/\d+)?$")
+YEAR_RE = re.compile(r"^(19|20)\d{2}$")
+
+# Тип улицы по слову адреса: сокращение целиком или начало полного слова
+TYPE_ABBREVIATIONS = {"ул": "улица", "пр": "проспект", "пр-т": "проспект", "пр-кт": "проспект", "наб": "набережная",
+                      "пер": "переулок", "пл": "площадь", "ш": "шоссе"}
+TYPE_PREFIXES = (("улиц", "улица"), ("проспект", "проспект"), ("набережн", "набережная"), ("переул", "переулок"),
+                 ("площад", "площадь"), ("шоссе", "шоссе"), ("проезд", "проезд"), ("алле", "аллея"))
+# Слова между названием и номером дома: "у дома №441 на", "д. 5"
+FILLER_WORDS = frozenset(("д", "дом", "дома", "доме", "у", "по", "на", "в", "около", "возле"))
+# Объект перед названием ("ТЦ Троицкий", "театр Ломоносова"): это не улица, координаты её центра не подходят
+POI_ABBREVIATIONS = frozenset(("тц", "трц", "тк", "дк", "жк", "кц", "мфц"))
+POI_PREFIXES = ("театр", "кинотеатр", "парк", "сквер", "стадион", "музе", "библиотек", "школ", "гимнази",
+                "лице", "колледж", "университет", "институт", "больниц", "поликлиник", "магазин", "кафе",
+                "ресторан", "гостиниц", "отел", "центр", "комплекс", "клуб", "церк", "храм", "собор")
+
+PRECISION_HOUSE = "house"
+PRECISION_STREET = "street"
+
+
+class Street(NamedTuple):
+    name: str
+    type: str
+    city: str
+    centroid: Tuple[float, float]
+    houses: Dict[str, Tuple[float, float]]
+
+    @property
+    def full_name(self) -> str:
+        return f"{self.city}, {self.type} {self.name}"
+
+
+class GazetteerMatch(NamedTuple):
+    street: Street
+    house: Optional[str]
+    coords: Optional[List[float]]
+    precision: Optional[str]
+
+    @property
+    def resolved(self) -> bool:
+        """Дом найден в справочнике, либо в адресе нет номера дома и хватает центра улицы"""
+        return self.coords is not None
+
+
+def distance_km(a, b) -> float:
+    lat = math.radians((a[0] + b[0]) / 2)
+    return math.hypot((a[0] - b[0]) * 111.2, (a[1] - b[1]) * 111.2 * math.cos(lat))
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_RE.findall((text or "").lower().replace("ё", "е"))
+
+
+def street_type(token: str) -> Optional[str]:
+    if token in TYPE_ABBREVIATIONS:
+        return TYPE_ABBREVIATIONS[token]
+    for prefix, kind in TYPE_PREFIXES:
+        if token.startswith(prefix):
+            return kind
+    return None
+
+
+def named_city(tokens: List[str]) -> Optional[str]:
+    """Город, названный в адресе; None — город не указан"""
+    for token in tokens:
+        for prefix, city in CITY_PREFIXES:
+            if token.startswith(prefix):
+                return city
+    return None
+
+
+def city_of(tokens: List[str], default: str = DEFAULT_CITY) -> str:
+    return named_city(tokens) or default
+
+
+def is_poi(token: str) -> bool:
+    return token in POI_ABBREVIATIONS or token.startswith(POI_PREFIXES)
+
+
+def find_house(tokens: List[str], start: int, end: int) -> Optional[str]:
+    """Номер дома рядом с названием tokens[start:end]: сразу после него (через служебные слова), иначе перед ним"""
+    for positions in (range(end, len(tokens)), range(start - 1, -1, -1)):
+        for i in positions:
+            token = tokens[i]
+            if HOUSE_RE.match(token):
+                return None if YEAR_RE.match(token) else token
+            if token not in FILLER_WORDS and street_type(token) is None:
+                break
+    return None
+
+
+class TokenTrie:
+    """
+    Префиксное дерево по словам: узлы — словари переходов в общем списке, значения — в параллельном.
+    Ищет самое длинное название, начинающееся с данной позиции адреса.
+    """
+
+    def __init__(self):
+        self._children: List[Dict[str, int]] = [{}]
+        self._values: List[Optional[List[int]]] = [None]
+
+    def add(self, tokens: List[str], value: int):
+        node = 0
+        for token in tokens:
+            child = self._children[node].get(token)
+            if child is None:
+                child = len(self._children)
+                self._children.append({})
+                self._values.append(None)
+                self._children[node][token] = child
+            node = child
+        if self._values[node] is None:
+            self._values[node] = []
+        if value not in self._values[node]:
+            self._values[node].append(value)
+
+    def longest_match(self, tokens: List[str], start: int) -> Tuple[int, Optional[List[int]]]:
+        """(конец совпадения, значения) для самого длинного ключа с позиции start; (start, None) — нет"""
+        node, end, values = 0, start, None
+        for i in range(start, len(tokens)):
+            node = self._children[node].get(tokens[i])
+            if node is None:
+                break
+            if self._values[node]:
+                end, values = i + 1, self._values[node]
+        return end, values
+
+    def __len__(self):
+        return len(self._children)
+
+
+class Gazetteer:
+    """
+    Локальный справочник улиц: формы названий (все падежи) в TokenTrie, центр улицы и
+    координаты известных домов. Позволяет не ходить в Яндекс за адресами знакомых улиц.
+    """
+
+    def __init__(self, streets: List[Street], forms: List[List[str]], default_city: str = DEFAULT_CITY):
+        self.streets = streets
+        self.default_city = default_city
+        self._lock = threading.Lock()
+        self.trie = TokenTrie()
+        for index, street_forms in enumerate(forms):
+            for form in street_forms:
+                self.trie.add(tokenize(form), index)
+
+    @classmethod
+    def load(cls, path: str = GAZETTEER_PATH) -> "Gazetteer":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        streets, forms = [], []
+        for entry in data["streets"]:
+            houses = {house.lower(): tuple(coords) for house, coords in (entry.get("houses") or {}).items()}
+            streets.append(Street(entry["name"], entry["type"], entry["city"], tuple(entry["centroid"]), houses))
+            forms.append(entry.get("forms") or [entry["name"]])
+        logger.info(f"[GAZETTEER] Загружено улиц: {len(streets)} ({path})")
+        return cls(streets, forms)
+
+    def _find_name(self, tokens: List[str]) -> Tuple[int, int, Optional[List[int]]]:
+        best = (0, 0, None)
+        for start in range(len(tokens)):
+            end, values = self.trie.longest_match(tokens, start)
+            if values and end - start > best[1] - best[0]:
+                best = (start, end, values)
+        return best
+
+    def _choose(self, candidates: List[int], kinds: set, city: Optional[str]) -> Optional[Street]:
+        streets = [self.streets[i] for i in candidates]
+        if kinds:
+            typed = [s for s in streets if s.type in kinds]
+            # Тип указан, но такой улицы с этим названием нет ("сквер Победы") — не угадываем
+            if not typed:
+                return None
+            streets = typed
+        if city is not None:
+            # Город назван — улицу с тем же названием в другом городе не подставляем
+            streets = [s for s in streets if s.city == city]
+        else:
+            streets = [s for s in streets if s.city == self.default_city] or streets
+        # Без указания типа "Ломоносова" одинаково может быть проспектом и улицей
+        return streets[0] if len(streets) == 1 else None
+
+    def match(self, address: str) -> Optional[GazetteerMatch]:
+        """
+        Улица и номер дома из адреса (в любом падеже, с мусором вокруг, как его отдаёт extract_address).
+        coords — дом из справочника, центр улицы (если в адресе нет номера) или None, если дом
+        справочнику не известен. None — улица не найдена или неоднозначна.
+        """
+        tokens = tokenize(address)
+        start, end, candidates = self._find_name(tokens)
+        if not candidates:
+            return None
+        # "ТЦ Троицкий", "театр Ломоносова" — объект, названный по улице, а не сама улица
+        if start > 0 and is_poi(tokens[start - 1]):
+            return None
+        rest = tokens[:start] + tokens[end:]
+        kinds = {kind for kind in map(street_type, rest) if kind}
+        # Без типа улицы название должно быть всем адресом (кроме номера дома, служебных слов и города):
+        # иначе "Троицкий" может оказаться частью чего угодно
+        if not kinds and not all(HOUSE_RE.match(t) or t in FILLER_WORDS or named_city([t]) for t in rest):
+            return None
+        street = self._choose(candidates, kinds, named_city(tokens))
+        if street is None:
+            return None
+
+        house = find_house(tokens, start, end)
+        if house is None:
+            return GazetteerMatch(street, None, list(street.centroid), PRECISION_STREET)
+        coords = street.houses.get(house)
+        if coords is None:
+            return GazetteerMatch(street, house, None, None)
+        return GazetteerMatch(street, house, list(coords), PRECISION_HOUSE)
+
+    def learn(self, match: GazetteerMatch, coords: List[float]) -> bool:
+        """
+        Запоминает дом, который справочник не знал, по ответу геокодера: другие написания того же
+        адреса дальше разрешаются локально. False — ответ слишком далеко от улицы (не запомнен).
+        """
+        if match.house is None or distance_km(coords, match.street.centroid) > MAX_HOUSE_DISTANCE_KM:
+            return False
+        with self._lock:
+            match.street.houses[match.house] = (coords[0], coords[1])
+        return True
+
+
+def load_default() -> Optional[Gazetteer]:
+    """Справочник из GAZETTEER_PATH; None, если файла нет или он битый (геокодер работает без него)"""
+    if not os.path.exists(GAZETTEER_PATH):
+        return None
+    try:
+        return Gazetteer.load(GAZETTEER_PATH)
+    except Exception as e:
+        logger.error(f"[GAZETTEER] Не удалось загрузить {GAZETTEER_PATH}: {e}")
+        return None
@@ -0,0 +1,210 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional, List, NamedTuple, Dict
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+CACHE_DB_PATH = "geo_cache.db"
+LEGACY_JSON_PATH = "geo_cache.json"
+MEMORY_CACHE_SIZE = 5000
+
+# Статусы записей кэша
+STATUS_OK = "ok"
+STATUS_NOT_FOUND = "not_found"
+STATUS_HTTP_ERROR = "http_error"
+STATUS_CONNECTION = "connection"
+
+
+class CacheEntry(NamedTuple):
+    coords: Optional[List[float]]
+    status: str
+    expires_at: Optional[float]
+
+    @property
+    def is_negative(self) -> bool:
+        return self.status != STATUS_OK
+
+    def expired(self, now: float) -> bool:
+        return self.expires_at is not None and self.expires_at <= now
+
+
+class GeoCacheStore:
+    """
+    Кэш геокодера: SQLite-хранилище, общее для всех процессов (main.py, run_geocoder.py),
+    плюс ограниченный LRU-кэш в памяти процесса.
+    Каждая запись — один INSERT OR REPLACE, без перезаписи всего файла.
+    Помимо найденных координат хранит негативные записи (адрес не найден, ошибка HTTP,
+    обрыв соединения) со сроком жизни, чтобы не повторять заведомо безуспешные запросы.
+    """
+
+    def __init__(self, db_path: str = CACHE_DB_PATH, legacy_json_path: Optional[str] = LEGACY_JSON_PATH,
+                 memory_size: int = MEMORY_CACHE_SIZE):
+        self.db_path = db_path
+        self.memory_size = memory_size
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._stats = {"hits": 0, "misses": 0, "negative_hits": 0}
+        self._init_db()
+        if legacy_json_path:
+            self.import_json(legacy_json_path)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # isolation_level=None: каждая одиночная запись атомарна сама по себе,
+            # а пакетные операции явно открывают транзакцию
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    def _init_db(self):
+        conn = self._conn()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS geo_cache (
+                query TEXT PRIMARY KEY,
+                lat REAL,
+                lon REAL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        try: conn.execute("ALTER TABLE geo_cache ADD COLUMN status TEXT DEFAULT 'ok'")
+        except Exception: pass
+        try: conn.execute("ALTER TABLE geo_cache ADD COLUMN expires_at REAL")
+        except Exception: pass
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS geo_cache_meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            )
+        """)
+
+    def _remember(self, key: str, value):
+        with self._lock:
+            self._memory[key] = value
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_size:
+                self._memory.popitem(last=False)
+
+    def _count(self, stat: str):
+        with self._lock:
+            self._stats[stat] += 1
+
+    def lookup(self, key: str, count: bool = True) -> Optional[CacheEntry]:
+        """Возвращает актуальную запись (положительную или негативную) или None.
+        count=False — служебная проверка, в статистику попаданий не идёт."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry.expired(now):
+                    del self._memory[key]
+                    entry = None
+                else:
+                    self._memory.move_to_end(key)
+
+        if entry is None:
+            row = self._conn().execute(
+                "SELECT lat, lon, status, expires_at FROM geo_cache WHERE query = ?", (key,)
+            ).fetchone()
+            if row:
+                status = row[2] or STATUS_OK
+                coords = [row[0], row[1]] if status == STATUS_OK else None
+                entry = CacheEntry(coords, status, row[3])
+                if entry.expired(now):
+                    entry = None
+                else:
+                    self._remember(key, entry)
+
+        if count:
+            self._count("misses" if entry is None else "negative_hits" if entry.is_negative else "hits")
+        return entry
+
+    def get(self, key: str) -> Optional[List[float]]:
+        entry = self.lookup(key)
+        if entry is None or entry.is_negative:
+            return None
+        return entry.coords
+
+    def _write(self, key: str, entry: CacheEntry):
+        lat, lon = entry.coords if entry.coords else (None, None)
+        try:
+            self._conn().execute(
+                "INSERT OR REPLACE INTO geo_cache (query, lat, lon, updated_at, status, expires_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, lat, lon, time.time(), entry.status, entry.expires_at)
+            )
+        except Exception as e:
+            logger.error(f"[CACHE] Ошибка сохранения: {e}")
+        self._remember(key, entry)
+
+    def set(self, key: str, coords: List[float]):
+        self._write(key, CacheEntry(coords, STATUS_OK, None))
+
+    def set_negative(self, key: str, status: str, ttl: float):
+        """Запоминает неудачу геокодирования на ttl секунд."""
+        if ttl <= 0:
+            return
+        self._write(key, CacheEntry(None, status, time.time() + ttl))
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._memory)
+        return stats
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def __len__(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM geo_cache WHERE status IS NULL OR status = 'ok'").fetchone()[0]
+
+    def import_json(self, json_path: str) -> int:
+        """Однократный импорт старого geo_cache.json. Повторные вызовы ничего не делают."""
+        if not os.path.exists(json_path):
+            return 0
+        conn = self._conn()
+        meta_key = f"imported:{os.path.abspath(json_path)}"
+        if conn.execute("SELECT 1 FROM geo_cache_meta WHERE key = ?", (meta_key,)).fetchone():
+            return 0
+
+        try:
+            with open(json_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            logger.error(f"[CACHE] Не удалось прочитать {json_path}: {e}")
+            return 0
+
+        now = time.time()
+        rows = [
+            (query, coords[0], coords[1], now, STATUS_OK)
+            for query, coords in data.items()
+            if isinstance(coords, list) and len(coords) == 2
+        ]
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Ещё раз проверяем под блокировкой: другой процесс мог импортировать одновременно с нами
+            if conn.execute("SELECT 1 FROM geo_cache_meta WHERE key = ?", (meta_key,)).fetchone():
+                conn.execute("ROLLBACK")
+                return 0
+            # OR IGNORE: записи, уже полученные от Яндекса, свежее старого файла
+            conn.executemany(
+                "INSERT OR IGNORE INTO geo_cache (query, lat, lon, updated_at, status) VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+            conn.execute("INSERT INTO geo_cache_meta (key, value) VALUES (?, ?)", (meta_key, str(now)))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        logger.info(f"[CACHE] Импортировано {len(rows)} записей из {json_path}")
+        return len(rows)
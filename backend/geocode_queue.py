@@ -0,0 +1,71 @@
+import heapq
+import threading
+import time
+from typing import Iterable, List
+
+# Приоритеты: меньше — раньше. Свежие новости (только что из RSS или сброшенные админом)
+# обрабатываются раньше накопленного хвоста, найденного SQL-сканированием.
+PRIORITY_FRESH = 0
+PRIORITY_BACKLOG = 1
+
+
+class GeocodeQueue:
+    """
+    Очередь ID новостей на геокодирование внутри процесса.
+    Внутри одного приоритета первыми идут более новые новости (больший id); повторный push
+    уже стоящего в очереди id только повышает его приоритет.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._queued = {}
+        self._cond = threading.Condition()
+
+    def push(self, news_ids: Iterable[int], priority: int = PRIORITY_FRESH) -> int:
+        """Ставит новости в очередь; возвращает число добавленных (или повышенных) id"""
+        added = 0
+        with self._cond:
+            for news_id in news_ids:
+                current = self._queued.get(news_id)
+                if current is not None and current <= priority:
+                    continue
+                # Старая запись с худшим приоритетом останется в куче и будет пропущена в pop_batch
+                self._queued[news_id] = priority
+                heapq.heappush(self._heap, (priority, -news_id))
+                added += 1
+            if added:
+                self._cond.notify_all()
+        return added
+
+    def pop_batch(self, max_items: int, timeout: float = None) -> List[int]:
+        """
+        Забирает до max_items id в порядке приоритета. Если очередь пуста, ждёт до timeout секунд
+        (None — без ограничения) и возвращает [] по истечении.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while not self._queued:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return []
+                self._cond.wait(remaining)
+
+            batch = []
+            while self._heap and len(batch) < max_items:
+                priority, neg_id = heapq.heappop(self._heap)
+                if self._queued.get(-neg_id) != priority:
+                    continue
+                del self._queued[-neg_id]
+                batch.append(-neg_id)
+            return batch
+
+    def __len__(self):
+        with self._cond:
+            return len(self._queued)
+
+    def __contains__(self, news_id: int):
+        with self._cond:
+            return news_id in self._queued
+
+
+geocode_queue = GeocodeQueue()
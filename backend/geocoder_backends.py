@@ -0,0 +1,197 @@
+import os
+import json
+import logging
+from typing import Dict, List, NamedTuple, Optional, Sequence, Union
+
+import requests
+
+from geo_cache import STATUS_OK, STATUS_NOT_FOUND, STATUS_HTTP_ERROR, STATUS_CONNECTION
+from rate_limiter import RateLimiter, RateLimited
+
+# Отключаем прокси для всех запросов
+_session = requests.Session()
+_session.verify = False
+_session.trust_env = False
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+GEOCODER_API_KEY = os.getenv("GEOCODER_API_KEY", "686e5b6d-df4e-49de-a918-317aa589c34c")
+# Адрес API: для тестов и бенчмарков подменяется локальной заглушкой (tests/stub_servers.py)
+GEOCODER_URL = os.getenv("GEOCODER_URL", "https://geocode-maps.yandex.ru/1.x/")
+ARKH_OBLAST_BBOX = "35.5,62.8~49.0,67.5"
+GEOCODER_ATTEMPTS = 3
+# Источники координат по порядку опроса, через запятую: "yandex", "yandex:<url>", "table:<путь к JSON>"
+GEOCODER_BACKENDS = os.getenv("GEOCODER_BACKENDS", "yandex")
+
+
+class GeocodeAnswer(NamedTuple):
+    coords: Optional[List[float]]
+    # Статус записи кэша (geo_cache.STATUS_*): по нему SimpleGeocoder выбирает срок жизни
+    status: str
+    source: str
+
+
+# Ответ на один адрес пачки: ответ, None (источник адреса не знает) или исключение
+LookupResult = Union[Optional[GeocodeAnswer], Exception]
+
+
+class GeocoderBackend:
+    """
+    Источник координат по каноническому адресу ("Архангельск, улица Тимме, 33").
+    lookup -> GeocodeAnswer, None — адрес этому источнику неизвестен (спросить следующий в цепочке).
+    Кэш, объединение одинаковых запросов и справочник улиц — в SimpleGeocoder, не здесь.
+    """
+
+    name = "backend"
+
+    def lookup(self, query: str) -> Optional[GeocodeAnswer]:
+        raise NotImplementedError
+
+    def lookup_many(self, queries: Sequence[str]) -> List[LookupResult]:
+        """Пачка адресов; ошибка одного не прерывает остальные. По умолчанию — по одному."""
+        results = []
+        for query in queries:
+            try:
+                results.append(self.lookup(query))
+            except Exception as e:
+                results.append(e)
+        return results
+
+
+class YandexBackend(GeocoderBackend):
+    """HTTP Геокодер Яндекса (или совместимая заглушка по url) с общим RateLimiter и повторами после 429/5xx"""
+
+    name = "yandex"
+
+    def __init__(self, rate_limiter: RateLimiter, url: Optional[str] = None, api_key: str = GEOCODER_API_KEY,
+                 bbox: str = ARKH_OBLAST_BBOX, attempts: int = GEOCODER_ATTEMPTS):
+        self.rate_limiter = rate_limiter
+        self.url = url or GEOCODER_URL
+        self.api_key = api_key
+        self.bbox = bbox
+        self.attempts = attempts
+
+    def request_url(self, query: str) -> str:
+        return (
+            f"{self.url}?apikey={self.api_key}"
+            f"&geocode={requests.utils.quote(query)}&format=json&results=1"
+            f"&bbox={self.bbox}&rspn=1"
+        )
+
+    @staticmethod
+    def parse(payload: dict) -> Optional[List[float]]:
+        """Координаты [lat, lon] первого объекта ответа; None — ничего не найдено"""
+        members = payload["response"]["GeoObjectCollection"]["featureMember"]
+        if not members:
+            return None
+        lon, lat = map(float, members[0]["GeoObject"]["Point"]["pos"].split())
+        return [lat, lon]
+
+    def lookup(self, query: str) -> GeocodeAnswer:
+        """
+        Ответ Яндекса или статус неудачи (not_found, http_error, connection). RateLimited — запрос
+        сейчас невозможен (квота или бэкофф после 429/5xx), адрес тут ни при чём.
+        """
+        url = self.request_url(query)
+        status = None
+        for attempt in range(self.attempts):
+            # Ждёт токен и паузу после 429/5xx; если ждать слишком долго — RateLimited наружу
+            self.rate_limiter.acquire()
+            try:
+                response = _session.get(url, timeout=15)
+            except Exception as e:
+                logger.warning(f"[YANDEX] Попытка {attempt+1}/{self.attempts} ❌ Ошибка соединения (возможно SSL разрыв): {e}")
+                status = STATUS_CONNECTION
+                self.rate_limiter.report(None)
+                continue
+
+            self.rate_limiter.report(response.status_code, response.headers.get("Retry-After"))
+            if response.status_code == 429 or response.status_code >= 500:
+                logger.warning(f"[YANDEX] Попытка {attempt+1}/{self.attempts} ❌ HTTP {response.status_code}")
+                status = STATUS_HTTP_ERROR
+                continue
+            if response.status_code != 200:
+                logger.error(f"[YANDEX] ❌ HTTP {response.status_code}")
+                return GeocodeAnswer(None, STATUS_HTTP_ERROR, self.name)
+
+            coords = self.parse(response.json())
+            # Яндекс ничего не нашел - нет смысла повторять
+            return GeocodeAnswer(coords, STATUS_OK if coords else STATUS_NOT_FOUND, self.name)
+
+        if status == STATUS_HTTP_ERROR and response.status_code == 429:
+            raise RateLimited("Яндекс отвечает 429", max(1.0, self.rate_limiter.retry_in()))
+        return GeocodeAnswer(None, status, self.name)
+
+
+class TableBackend(GeocoderBackend):
+    """
+    Готовые ответы: канонический адрес -> [lat, lon] или null (адрес заведомо не находится).
+    Для бенчмарков, записанных ответов и ручных поправок перед удалённым геокодером.
+    """
+
+    name = "table"
+
+    def __init__(self, table: Dict[str, Optional[List[float]]]):
+        self.table = table
+
+    @classmethod
+    def load(cls, path: str) -> "TableBackend":
+        with open(path, "r", encoding="utf-8") as f:
+            table = json.load(f)
+        logger.info(f"[GEOCODER] Таблица адресов: {len(table)} ({path})")
+        return cls(table)
+
+    def lookup(self, query: str) -> Optional[GeocodeAnswer]:
+        if query not in self.table:
+            return None
+        coords = self.table[query]
+        if coords is None:
+            return GeocodeAnswer(None, STATUS_NOT_FOUND, self.name)
+        return GeocodeAnswer([coords[0], coords[1]], STATUS_OK, self.name)
+
+
+class ChainBackend(GeocoderBackend):
+    """Источники по очереди: отвечает первый, кому адрес известен (например, таблица, затем Яндекс)"""
+
+    name = "chain"
+
+    def __init__(self, backends: List[GeocoderBackend]):
+        self.backends = backends
+
+    def lookup(self, query: str) -> Optional[GeocodeAnswer]:
+        for backend in self.backends:
+            answer = backend.lookup(query)
+            if answer is not None:
+                return answer
+        return None
+
+    def lookup_many(self, queries: Sequence[str]) -> List[LookupResult]:
+        """Каждый источник получает одной пачкой всё, на что не ответили предыдущие"""
+        results: List[LookupResult] = [None] * len(queries)
+        pending = list(range(len(queries)))
+        for backend in self.backends:
+            if not pending:
+                break
+            answers = backend.lookup_many([queries[i] for i in pending])
+            for i, answer in zip(pending, answers):
+                results[i] = answer
+            pending = [i for i, answer in zip(pending, answers) if answer is None]
+        return results
+
+
+def make_backend(spec: str, rate_limiter: RateLimiter) -> GeocoderBackend:
+    """
+    Источник по описанию из GEOCODER_BACKENDS: "yandex", "yandex:http://127.0.0.1:8081/1.x/",
+    "table:data/addresses.json,yandex" (несколько через запятую — ChainBackend в этом порядке).
+    """
+    backends = []
+    for part in spec.split(","):
+        name, _, arg = part.strip().partition(":")
+        if name == YandexBackend.name:
+            backends.append(YandexBackend(rate_limiter, url=arg or None))
+        elif name == TableBackend.name:
+            backends.append(TableBackend.load(arg))
+        else:
+            raise ValueError(f"Неизвестный источник геокодера: {part!r}")
+    return backends[0] if len(backends) == 1 else ChainBackend(backends)
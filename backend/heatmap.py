@@ -0,0 +1,217 @@
+import base64
+import math
+import threading
+import time
+from datetime import date
+from functools import lru_cache
+from typing import Dict, Optional
+
+import numpy as np
+
+import database
+from classifier import DEFAULT_CATEGORY
+from geocoder_backends import ARKH_OBLAST_BBOX
+
+DEFAULT_WIDTH = 256
+DEFAULT_HEIGHT = 210
+MAX_SIDE = 1024
+MAX_SIGMA = 16.0
+# Массив точек перечитывается из БД в фоне и не чаще раза в REFRESH_INTERVAL секунд:
+# геокодер пишет каждые несколько секунд, а тепловой карте задержка в пару секунд не важна
+REFRESH_INTERVAL = 5.0
+
+EPOCH = date(1970, 1, 1)
+
+
+def _parse_bbox(bbox: str):
+    """"lon1,lat1~lon2,lat2" (формат Яндекса) -> (min_lat, max_lat, min_lon, max_lon)"""
+    (lon1, lat1), (lon2, lat2) = (map(float, corner.split(",")) for corner in bbox.split("~"))
+    return min(lat1, lat2), max(lat1, lat2), min(lon1, lon2), max(lon1, lon2)
+
+
+BBOX = _parse_bbox(ARKH_OBLAST_BBOX)
+
+
+def mercator_y(lat):
+    """Ордината Web Mercator (в радианах); строки сетки равномерны по ней, как пиксели карты"""
+    return np.arcsinh(np.tan(np.radians(lat)))
+
+
+def day_number(value: str) -> int:
+    """"YYYY-MM-DD" -> номер дня от 1970-01-01 (ValueError для некорректной даты)"""
+    return (date.fromisoformat(value[:10]) - EPOCH).days
+
+
+def _safe_day_number(value: str) -> int:
+    # Неразборчивая дата -> самый ранний день: точка попадает только в запросы без date_from
+    try:
+        return day_number(value)
+    except ValueError:
+        return np.iinfo(np.int32).min
+
+
+class PointArrays:
+    """Координаты, даты и категории всех геокодированных новостей в виде массивов NumPy"""
+
+    def __init__(self, x: np.ndarray, y: np.ndarray, day: np.ndarray, category: np.ndarray, categories: list):
+        self.x = x
+        self.y = y
+        self.day = day
+        self.category = category
+        self.categories = categories
+
+    @classmethod
+    def load(cls) -> "PointArrays":
+        """Одно чтение покрывающего индекса idx_news_points; строки идут группами по категориям"""
+        with database.read_scope() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = None
+            runs = cursor.execute("""
+                SELECT category, COUNT(*) FROM news WHERE lat IS NOT NULL
+                GROUP BY category ORDER BY category
+            """).fetchall()
+            rows = cursor.execute("""
+                SELECT date, lon, lat FROM news INDEXED BY idx_news_points
+                WHERE lat IS NOT NULL ORDER BY category
+            """).fetchall()
+        if not rows:
+            empty = np.empty(0)
+            return cls(empty, empty, empty.astype(np.int32), empty.astype(np.int16), [])
+
+        table = np.array(rows, dtype=[("date", "U10"), ("lon", np.float64), ("lat", np.float64)])
+        # Разных дат мало: разбираем каждую один раз
+        unique_dates, date_index = np.unique(table["date"], return_inverse=True)
+        unique_days = np.array([_safe_day_number(d) for d in unique_dates], dtype=np.int32)
+        categories = [name or DEFAULT_CATEGORY for name, _ in runs]
+        return cls(
+            x=np.radians(table["lon"]),
+            y=mercator_y(table["lat"]),
+            day=unique_days[date_index],
+            category=np.repeat(np.arange(len(runs), dtype=np.int16), [count for _, count in runs]),
+            categories=categories,
+        )
+
+    def __len__(self):
+        return len(self.x)
+
+
+class PointCache:
+    """
+    Массивы точек, перечитываемые при смене database.data_version().
+    Первая загрузка синхронная; дальше запрос получает текущие массивы, а свежие
+    читаются в фоновом потоке (не чаще REFRESH_INTERVAL), так что чтение БД не попадает в ответ.
+    """
+
+    def __init__(self, refresh_interval: float = REFRESH_INTERVAL):
+        self.refresh_interval = refresh_interval
+        self._points: Optional[PointArrays] = None
+        self._version = None
+        self._loaded_at = 0.0
+        self._refreshing = False
+        self._lock = threading.Lock()
+
+    def _load(self, version):
+        try:
+            points = PointArrays.load()
+            with self._lock:
+                self._points, self._version, self._loaded_at = points, version, time.monotonic()
+        finally:
+            self._refreshing = False
+
+    def get(self) -> PointArrays:
+        version = database.data_version()
+        with self._lock:
+            points = self._points
+            stale = version != self._version and time.monotonic() - self._loaded_at >= self.refresh_interval
+            if points is not None and (not stale or self._refreshing):
+                return points
+            self._refreshing = True
+        if points is None:
+            self._load(version)
+            return self._points
+        threading.Thread(target=self._load, args=(version,), daemon=True).start()
+        return points
+
+
+point_cache = PointCache()
+
+
+@lru_cache(maxsize=32)
+def blur_matrix(size: int, sigma: float) -> np.ndarray:
+    """
+    Матрица одномерного гауссова размытия size x size (ядро обрезано на 3 sigma, края — нулевые).
+    Размытие сетки по обеим осям — два матричных умножения, их делает BLAS.
+    """
+    radius = max(1, int(math.ceil(3 * sigma)))
+    offsets = np.arange(size)[:, None] - np.arange(size)[None, :]
+    matrix = np.exp(-0.5 * (offsets / sigma) ** 2)
+    matrix[np.abs(offsets) > radius] = 0.0
+    norm = np.exp(-0.5 * (np.arange(-radius, radius + 1) / sigma) ** 2).sum()
+    return (matrix / norm).astype(np.float32)
+
+
+def smooth(grid: np.ndarray, sigma: float) -> np.ndarray:
+    """Сепарабельное гауссово размытие: по столбцам, затем по строкам"""
+    height, width = grid.shape
+    return blur_matrix(height, sigma) @ grid @ blur_matrix(width, sigma)
+
+
+def density_grid(points: PointArrays, width: int, height: int, category: Optional[str] = None,
+                 day_from: Optional[int] = None, day_to: Optional[int] = None, sigma: float = 0.0):
+    """
+    Сетка height x width с числом новостей в ячейке (строка 0 — север), по желанию сглаженная,
+    и число попавших в неё новостей
+    """
+    min_lat, max_lat, min_lon, max_lon = BBOX
+    x0, x1 = math.radians(min_lon), math.radians(max_lon)
+    y0, y1 = float(mercator_y(min_lat)), float(mercator_y(max_lat))
+
+    mask = (points.x >= x0) & (points.x < x1) & (points.y > y0) & (points.y <= y1)
+    if category is not None:
+        codes = [code for code, name in enumerate(points.categories) if name == category]
+        mask &= np.isin(points.category, codes)
+    if day_from is not None:
+        mask &= points.day >= day_from
+    if day_to is not None:
+        mask &= points.day <= day_to
+
+    col = ((points.x[mask] - x0) * (width / (x1 - x0))).astype(np.int64)
+    row = ((y1 - points.y[mask]) * (height / (y1 - y0))).astype(np.int64)
+    np.clip(col, 0, width - 1, out=col)
+    np.clip(row, 0, height - 1, out=row)
+    grid = np.bincount(row * width + col, minlength=width * height).reshape(height, width).astype(np.float32)
+    if sigma > 0:
+        grid = smooth(grid, sigma)
+    return grid, len(col)
+
+
+def build_heatmap(category: Optional[str] = None, date_from: Optional[str] = None, date_to: Optional[str] = None,
+                  width: int = DEFAULT_WIDTH, height: int = DEFAULT_HEIGHT, sigma: float = 0.0) -> Dict:
+    """
+    Тепловая карта новостей над ARKH_OBLAST_BBOX.
+    data — base64 от height x width байт (uint8, построчно с севера), 255 соответствует max новостей в ячейке.
+    ValueError — для некорректных дат или размеров.
+    """
+    if not (1 <= width <= MAX_SIDE and 1 <= height <= MAX_SIDE):
+        raise ValueError(f"Размер сетки должен быть от 1 до {MAX_SIDE}")
+    if not 0 <= sigma <= MAX_SIGMA:
+        raise ValueError(f"sigma должна быть от 0 до {MAX_SIGMA}")
+    day_from = day_number(date_from) if date_from else None
+    day_to = day_number(date_to) if date_to else None
+    category = category.lower() if category and category.lower() != "все" else None
+
+    points = point_cache.get()
+    grid, count = density_grid(points, width, height, category, day_from, day_to, sigma)
+    peak = float(grid.max()) if grid.size else 0.0
+    scaled = np.rint(grid * (255.0 / peak)) if peak > 0 else grid
+    min_lat, max_lat, min_lon, max_lon = BBOX
+    return {
+        "bbox": {"min_lat": min_lat, "max_lat": max_lat, "min_lon": min_lon, "max_lon": max_lon},
+        "projection": "EPSG:3857",
+        "width": width,
+        "height": height,
+        "max": round(peak, 3),
+        "count": count,
+        "dtype": "uint8",
+        "data": base64.b64encode(scaled.astype(np.uint8).tobytes()).decode("ascii"),
+    }
@@ -0,0 +1,109 @@
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urlsplit
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+FETCH_WORKERS = 8
+FETCH_PER_HOST = 4
+FETCH_MAX_PENDING = 32
+
+
+class HostLimiter:
+    """Ограничивает число одновременных запросов к одному хосту."""
+
+    def __init__(self, per_host: int = FETCH_PER_HOST):
+        self.per_host = per_host
+        self._semaphores: Dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    def _semaphore(self, url: Optional[str]) -> threading.BoundedSemaphore:
+        host = urlsplit(url or "").netloc.lower()
+        with self._lock:
+            sem = self._semaphores.get(host)
+            if sem is None:
+                sem = self._semaphores[host] = threading.BoundedSemaphore(self.per_host)
+            return sem
+
+    @contextmanager
+    def slot(self, url: Optional[str]):
+        sem = self._semaphore(url)
+        sem.acquire()
+        try:
+            yield
+        finally:
+            sem.release()
+
+
+class FetchPool:
+    """
+    Пул потоков для сетевых стадий загрузки (картинки, HTML статей).
+    - не больше per_host одновременных запросов к одному хосту;
+    - не больше max_pending задач в полёте (остальные ждут своей очереди, память не растёт);
+    - таймаут на всю стадию: что не успело — получает значение по умолчанию.
+    """
+
+    def __init__(self, max_workers: int = FETCH_WORKERS, per_host: int = FETCH_PER_HOST,
+                 max_pending: int = FETCH_MAX_PENDING):
+        self.max_pending = max(1, max_pending)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="fetch")
+        self._hosts = HostLimiter(per_host)
+
+    def _run(self, fn: Callable, item, url: Optional[str]):
+        with self._hosts.slot(url):
+            return fn(item)
+
+    def map(self, fn: Callable, items: List, url_of: Callable = lambda item: item,
+            timeout: Optional[float] = None, default=None, stage: str = "fetch") -> List:
+        """Применяет fn к каждому элементу параллельно, сохраняя порядок результатов."""
+        results = [default] * len(items)
+        if not items:
+            return results
+
+        deadline = time.monotonic() + timeout if timeout else None
+        queue = iter(enumerate(items))
+        pending = {}
+        exhausted = False
+        completed = 0
+
+        while True:
+            # Досылаем задачи, пока не упёрлись в лимит "в полёте"
+            while not exhausted and len(pending) < self.max_pending:
+                try:
+                    index, item = next(queue)
+                except StopIteration:
+                    exhausted = True
+                    break
+                pending[self._executor.submit(self._run, fn, item, url_of(item))] = index
+
+            if not pending:
+                break
+
+            remaining = None
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    logger.warning(f"[PIPELINE] Стадия '{stage}' не уложилась в {timeout} с, не обработано: {len(items) - completed}")
+                    # Ещё не начатые задачи снимаем, чтобы они не занимали пул после выхода из стадии
+                    for future in pending:
+                        future.cancel()
+                    break
+
+            done, _ = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = pending.pop(future)
+                completed += 1
+                try:
+                    results[index] = future.result()
+                except Exception as e:
+                    logger.error(f"[PIPELINE] Стадия '{stage}', элемент #{index}: {e}")
+
+        return results
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
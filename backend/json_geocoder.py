@@ -1,44 +1,68 @@
 import os
-import json
-import requests
 import re
 import logging
-from typing import Optional, List, Tuple
+import threading
+from typing import Dict, Optional, List, Tuple, Union
 
-# Отключаем прокси для всех запросов
-_session = requests.Session()
-_session.verify = False
-_session.trust_env = False
+from address_extractor import extract_address
+from geo_cache import CacheEntry, GeoCacheStore, STATUS_OK, STATUS_NOT_FOUND, STATUS_HTTP_ERROR, STATUS_CONNECTION
+from geocoder_backends import GeocodeAnswer, GeocoderBackend, GEOCODER_BACKENDS, make_backend
+from rate_limiter import RateLimiter
+from gazetteer import Gazetteer, GazetteerMatch, load_default as load_gazetteer
+from address_normalizer import normalize_address
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-GEOCODER_API_KEY = os.getenv("GEOCODER_API_KEY", "686e5b6d-df4e-49de-a918-317aa589c34c")
-ARKH_OBLAST_BBOX = "35.5,62.8~49.0,67.5"
+# Сроки жизни негативных записей кэша (в секундах)
+NEGATIVE_TTL_NOT_FOUND = int(os.getenv("GEOCODER_TTL_NOT_FOUND", 7 * 24 * 3600))
+NEGATIVE_TTL_HTTP_ERROR = int(os.getenv("GEOCODER_TTL_HTTP_ERROR", 3600))
+NEGATIVE_TTL_CONNECTION = int(os.getenv("GEOCODER_TTL_CONNECTION", 300))
+NEGATIVE_TTLS = {STATUS_NOT_FOUND: NEGATIVE_TTL_NOT_FOUND, STATUS_HTTP_ERROR: NEGATIVE_TTL_HTTP_ERROR,
+                 STATUS_CONNECTION: NEGATIVE_TTL_CONNECTION}
+
+# Лимиты API Яндекса: общие для всех процессов, списываются только реальными запросами
+GEOCODER_RPS = float(os.getenv("GEOCODER_RPS", 1.0))
+GEOCODER_BURST = int(os.getenv("GEOCODER_BURST", 3))
+GEOCODER_DAILY_QUOTA = int(os.getenv("GEOCODER_DAILY_QUOTA", 1000))
+
+# Результат адреса в пачке: координаты, None (не найден) или исключение поиска
+GeocodeResult = Union[Optional[List[float]], Exception]
+
+
+class _Flight:
+    """Запрос адреса, который уже выполняет другой поток: остальные ждут его результата"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.coords: Optional[List[float]] = None
+        self.error: Optional[Exception] = None
 
 
 class SimpleGeocoder:
-    def __init__(self, cache_path: str = "geo_cache.json"):
+    def __init__(self, cache_path: str = "geo_cache.db", legacy_cache_path: str = "geo_cache.json",
+                 rate_limiter: Optional[RateLimiter] = None, gazetteer: Optional[Gazetteer] = None,
+                 use_gazetteer: bool = True, normalize_addresses: bool = True,
+                 backend: Optional[GeocoderBackend] = None):
         self.cache_path = cache_path
-        self.cache = self._load_cache()
+        self.cache = GeoCacheStore(cache_path, legacy_json_path=legacy_cache_path)
+        self.rate_limiter = rate_limiter or RateLimiter(
+            cache_path, rate=GEOCODER_RPS, burst=GEOCODER_BURST, daily_quota=GEOCODER_DAILY_QUOTA
+        )
+        # Откуда берутся координаты промахов кэша: Яндекс, таблица или их цепочка (geocoder_backends)
+        self.backend = backend or make_backend(GEOCODER_BACKENDS, self.rate_limiter)
+        self._backend_stats = {}
+        # Справочник улиц отвечает без сети; Яндекс — только за тем, чего в нём нет
+        self.gazetteer = gazetteer or (load_gazetteer() if use_gazetteer else None)
+        self._local_stats = {"house": 0, "street": 0, "remote": 0}
+        # Канонический адрес — ключ кэша и запрос: разные падежи и написания одного адреса — одна запись
+        self.normalize_addresses = normalize_addresses
+        # Запросы в полёте по каноническому адресу: одновременные поиски одного адреса ждут один ответ
+        self._flights = {}
+        self._flights_lock = threading.Lock()
+        self._dedupe_stats = {"coalesced": 0, "deduplicated": 0}
         logger.info("[REGEX GEOCODER] Инициализирован!")
 
-    def _load_cache(self) -> dict:
-        if os.path.exists(self.cache_path):
-            try:
-                with open(self.cache_path, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except:
-                return {}
-        return {}
-
-    def _save_cache(self):
-        try:
-            with open(self.cache_path, 'w', encoding='utf-8') as f:
-                json.dump(self.cache, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            logger.error(f"[CACHE] Ошибка сохранения: {e}")
-
     def _clean_address_for_yandex(self, address: str) -> str:
         """
         Очищает адрес от лишних слов перед отправкой в Яндекс.Геокодер.
@@ -67,199 +91,240 @@ class SimpleGeocoder:
         # Убираем лишние пробелы
         return ' '.join(address.split())
 
+    def _legacy_query(self, address: str) -> str:
+        """Прежний ключ кэша: очищенная строка адреса с городом впереди"""
+        clean_address = self._clean_address_for_yandex(address)
+        # Если в адресе явно не указан город, добавляем, чтобы геокодер искал внутри Архангельска
+        if "архангельск" not in clean_address.lower() and "северодвинск" not in clean_address.lower():
+            return f"Архангельск, {clean_address}"
+        return clean_address
+
+    def query_for(self, address: str) -> str:
+        """
+        Запрос к Яндексу и ключ кэша: канонический адрес ("Архангельск, проспект Ленинградский, 441"),
+        если в адресе есть тип и название улицы, иначе (ТЦ, парки, театры) — очищенная строка.
+        """
+        normalized = normalize_address(address, self.gazetteer) if self.normalize_addresses else None
+        return normalized.query if normalized is not None else self._legacy_query(address)
+
     def extract_address_from_text(self, text: str) -> Optional[str]:
         """
         Ищет адрес в тексте. Собирает все упоминания улиц и возвращает приоритетно тот адрес,
         в котором указан номер дома. Если с номером дома нет, берет первый найденный.
+        Шаблоны скомпилированы один раз в модуле address_extractor.
         """
-        # Маркеры с обязательным пробелом после сокращений (чтобы "пр" не захватывалось в "проблема")
-        # \s? после сокращений означает опциональный пробел (для конца текста/предложения)
-        # Расширенные окончания для разных падежей (у, е, ом, у и т.д.)
-        markers = r"(?i:улиц[а-я]{1,4}\s?|ул\.\s?|проспект[а-я]{0,3}\s?|пр-?т?\.\s?|набережн[а-я]{2,4}\s?|наб\.\s?|переул[а-я]{2,3}\s?|пер\.\s?|площад[ьи]\s?|пл\.\s?|шоссе\s?|ш\.\s?|алле[яие]\s?|проезд[а-я]{0,3}\s?|дворец\s+спорта\s?|дворц[а-я]{1,2}\s+спорта\s?|стадион[а-я]{0,3}\s?|парк[а-я]{0,2}\s?|сквер[а-я]{0,2}\s?|театр[а-я]{0,2}\s?|музе[йяю]\s?|тц\s?|трц\s?)"
-        # Название улицы: 1-3 слова (первое с большой буквы, остальные могут быть с маленькой - для "Обуховской обороны")
-        name = r"((?:[А-ЯЁ][а-яё]+(?:-[а-яё]+)?|[0-9]{1,3}-?[а-яё]{0,2})(?:\s+[а-яА-Яё]+(?:-[а-яё]+)?){0,2})"
-
-        # Захват "дома №33 по " или "д. 5 на " или "у дома №441"
-        prefix_house = r"(?:(?i:д\.|дом[а-я]{0,2}|д|у\s+дома)\s*(?:№)?\s*(\d+[а-яА-ЯёЁ]?(?:[/\-]\d+)?)\s+(?:по\s+|на\s+)?)?"
-
-        # Захват номера дома после: "ул. Ленина, д. 5", "ул. Ленина №33", "ул. Вологодская, 1/2"
-        # Также захватываем просто цифру после названия улицы (например "Ленинградский проспект 441")
-        # И конструкцию "у дома №441" в конце
-        # \s* в начале потому что маркер уже включает пробел после себя
-        suffix_house = r"(?:\s*(?:[,]\s*(?:(?i:д\.|дом[а-я]{0,2}|д\.?|№))?\s*|(?i:д\.|дом[а-я]{0,2}|д\.?|№|у\s+дома)\s*)(\d+[а-яА-ЯёЁ]?(?:[/\-]\d+)?))?"
-
-        pattern1 = r"\b" + prefix_house + r"(?:" + markers + r")\s+" + name + suffix_house
-        pattern2 = r"\b" + prefix_house + name + r"\s+(?:" + markers + r")\b" + suffix_house
-        # Паттерн 3: для случаев типа "Ленинградский проспект 441" (название + маркер + номер)
-        # Требует номер дома после маркера, чтобы избежать ложных срабатываний типа "Автобус пр..."
-        pattern3 = r"\b" + name + r"\s+(?:" + markers + r")(\d+[а-яА-ЯёЁ]?(?:[/\-]\d+)?)"
-        # Паттерн 3c: для случаев типа "на улице Ленина 5" (предлог + маркер + название + номер)
-        pattern3c = r"(?i:на|у)\s+(?:" + markers + r")" + name + r"\s+(\d+[а-яА-ЯёЁ]?(?:[/\-]\d+)?)"
-        # Паттерн 3b: для случаев типа "улица Ленина", "проспект Обуховской обороны" (маркер + название БЕЗ номера)
-        # Здесь название должно быть минимум 2 слова или второе слово с большой буквы
-        pattern3b = r"\b(?:" + markers + r")([А-ЯЁ][а-яё]+(?:\s+[А-ЯЁ][а-яё]+)?)(?:\s|$)"
-        # Паттерн 3d: для случаев типа "ул. Ленина 5", "проспект Обуховской обороны 12" (маркер + название + номер)
-        pattern3d = r"\b(?:" + markers + r")([А-ЯЁ][а-яё]+(?:\s+[а-яА-Яё]+)?)\s+(\d+[а-яА-ЯёЁ]?(?:[/\-]\d+)?)"
-        # Паттерн 4: для случаев типа "у дома 441 на Ленинградском проспекте"
-        pattern4 = r"(?i:у\s+дома)\s*(?:№)?\s*(\d+[а-яА-ЯёЁ]?(?:[/\-]\d+)?)\s+(?:на\s+)?" + r"(?:" + markers + r")\s+" + name
-        # Паттерн 5: для случаев типа "На Ленинградском проспекте у дома 441" (маркер + название + у дома)
-        pattern5 = r"(?:" + markers + r")\s+" + name + r"\s+(?i:у\s+дома)\s*(?:№)?\s*(\d+[а-яА-ЯёЁ]?(?:[/\-]\d+)?)?"
-        # Паттерн 6: для случаев типа "на/На Ленинградском проспекте у дома 441" (предлог + название + маркер + у дома)
-        # \b в начале чтобы не захватывать "Авария на..."
-        pattern6 = r"\b(?i:на\s+)" + name + r"\s+(?:" + markers + r")\s+(?i:у\s+дома)\s*(?:№)?\s*(\d+[а-яА-ЯёЁ]?(?:[/\-]\d+)?)?"
-
-        all_matches = []
-
-        # Поиск по шаблону 1: ул. Ленина
-        for match in re.finditer(pattern1, text):
-            found_str = match.group(0).strip()
-            if "архангельск" in match.group(2).lower(): continue
-            house_num = match.group(1) or match.group(3)
-            all_matches.append((found_str, house_num))
-
-        # Поиск по шаблону 2: Троицкий проспект
-        for match in re.finditer(pattern2, text):
-            found_str = match.group(0).strip()
-            if "архангельск" in match.group(2).lower(): continue
-            house_num = match.group(1) or match.group(3)
-            all_matches.append((found_str, house_num))
-
-        # Поиск по шаблону 3: Ленинградский проспект 441 (название + маркер + номер)
-        for match in re.finditer(pattern3, text):
-            found_str = match.group(0).strip()
-            if "архангельск" in match.group(1).lower(): continue
-            house_num = match.group(2)
-            all_matches.append((found_str, house_num))
-
-        # Поиск по шаблону 3c: на улице Ленина 5 (предлог + маркер + название + номер)
-        for match in re.finditer(pattern3c, text):
-            found_str = match.group(0).strip()
-            if "архангельск" in match.group(1).lower(): continue  # Группа 1 - название улицы
-            house_num = match.group(2)  # Группа 2 - номер дома
-            all_matches.append((found_str, house_num))
-
-        # Поиск по шаблону 3b: улица Ленина, проспект Обуховской обороны (маркер + название БЕЗ номера)
-        for match in re.finditer(pattern3b, text):
-            found_str = match.group(0).strip()
-            if "архангельск" in match.group(1).lower(): continue
-            # Нет номера дома, добавляем без приоритета
-            all_matches.append((found_str, None))
-
-        # Поиск по шаблону 3d: ул. Ленина 5, проспект Обуховской обороны 12 (маркер + название + номер)
-        for match in re.finditer(pattern3d, text):
-            found_str = match.group(0).strip()
-            if "архангельск" in match.group(1).lower(): continue
-            house_num = match.group(2)
-            all_matches.append((found_str, house_num))
-
-        # Поиск по шаблону 4: у дома 441 на Ленинградском проспекте
-        for match in re.finditer(pattern4, text):
-            found_str = match.group(0).strip()
-            if "архангельск" in match.group(3).lower(): continue
-            house_num = match.group(1)
-            all_matches.append((found_str, house_num))
-
-        # Поиск по шаблону 5: На Ленинградском проспекте у дома 441
-        for match in re.finditer(pattern5, text):
-            found_str = match.group(0).strip()
-            if "архангельск" in match.group(2).lower(): continue
-            house_num = match.group(3)
-            all_matches.append((found_str, house_num))
-
-        # Поиск по шаблону 6: на/На Ленинградском проспекте у дома 441
-        for match in re.finditer(pattern6, text):
-            found_str = match.group(0).strip()
-            if "архангельск" in match.group(1).lower(): continue
-            house_num = match.group(2)
-            all_matches.append((found_str, house_num))
-
-        if not all_matches:
-            return None
-
-        # 1. Приоритет: ищем адрес, у которого захвачен логичный номер дома
-        for found_str, house_num in all_matches:
-            if house_num:
-                # Фильтруем ложные срабатывания типа "ул. Ленина 2024" (год)
-                if not re.match(r'^(19|20)\d{2}$', house_num):
-                    return found_str
-
-        # 2. Если номеров домов нет, ищем адрес с маркером + название (паттерн 3b)
-        for found_str, house_num in all_matches:
-            # Проверяем, что это не ложное срабатывание (маркер + короткое слово)
-            if not house_num and found_str:
-                # Проверяем, содержит ли адрес маркер улицы (с пробелом после!)
-                markers_pattern = r"(?i:улиц[а-я]{1,3}\s|ул\.\s|проспект[а-я]{0,2}\s|пр-?т?\.\s|набережн[а-я]{2,3}\s|наб\.\s|переул[а-я]{2}\s|пер\.\s|площад[ьи]\s|пл\.\s|шоссе\s|ш\.\s)"
-                if re.search(markers_pattern, found_str):
-                    # Проверяем, что название не слишком короткое (минимум 4 символа)
-                    words = found_str.split()
-                    for word in words:
-                        if len(word) > 3 and word[0].isupper():
-                            return found_str
-
-        # 3. Если ничего не найдено, берем первый попавшийся адрес
-        first_match = all_matches[0][0]
-        # Если случайно захватился год в конце первого адреса, отрежем его для надежности
-        year_match = re.search(r'\s+(19|20)\d{2}$', first_match)
-        if year_match:
-            first_match = first_match[:year_match.start()]
-
-        return first_match
+        return extract_address(text)
 
-    def geocode_with_yandex(self, address: str) -> Optional[List[float]]:
+    def geocode(self, address: str) -> Optional[List[float]]:
+        """
+        Координаты адреса: сначала справочник улиц (дом или, если номера в адресе нет, центр улицы),
+        затем кэш и Яндекс. RateLimited — см. geocode_with_yandex.
+        """
         if not address: return None
+        match = self._match_local(address)
+        if match is not None and match.resolved:
+            return match.coords
+        coords = self.geocode_with_yandex(address)
+        self._learn(match, coords)
+        return coords
 
-        # Очищаем адрес от лишних слов перед отправкой в Яндекс
-        clean_address = self._clean_address_for_yandex(address)
-        logger.info(f"[GEO] Исходный: '{address}' → Очищенный: '{clean_address}'")
+    def geocode_many(self, addresses: List[Optional[str]]) -> List[GeocodeResult]:
+        """
+        Координаты пачки адресов в том же порядке. Адреса, одинаковые после нормализации, ищутся
+        один раз. Ошибка поиска (в том числе RateLimited) пачку не прерывает: она стоит на месте
+        координат своих адресов, как в asyncio.gather(return_exceptions=True).
+        """
+        results = [None] * len(addresses)
+        groups = {}
+        for i, address in enumerate(addresses):
+            if not address:
+                continue
+            match = self._match_local(address)
+            if match is not None and match.resolved:
+                results[i] = match.coords
+            else:
+                groups.setdefault(self.query_for(address), []).append((i, address, match))
+
+        with self._flights_lock:
+            self._dedupe_stats["deduplicated"] += sum(len(group) - 1 for group in groups.values())
+        resolved = self._resolve_many({query: group[0][1] for query, group in groups.items()})
+        for query_address, group in groups.items():
+            coords = resolved[query_address]
+            for i, address, match in group:
+                results[i] = coords
+                if not isinstance(coords, Exception):
+                    self._learn(match, coords)
+        return results
+
+    def _resolve_many(self, queries: Dict[str, str]) -> Dict[str, GeocodeResult]:
+        """
+        Канонические адреса пачки (-> исходный адрес): кэш, затем промахи одной пачкой в self.backend.
+        Адреса, которые уже запрашивает другой поток, не запрашиваются повторно — ждём его ответа.
+        """
+        resolved, owned, waiting = {}, [], []
+        for query_address, address in queries.items():
+            cached = self._lookup_cache(query_address, address)
+            if cached is not None:
+                resolved[query_address] = cached.coords
+                continue
+            flight, leader = self._claim(query_address)
+            (owned if leader else waiting).append((query_address, flight))
 
-        # Если в адресе явно не указан город, добавляем, чтобы геокодер искал внутри Архангельска
-        if "архангельск" not in clean_address.lower() and "северодвинск" not in clean_address.lower():
-            query_address = f"Архангельск, {clean_address}"
+        try:
+            misses = []
+            for query_address, flight in owned:
+                # Между проверкой кэша и захватом запроса другой поток мог успеть получить ответ
+                cached = self.cache.lookup(query_address, count=False)
+                if cached is not None:
+                    resolved[query_address] = self._finish(query_address, flight, cached.coords)
+                else:
+                    misses.append((query_address, flight))
+            answers = self.backend.lookup_many([query_address for query_address, _ in misses]) if misses else []
+            for (query_address, flight), answer in zip(misses, answers):
+                if isinstance(answer, Exception):
+                    logger.warning(f"[GEO] {query_address}: {answer}")
+                    resolved[query_address] = self._finish(query_address, flight, error=answer)
+                else:
+                    resolved[query_address] = self._finish(query_address, flight, self._store(query_address, answer))
+        finally:
+            # Пачка прервана исключением: ждущие этих адресов не должны висеть
+            for query_address, flight in owned:
+                if not flight.done.is_set():
+                    self._finish(query_address, flight, error=RuntimeError("Поиск адреса прерван"))
+
+        for query_address, flight in waiting:
+            try:
+                resolved[query_address] = self._wait(flight)
+            except Exception as e:
+                resolved[query_address] = e
+        return resolved
+
+    def _match_local(self, address: str) -> Optional[GazetteerMatch]:
+        """Совпадение в справочнике улиц; разрешённые и ушедшие дальше адреса учитываются в local_stats"""
+        match = self.gazetteer.match(address) if self.gazetteer else None
+        if match is not None and match.resolved:
+            self._local_stats[match.precision] += 1
+            logger.info(f"[GAZETTEER] ✅ {address} → {match.street.full_name}"
+                        f"{', ' + match.house if match.house else ' (центр улицы)'}")
         else:
-            query_address = clean_address
-
-        # 1. Проверяем кэш
-        if query_address in self.cache:
-            logger.info(f"[CACHE] ✅ Найдено: {query_address}")
-            return self.cache[query_address]
-
-        # 2. Запрашиваем у Yandex API
-        url = (
-            f"https://geocode-maps.yandex.ru/1.x/?apikey={GEOCODER_API_KEY}"
-            f"&geocode={requests.utils.quote(query_address)}&format=json&results=1"
-            f"&bbox={ARKH_OBLAST_BBOX}&rspn=1"
-        )
+            self._local_stats["remote"] += 1
+        return match
 
-        import time
-        for attempt in range(3):
-            try:
-                response = _session.get(url, timeout=15)
+    def _learn(self, match: Optional[GazetteerMatch], coords: Optional[List[float]]):
+        if coords and match is not None:
+            # Улица известна, дом — нет: запоминаем, другие написания адреса пойдут мимо сети
+            self.gazetteer.learn(match, coords)
+
+    def geocode_with_yandex(self, address: str) -> Optional[List[float]]:
+        """
+        Координаты адреса: из кэша или от self.backend (по умолчанию Яндекс). RateLimited — запрос сейчас невозможен
+        (квота или бэкофф после 429/5xx); такой результат не кэшируется, новость откладывается.
+        """
+        if not address: return None
+
+        query_address = self.query_for(address)
+        logger.info(f"[GEO] Исходный: '{address}' → Запрос: '{query_address}'")
+        return self._geocode_query(query_address, address)
+
+    def _lookup_cache(self, query_address: str, address: str) -> Optional[CacheEntry]:
+        cached = self.cache.lookup(query_address)
+        if cached is None and self.normalize_addresses:
+            # Координаты, найденные до нормализации, лежат под прежним ключом: переносим, а не запрашиваем заново
+            legacy_query = self._legacy_query(address)
+            legacy = self.cache.lookup(legacy_query, count=False) if legacy_query != query_address else None
+            if legacy is not None and not legacy.is_negative:
+                self.cache.set(query_address, legacy.coords)
+                cached = legacy
+        if cached is not None:
+            if cached.is_negative:
+                logger.info(f"[CACHE] ⛔ Ранее не найдено ({cached.status}): {query_address}")
+            else:
+                logger.info(f"[CACHE] ✅ Найдено: {query_address}")
+        return cached
+
+    def _geocode_query(self, query_address: str, address: str) -> Optional[List[float]]:
+        """
+        Кэш, затем self.backend. Если тот же канонический адрес уже запрашивает другой поток
+        (новости одной пачки, сброс геокода из админки), ждём его ответа вместо второго запроса.
+        """
+        cached = self._lookup_cache(query_address, address)
+        if cached is not None:
+            return cached.coords
 
-                if response.status_code == 200:
-                    data = response.json()
-                    members = data["response"]["GeoObjectCollection"]["featureMember"]
+        flight, leader = self._claim(query_address)
+        if not leader:
+            return self._wait(flight)
+        try:
+            # Между проверкой кэша и захватом запроса другой поток мог успеть получить ответ
+            cached = self.cache.lookup(query_address, count=False)
+            if cached is not None:
+                coords = cached.coords
+            else:
+                coords = self._store(query_address, self.backend.lookup(query_address))
+        except Exception as e:
+            self._finish(query_address, flight, error=e)
+            raise
+        return self._finish(query_address, flight, coords)
+
+    def _claim(self, query_address: str) -> Tuple[_Flight, bool]:
+        """Запрос адреса в полёте и True, если его выполняем мы (иначе его уже выполняет другой поток)"""
+        with self._flights_lock:
+            flight = self._flights.get(query_address)
+            if flight is None:
+                flight = self._flights[query_address] = _Flight()
+                return flight, True
+            self._dedupe_stats["coalesced"] += 1
+            return flight, False
+
+    def _finish(self, query_address: str, flight: _Flight, coords: Optional[List[float]] = None,
+                error: Optional[Exception] = None) -> GeocodeResult:
+        flight.coords, flight.error = coords, error
+        with self._flights_lock:
+            del self._flights[query_address]
+        flight.done.set()
+        return error if error is not None else coords
+
+    @staticmethod
+    def _wait(flight: _Flight) -> Optional[List[float]]:
+        flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.coords
+
+    def _store(self, query_address: str, answer: Optional[GeocodeAnswer]) -> Optional[List[float]]:
+        """Ответ источника в кэш: координаты — бессрочно, неудачи — на срок по причине (NEGATIVE_TTLS)"""
+        if answer is None:
+            # Ни один источник адреса не знает — не кэшируем, следующий источник может появиться
+            return None
+        with self._flights_lock:
+            self._backend_stats[answer.source] = self._backend_stats.get(answer.source, 0) + 1
+        if answer.status == STATUS_OK:
+            self.cache.set(query_address, answer.coords)
+            return answer.coords
+        # Не найдено или все попытки оборвались - запоминаем, чтобы не ждать ретраи на каждой новости
+        self.cache.set_negative(query_address, answer.status, NEGATIVE_TTLS.get(answer.status, NEGATIVE_TTL_CONNECTION))
+        return None
 
-                    if members:
-                        pos = members[0]["GeoObject"]["Point"]["pos"]
-                        lon, lat = map(float, pos.split())
-                        coords = [lat, lon]
+    def cache_stats(self) -> dict:
+        """
+        Счётчики кэша: попадания, промахи и попадания в негативный кэш; coalesced — поиски, дождавшиеся
+        чужого запроса того же адреса, deduplicated — повторы адреса внутри одной пачки geocode_many.
+        """
+        with self._flights_lock:
+            return {**self.cache.stats(), **self._dedupe_stats}
 
-                        self.cache[query_address] = coords
-                        self._save_cache()
+    def local_stats(self) -> dict:
+        """Сколько адресов справочник улиц разрешил до дома, до центра улицы и сколько ушло дальше."""
+        return dict(self._local_stats)
 
-                        return coords
-                    else:
-                        # Яндекс ничего не нашел - нет смысла продолжать цикл
-                        return None
-                else:
-                    logger.error(f"[YANDEX] ❌ HTTP {response.status_code}")
-                    break
-            except Exception as e:
-                logger.warning(f"[YANDEX] Попытка {attempt+1}/3 ❌ Ошибка соединения (возможно SSL разрыв): {e}")
-                if attempt < 2:
-                    time.sleep(2)
+    def backend_stats(self) -> dict:
+        """Сколько ответов (включая неудачи) дал каждый источник координат."""
+        with self._flights_lock:
+            return dict(self._backend_stats)
 
-        return None
+    def rate_stats(self) -> dict:
+        """Счётчики ограничителя запросов: запросы, ожидание, бэкоффы, расход суточной квоты."""
+        return self.rate_limiter.stats()
     
     def process_text(self, title: str, content: str) -> Tuple[Optional[str], Optional[List[float]]]:
         """
@@ -271,10 +336,18 @@ class SimpleGeocoder:
         if not address:
             return None, None
         
-        coords = self.geocode_with_yandex(address)
+        coords = self.geocode(address)
         
         # Если Yandex API не нашел ничего, попробуем почистить адрес
         # (часто Yandex API плохо понимает слова с опечатками, или если адрес слишком сложный)
         # Мы оставляем первый найденный
         
         return address, coords
+
+    def process_many(self, texts: List[Tuple[str, str]]) -> List[Tuple[Optional[str], GeocodeResult]]:
+        """
+        process_text для пачки новостей (заголовок, текст): адреса ищутся через geocode_many,
+        поэтому одинаковые адреса разных новостей уходят в Яндекс одним запросом.
+        """
+        addresses = [self.extract_address_from_text(f"{title}. {content}") for title, content in texts]
+        return list(zip(addresses, self.geocode_many(addresses)))
@@ -1,6 +1,6 @@
 import feedparser
 from bs4 import BeautifulSoup
-from fastapi import FastAPI, Query, HTTPException
+from fastapi import FastAPI, Query, HTTPException, Response, Header
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import JSONResponse
@@ -9,10 +9,12 @@ from requests.adapters import HTTPAdapter
 from urllib3.util.ssl_ import create_urllib3_context
 from datetime import datetime
 import re
-from typing import Optional, List, Tuple
+import json
+from typing import Dict, Optional, List, Tuple
 import threading
 import time
 import os
+import socket
 import logging
 import urllib3
 
@@ -20,6 +22,10 @@ import urllib3
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
 import database
+import clustering
+import heatmap
+from response_cache import ResponseCache, etag_matches
+from content_extractor import ArticleContent, EMPTY_ARTICLE, content_text, fetch_article
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO)
@@ -32,6 +38,7 @@ app.add_middleware(
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Next-Offset", "ETag"],
 )
 
 # Монтируем папку static для раздачи графики (в т.ч. скачанных картинок)
@@ -48,7 +55,18 @@ RSS_URLS = [
 HEADERS = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"}
 GEOCODER_API_KEY = os.getenv("GEOCODER_API_KEY", "686e5b6d-df4e-49de-a918-317aa589c34c")
 ARKH_OBLAST_BBOX = "35.5,62.8~49.0,67.5"
-UPDATE_INTERVAL = 900 # 15 минут
+# Параллельная загрузка картинок и статей при импорте ленты
+IMAGE_STAGE_TIMEOUT = 60
+ARTICLE_STAGE_TIMEOUT = 120
+UPDATE_INTERVAL = int(os.getenv("RSS_UPDATE_INTERVAL", 900)) # 15 минут; условные запросы позволяют опрашивать чаще
+# Очередь геокодера: новости приходят из импорта и админки сразу, SQL-сканирование — страховка
+GEOCODER_BATCH = 6
+GEOCODER_BACKLOG_SCAN = 200
+GEOCODER_IDLE_SCAN = 60 # раз в минуту без новых задач перепроверяем БД (записи других процессов, сбои)
+# Имя воркера в аренде новостей (см. database.claim_uncoded_news); run_geocoder.py работает параллельно
+GEOCODER_WORKER_ID = f"main:{socket.gethostname()}:{os.getpid()}"
+# Аренда ручного перегеокодирования из админки: пока оно идёт, фоновые воркеры новость не берут
+ADMIN_WORKER_ID = f"admin:{socket.gethostname()}:{os.getpid()}"
 
 # Создаём сессию с обходом SSL-ошибок
 def create_ssl_session():
@@ -77,112 +95,12 @@ def parse_pubdate(date_str: str) -> str:
     except:
         return datetime.now().strftime("%Y-%m-%d")
 
-def extract_content_with_bs4(url: str) -> str:
+def download_article(url: str) -> ArticleContent:
     """
-    Загружает страницу и извлекает контент с сохранением форматирования (абзацев).
+    Загружает страницу (через rss_session с отключенным прокси) и извлекает абзацы статьи
+    в виде HTML и текста. Ошибка загрузки -> EMPTY_ARTICLE.
     """
-    try:
-        # Используем rss_session с отключенным прокси
-        resp = rss_session.get(url, headers=HEADERS, timeout=15)
-        resp.raise_for_status()
-        resp.encoding = resp.apparent_encoding
-        soup = BeautifulSoup(resp.text, 'html.parser')
-
-        # Убираем скрипты и стили
-        for script in soup(["script", "style"]):
-            script.decompose()
-
-        content_div = soup.find('div', class_='news-text') or soup.find('div', class_='fulltext') or soup.find('article')
-        
-        final_html = ""
-        
-        if content_div:
-            # Превращаем <br> в двойной перенос для надежного отделения абзацев
-            for br in content_div.find_all("br"):
-                br.replace_with("\n\n")
-            
-            # В конец каждого параграфа или блока тоже ставим двойной перенос
-            for block in content_div.find_all(["p", "div", "h1", "h2", "h3", "li"]):
-                block.append("\n\n")
-                
-            # Извлекаем текст, соединяя инлайн-теги (например <a>, <b>) просто пробелом
-            text_content = content_div.get_text(separator=" ")
-            
-            # Бьём по реальным переносам
-            raw_lines = text_content.split("\n")
-            
-            paragraphs = []
-            skip_mode = False
-            for line in raw_lines:
-                # Очищаем от лишних (двойных, тройных) пробелов внутри и по краям
-                clean_line = " ".join(line.split())
-                
-                # Защита от мусора
-                lower_line = clean_line.lower()
-                if lower_line.startswith("новости по теме") or lower_line.startswith("читайте также"):
-                    skip_mode = True
-                    continue
-                
-                if skip_mode:
-                    # Если встречаем длинный полноценный абзац — это снова основная статья, выключаем пропуск
-                    if len(clean_line) > 90:
-                        skip_mode = False
-                    else:
-                        continue # Пропускаем мелкие "чужие" заголовки
-                    
-                if len(clean_line) > 5: # Игнорируем совсем короткий мусор
-                    paragraphs.append(clean_line)
-                    
-            final_html = "".join([f"<p>{p}</p>\n" for p in paragraphs])
-        
-        else:
-            # Fallback: просто ищем все <p>
-            tags = soup.find_all('p')
-            skip_mode = False
-            for tag in tags:
-                text = " ".join(tag.get_text(separator=" ").split())
-                lower_text = text.lower()
-                if lower_text.startswith("новости по теме") or lower_text.startswith("читайте также"):
-                    skip_mode = True
-                    continue
-                
-                if skip_mode:
-                    if len(text) > 90:
-                        skip_mode = False
-                    else:
-                        continue
-                        
-                if len(text) > 5: 
-                    final_html += f"<p>{text}</p>\n"
-            
-            if not final_html:
-                 # Super fallback
-                text = soup.get_text(separator='\n')
-                lines = []
-                skip_mode = False
-                for line in text.split('\n'):
-                    clean_line = " ".join(line.split())
-                    lower_line = clean_line.lower()
-                    if lower_line.startswith("новости по теме") or lower_line.startswith("читайте также"):
-                        skip_mode = True
-                        continue
-                        
-                    if skip_mode:
-                        if len(clean_line) > 100:
-                            skip_mode = False
-                        else:
-                            continue
-                            
-                    if len(clean_line) > 40:
-                        lines.append(clean_line)
-                
-                final_html = "".join([f"<p>{line}</p>\n" for line in lines])
-
-        return final_html or "Текст не найден"
-
-    except Exception as e:
-        logger.error(f"[BS4] Ошибка загрузки контента: {e}")
-        return ""
+    return fetch_article(rss_session, url, HEADERS)
 
 def download_image(url: str) -> Optional[str]:
     """ Скачивает картинку на диск и возвращает локальный URL (относительный) """
@@ -213,20 +131,15 @@ def download_image(url: str) -> Optional[str]:
         return url
 
 # === СЛОВАРИ И ДАННЫЕ ===
-CATEGORIES = {
-    "дтп": ["дтп", "авари", "столкнов", "сбил", "наезд", "опрокинул", "лобовое", "гибдд", "дорожно-транспорт", "въехал в"],
-    "происшествия": ["пожар", "возгоран", "мчс", "чп", "утонул", "пропал", "наводнен", "взрыв", "обрушен", "скорая", "погиб", "смерт", "спасател", "труп", "эвакуаци"],
-    "криминал": ["полици", "задержан", "краж", "грабеж", "ограбл", "наркоти", "суд", "приговор", "уголовн", "мошенни", "убийств", "коррупц", "прокуратур", "мвд", "фсб"],
-    "политика": ["мэр ", "губернатор", "депутат", "дума", "выборы", "администраци", "законопроект", "власт", "чиновник", "цыбульск", "морев"],
-    "жкх": ["отоплен", "теплоснабж", "водоканал", "тариф", "жкх", "прорыв труб", "тгк-2", "рвк-", "электроснабж", "управляющая компани", "коммунальн", "снег", "уборка"],
-    "экономика": ["бюджет", "инвестици", "строительств", "аквилон", "порт", "экономи", "лдк", "завод", "предприяти", "бизнес", "налог", "финанс"],
-    "общество": ["жител", "праздник", "акци", "ветеран", "пенсионер", "волонтер", "помор", "благоустройств", "парк", "сквер", "общественн"],
-    "спорт": ["водник", "матч", "хоккей", "стадион", "турнир", "соревновани", "чемпионат", "медал", "тренер", "фитнес", "спорт"],
-    "культура": ["театр", "концерт", "фестивал", "музей", "выставк", "чумабаровк", "искусств", "художник", "писател", "музыкант", "премьер"],
-    "образование": ["сафу", "сгму", "университет", "студент", "школ", "лицей", "егэ", "учител", "педагог", "образовани", "колледж", "детский сад"]
-}
+from classifier import default_classifier
 
 from json_geocoder import SimpleGeocoder
+from rate_limiter import RateLimited
+from ingest_pipeline import FetchPool
+from geocode_queue import geocode_queue, PRIORITY_FRESH, PRIORITY_BACKLOG
+
+# Общий пул для сетевых стадий (картинки, HTML статей) с ограничением на хост
+fetch_pool = FetchPool()
 
 # Инициализация геокодера
 simple_geocoder = SimpleGeocoder()
@@ -239,13 +152,25 @@ def parse_rss_and_fill():
     logger.info("[RSS] Загрузка новостей через REQUESTS + FEEDPARSER...")
     
     response = None
+    feed_url = None
     last_error = None
     
     # Пробуем все URL по очереди
     for url in RSS_URLS:
         try:
             logger.info(f"[RSS] Пробуем {url}...")
-            response = rss_session.get(url, headers=HEADERS, timeout=20)
+            # Условный запрос: если лента не менялась с прошлого раза, сервер ответит 304 без тела
+            headers = dict(HEADERS)
+            validators = database.get_feed_validators(url)
+            if validators.get("etag"):
+                headers["If-None-Match"] = validators["etag"]
+            if validators.get("last_modified"):
+                headers["If-Modified-Since"] = validators["last_modified"]
+
+            response = rss_session.get(url, headers=headers, timeout=20)
+            if response.status_code == 304:
+                logger.info(f"[RSS] Лента не изменилась ({url}), пропускаем")
+                return
             response.raise_for_status()
             
             # Проверяем, что контент есть
@@ -254,6 +179,7 @@ def parse_rss_and_fill():
                 continue
                 
             logger.info(f"[RSS] Успешно загружено с {url}")
+            feed_url = url
             break
         except Exception as e:
             last_error = e
@@ -270,11 +196,16 @@ def parse_rss_and_fill():
         if feed.bozo:
             logger.warning(f"[RSS] Warning парсинга XML: {feed.bozo_exception}")
 
-        added = 0
-        for entry in feed.entries:
+        # Одним запросом узнаём, какие записи уже есть в БД: для них не нужны
+        # ни разбор описания, ни категоризация, ни скачивание картинки
+        entry_urls = [clean_text(entry.get("link", "")) for entry in feed.entries]
+        known_urls = database.get_existing_urls([u for u in entry_urls if u])
+
+        batch = []
+        failed_entries = 0
+        for entry, url in zip(feed.entries, entry_urls):
             try:
-                url = clean_text(entry.get("link", ""))
-                if not url: continue
+                if not url or url in known_urls: continue
                 title = clean_text(entry.get("title", "Без заголовка"))
 
                 raw_desc = entry.get("description", "") or entry.get("summary", "")
@@ -293,53 +224,102 @@ def parse_rss_and_fill():
                 if not image and "media_content" in entry:
                     image = entry.media_content[0].get("url")
 
-                local_image = download_image(image)
-
-                text_for_cat = (title + " " + preview).lower()
-                category = "другое"
-                for cat, words in CATEGORIES.items():
-                    if any(w in text_for_cat for w in words):
-                        category = cat
-                        break
+                category = default_classifier.classify(title, preview)
 
-                if database.save_news({"url": url, "title": title, "preview": preview, "date": date, "image": local_image, "category": category}):
-                    added += 1
+                batch.append({"url": url, "title": title, "preview": preview, "date": date, "image": image, "category": category})
             except Exception as e:
+                failed_entries += 1
                 logger.error(f"[RSS] Ошибка новости: {e}")
-        logger.info(f"[RSS] Добавлено {added} новостей (всего: {database.get_news_count()})")
+
+        # Сетевые стадии: картинки и полный текст статей качаются параллельно
+        # (с ограничением на хост и таймаутом на стадию), а не по одной
+        local_images = fetch_pool.map(download_image, [item["image"] for item in batch],
+                                      timeout=IMAGE_STAGE_TIMEOUT, stage="images")
+        articles = fetch_pool.map(download_article, [item["url"] for item in batch],
+                                  timeout=ARTICLE_STAGE_TIMEOUT, default=EMPTY_ARTICLE, stage="articles")
+        for item, local_image, article in zip(batch, local_images, articles):
+            item["image"] = local_image or item["image"]
+            # Пустой контент (ошибка загрузки) не сохраняем — геокодер скачает статью сам
+            item["content"] = article.html or None
+
+        # Вся лента сохраняется одной транзакцией; ошибка записи уходит в except ниже, мимо валидаторов
+        inserted_ids = database.save_news_batch(batch)
+        geocode_queue.push(inserted_ids, PRIORITY_FRESH)
+        logger.info(f"[RSS] Добавлено {len(inserted_ids)} новостей (всего: {database.get_news_count()}, уже известных в ленте: {len(known_urls)})")
+
+        # Валидаторы запоминаем только после успешной обработки, иначе 304 скрыл бы несохранённые записи
+        if failed_entries:
+            logger.warning(f"[RSS] Не разобрано {failed_entries} новостей ленты, ETag не сохраняем: повторим целиком")
+        else:
+            database.save_feed_validators(feed_url, response.headers.get("ETag"), response.headers.get("Last-Modified"))
     except Exception as e:
         logger.error(f"[RSS] Критическая ошибка парсинга: {e}")
 
+def enqueue_uncoded_backlog() -> bool:
+    """Ставит в очередь необработанные новости из БД (после рестарта, из других процессов). True — нашлись ещё"""
+    backlog = database.get_uncoded_ids(GEOCODER_BACKLOG_SCAN)
+    geocode_queue.push(backlog, PRIORITY_BACKLOG)
+    return len(backlog) == GEOCODER_BACKLOG_SCAN
+
 def background_geocoder():
     logger.info("[GEOCODER] Запущен (REGEX + YANDEX)")
+    more_backlog = True
     while True:
         try:
-            items = database.get_uncoded_news(limit=6)
-            if not items:
-                time.sleep(60)
+            if more_backlog and not len(geocode_queue):
+                more_backlog = enqueue_uncoded_backlog()
+            ids = geocode_queue.pop_batch(GEOCODER_BATCH, timeout=GEOCODER_IDLE_SCAN)
+            if not ids:
+                more_backlog = True
                 continue
+            # Аренда: пока новость ждала в очереди, её могли обработать или взять в работу
+            # админка и run_geocoder.py — такие пропускаем
+            items = database.claim_uncoded_news(GEOCODER_WORKER_ID, len(ids), news_ids=ids)
+
+            # Статьи без текста скачиваем пачкой параллельно
+            missing = [item for item in items if not item.get("content") or item.get("content") == "Ошибка загрузки"]
+            fetched = fetch_pool.map(download_article, [item["url"] for item in missing],
+                                     timeout=ARTICLE_STAGE_TIMEOUT, default=EMPTY_ARTICLE, stage="articles")
+            for item, article in zip(missing, fetched):
+                item["content"], item["text"] = article
+                if not article.html:
+                    # Статья не скачалась (ошибка или таймаут стадии): повторим позже с паузой,
+                    # а не запишем NOT_FOUND по одному заголовку
+                    database.release_news_lease(item["id"], GEOCODER_WORKER_ID, failed=True)
+            items = [item for item in items if item.get("content")]
+
+            # Адреса всей пачки геокодируем разом: одинаковые уходят в Яндекс одним запросом
+            texts = []
             for item in items:
+                # У только что скачанных статей текст уже есть, у сохранённых — снимаем разметку
+                text = item["text"] if "text" in item else content_text(item.get("content") or "")
+                texts.append((f"{item['title']} {text}", ""))
+            results = simple_geocoder.process_many(texts)
+
+            for item, (address, coords) in zip(items, results):
                 try:
-                    content = item.get("content")
-                    if not content or content == "Ошибка загрузки":
-                        content = extract_content_with_bs4(item["url"])
-                    
-                    clean_content_for_geo = BeautifulSoup(content, "html.parser").get_text(separator=" ", strip=True)
-                    full_text = f"{item['title']} {clean_content_for_geo}"
-                    address, coords = extract_address_and_coords(full_text)
-                    
+                    if isinstance(coords, Exception):
+                        raise coords
+                    content = item["content"]
+
                     # Если адрес не найден, пишем метку, чтобы не брать снова
                     final_address = address if address else "NOT_FOUND"
                     
-                    database.update_news_content_and_coords(item["id"], content, coords, address=final_address)
-                    
+                    if not database.update_news_content_and_coords(item["id"], content, coords, address=final_address,
+                                                                   owner=GEOCODER_WORKER_ID):
+                        logger.warning(f"[GEOCODER] {item['id']}: аренда истекла, результат не записан")
+                        continue
+
                     log_addr = address or 'НЕТ АДРЕСА'
                     log_coords = coords or '—'
                     logger.info(f"[GEO] {item['id']} -> {log_addr} -> {log_coords}")
-                    time.sleep(1.5)
+                except RateLimited as e:
+                    # Лимит API: откладываем без штрафа, новости из кэша идут дальше
+                    logger.warning(f"[GEOCODER] {item['id']} отложена: {e}")
+                    database.release_news_lease(item["id"], GEOCODER_WORKER_ID, retry_after=e.retry_after)
                 except Exception as e:
                     logger.error(f"[GEOCODER] Ошибка {item.get('id', '?')}: {e}")
-            time.sleep(10)
+                    database.release_news_lease(item["id"], GEOCODER_WORKER_ID, failed=True)
         except Exception as e:
             logger.error(f"[GEOCODER LOOP] {e}")
             time.sleep(60)
@@ -367,9 +347,87 @@ def force():
 def root():
     return {"status": "работает", "новостей": database.get_news_count()}
 
+# Готовые ответы /news; сбрасываются любой записью в БД
+news_cache = ResponseCache()
+
+def _build_news_page(limit: int, category: Optional[str], cursor: Optional[str]):
+    items, next_cursor = database.get_news_page(limit, category, cursor)
+    # Та же сериализация, что у JSONResponse по умолчанию
+    body = json.dumps(items, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+    return body, {"X-Next-Cursor": next_cursor} if next_cursor else {}
+
 @app.get("/news")
-def news(category: Optional[str] = None, limit: int = Query(200, le=1000)):
-    return database.get_all_news(limit, category)
+def news(category: Optional[str] = None,
+         limit: int = Query(200, ge=1, le=1000), cursor: Optional[str] = None,
+         if_none_match: Optional[str] = Header(None)):
+    """Страница ленты; курсор следующей страницы — в заголовке X-Next-Cursor"""
+    category = category.lower() if category and category.lower() != "все" else None
+    try:
+        cached = news_cache.get((category, limit, cursor), lambda: _build_news_page(limit, category, cursor))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # no-cache: браузер хранит ответ, но каждый раз сверяет ETag с сервером
+    headers = {"ETag": cached.etag, "Cache-Control": "no-cache", **cached.headers}
+    if etag_matches(if_none_match, cached.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=cached.body, media_type="application/json", headers=headers)
+
+@app.get("/news/search")
+def news_search(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    category: Optional[str] = None,
+    geo_only: bool = False,
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+):
+    """Полнотекстовый поиск по новостям; смещение следующей страницы — в заголовке X-Next-Offset"""
+    items = database.search_news(q, category, geo_only, limit + 1, offset)
+    if len(items) > limit:
+        items = items[:limit]
+        response.headers["X-Next-Offset"] = str(offset + limit)
+    return items
+
+@app.get("/news/bbox")
+def news_bbox(
+    min_lat: float, max_lat: float, min_lon: float, max_lon: float,
+    category: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    limit: int = Query(500, ge=1, le=1000),
+):
+    """Новости внутри видимой области карты (индексный поиск по R*Tree)"""
+    if min_lat > max_lat or min_lon > max_lon:
+        raise HTTPException(status_code=400, detail="min_lat/min_lon должны быть не больше max_lat/max_lon")
+    return database.get_news_in_bbox(min_lat, max_lat, min_lon, max_lon, category, date_from, date_to, limit)
+
+@app.get("/news/clusters")
+def news_clusters(
+    min_lat: float, max_lat: float, min_lon: float, max_lon: float,
+    zoom: int = Query(..., ge=0, le=clustering.MAX_ZOOM),
+):
+    """Кластеры маркеров для видимой области карты на заданном зуме"""
+    if min_lat > max_lat or min_lon > max_lon:
+        raise HTTPException(status_code=400, detail="min_lat/min_lon должны быть не больше max_lat/max_lon")
+    try:
+        return clustering.get_clusters(min_lat, max_lat, min_lon, max_lon, zoom)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/news/heatmap")
+def news_heatmap(
+    category: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    width: int = Query(heatmap.DEFAULT_WIDTH, ge=1, le=heatmap.MAX_SIDE),
+    height: int = Query(heatmap.DEFAULT_HEIGHT, ge=1, le=heatmap.MAX_SIDE),
+    sigma: float = Query(0.0, ge=0, le=heatmap.MAX_SIGMA),
+):
+    """Плотность новостей по области: сетка uint8 в base64 (строки с севера, проекция Web Mercator)"""
+    try:
+        return heatmap.build_heatmap(category, date_from, date_to, width, height, sigma)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @app.get("/news/{news_id}/full")
 def full(news_id: int):
@@ -377,7 +435,7 @@ def full(news_id: int):
     if not item:
         raise HTTPException(404)
     if not item["content"]:
-        content = extract_content_with_bs4(item["url"])
+        content = download_article(item["url"]).html
         database.update_news_content_and_coords(item["id"], content, item["coords"])
         item["content"] = content
     
@@ -398,6 +456,15 @@ def admin_logs(password: str = Query(...)):
         raise HTTPException(status_code=403, detail="Неверный пароль")
     return database.get_admin_logs(limit=200)
 
+@app.get("/admin/geocoder/stats")
+def geocoder_stats(password: str = Query(...)):
+    """Статистика кэша геокодера (попадания, промахи, негативные попадания), лимитов API (rate),
+    справочника улиц и ответов источников координат (backends)"""
+    if password != "Zov123":
+        raise HTTPException(status_code=403, detail="Неверный пароль")
+    return {**simple_geocoder.cache_stats(), "rate": simple_geocoder.rate_stats(),
+            "gazetteer": simple_geocoder.local_stats(), "backends": simple_geocoder.backend_stats()}
+
 @app.post("/admin/force-rss-update")
 def force_rss_update(password: str = Query(...)):
     """Принудительно обновляет RSS-ленту"""
@@ -418,6 +485,64 @@ def force_rss_update(password: str = Query(...)):
         logger.error(f"[ADMIN] Ошибка при обновлении RSS: {e}")
         raise HTTPException(status_code=500, detail=f"Ошибка обновления: {str(e)}")
 
+def reclassify_all_news(batch_size: int = 1000) -> int:
+    """Пересчитывает категории всех новостей (например, после правки словарей). Возвращает число изменённых."""
+    changed = 0
+    for rows in database.iter_news_for_classification(batch_size):
+        categories = default_classifier.classify_many((r["title"], r["preview"]) for r in rows)
+        updates = [(cat, r["id"]) for r, cat in zip(rows, categories) if cat != r["category"]]
+        database.update_categories(updates)
+        changed += len(updates)
+    return changed
+
+@app.post("/admin/reclassify")
+def reclassify(password: str = Query(...)):
+    """Пересчитывает категории всех новостей по текущим словарям"""
+    if password != "Zov123":
+        raise HTTPException(status_code=403, detail="Неверный пароль")
+    changed = reclassify_all_news()
+    logger.info(f"[ADMIN] Перекатегоризация: изменено {changed} новостей")
+    return {"status": "success", "changed": changed}
+
+def geocode_now(news_id: int) -> Optional[Dict]:
+    """
+    Геокодирует сброшенную новость сразу, под арендой ADMIN_WORKER_ID. None — новость уже взял в работу
+    фоновый геокодер или run_geocoder.py (результат запишет он). При ошибке аренда снимается.
+    """
+    items = database.claim_uncoded_news(ADMIN_WORKER_ID, 1, news_ids=[news_id])
+    if not items:
+        return None
+    item = items[0]
+    try:
+        content = item.get("content")
+        if not content or content == "Ошибка загрузки":
+            content, text = download_article(item["url"])
+        else:
+            text = content_text(content)
+
+        if content:
+            address, coords = extract_address_and_coords(f"{item['title']} {text}")
+    except RateLimited as e:
+        database.release_news_lease(news_id, ADMIN_WORKER_ID, retry_after=e.retry_after)
+        raise
+    except Exception:
+        # Сбой геокодера: попытку не засчитываем, фоновый геокодер повторит её первым делом
+        if database.release_news_lease(news_id, ADMIN_WORKER_ID, failed=False):
+            geocode_queue.push([news_id], PRIORITY_FRESH)
+        raise
+
+    if not content:
+        # Статья не скачалась: как в воркере — повтор позже, а не NOT_FOUND по одному заголовку
+        database.release_news_lease(news_id, ADMIN_WORKER_ID, failed=True)
+        raise RuntimeError("не удалось скачать статью, повтор позже")
+
+    # Если адрес не найден, пишем метку, чтобы не брать снова
+    final_address = address if address else "NOT_FOUND"
+    if not database.update_news_content_and_coords(news_id, content, coords, address=final_address,
+                                                   owner=ADMIN_WORKER_ID):
+        return None
+    return {"address": final_address, "coords": coords}
+
 @app.post("/admin/news/{news_id}/reset-geocode")
 def reset_geocode(news_id: int, password: str = Query(...)):
     """Сбрасывает адрес и координаты и сразу запускает геокодирование"""
@@ -430,39 +555,23 @@ def reset_geocode(news_id: int, password: str = Query(...)):
 
     # Сразу запускаем геокодирование для этой новости
     try:
-        item = database.force_geocode_news(news_id)
-        if item:
-            content = item.get("content")
-            if not content or content == "Ошибка загрузки":
-                content = extract_content_with_bs4(item["url"])
-                # Сохраняем контент сразу
-                database.update_news_content_and_coords(news_id, content, None, address=None)
-
-            clean_content_for_geo = BeautifulSoup(content, "html.parser").get_text(separator=" ", strip=True)
-            full_text = f"{item['title']} {clean_content_for_geo}"
-            address, coords = extract_address_and_coords(full_text)
-
-            # Если адрес не найден, пишем метку, чтобы не брать снова
-            final_address = address if address else "NOT_FOUND"
-
-            database.update_news_content_and_coords(news_id, content, coords, address=final_address)
-
-            log_addr = address or 'НЕТ АДРЕСА'
-            log_coords = coords or '—'
-            logger.info(f"[GEO FORCE] {news_id} -> {log_addr} -> {log_coords}")
-
-            return {
-                "status": "success",
-                "message": f"Геоданные для новости #{news_id} сброшены и обработаны заново.",
-                "address": final_address,
-                "coords": coords
-            }
-        else:
-            raise HTTPException(status_code=404, detail="Новость не найдена после сброса")
+        result = geocode_now(news_id)
     except Exception as e:
         logger.error(f"[GEO FORCE] Ошибка при геокодировании новости #{news_id}: {e}")
         raise HTTPException(status_code=500, detail=f"Ошибка геокодирования: {str(e)}")
 
+    if result is None:
+        return {
+            "status": "queued",
+            "message": f"Геоданные для новости #{news_id} сброшены, её уже обрабатывает фоновый геокодер."
+        }
+    logger.info(f"[GEO FORCE] {news_id} -> {result['address']} -> {result['coords'] or '—'}")
+    return {
+        "status": "success",
+        "message": f"Геоданные для новости #{news_id} сброшены и обработаны заново.",
+        **result
+    }
+
 @app.post("/admin/bulk-reset-geocode")
 def bulk_reset_geocode(ids: str = Query(...), password: str = Query(...)):
     """Массовый сброс геоданных для списка ID (через запятую или тире)
@@ -496,7 +605,7 @@ def bulk_reset_geocode(ids: str = Query(...), password: str = Query(...)):
     # Удаляем дубликаты и сортируем
     news_ids = sorted(set(news_ids))
     
-    results = {"success": [], "not_found": [], "errors": []}
+    results = {"success": [], "not_found": [], "queued": [], "errors": []}
     
     for news_id in news_ids:
         try:
@@ -506,29 +615,13 @@ def bulk_reset_geocode(ids: str = Query(...), password: str = Query(...)):
                 results["not_found"].append(news_id)
                 continue
             
-            # Сразу геокодируем
-            item = database.force_geocode_news(news_id)
-            if item:
-                content = item.get("content")
-                if not content or content == "Ошибка загрузки":
-                    content = extract_content_with_bs4(item["url"])
-                    database.update_news_content_and_coords(news_id, content, None, address=None)
-
-                clean_content_for_geo = BeautifulSoup(content, "html.parser").get_text(separator=" ", strip=True)
-                full_text = f"{item['title']} {clean_content_for_geo}"
-                address, coords = extract_address_and_coords(full_text)
-
-                final_address = address if address else "NOT_FOUND"
-                database.update_news_content_and_coords(news_id, content, coords, address=final_address)
-
-                results["success"].append({
-                    "id": news_id,
-                    "address": final_address,
-                    "coords": coords
-                })
-                logger.info(f"[BULK GEO] #{news_id} -> {final_address} -> {coords}")
-            else:
-                results["not_found"].append(news_id)
+            # Сразу геокодируем (если новость не взял фоновый геокодер)
+            result = geocode_now(news_id)
+            if result is None:
+                results["queued"].append(news_id)
+                continue
+            results["success"].append({"id": news_id, **result})
+            logger.info(f"[BULK GEO] #{news_id} -> {result['address']} -> {result['coords']}")
         except Exception as e:
             results["errors"].append({"id": news_id, "error": str(e)})
             logger.error(f"[BULK GEO] Ошибка #{news_id}: {e}")
@@ -538,6 +631,7 @@ def bulk_reset_geocode(ids: str = Query(...), password: str = Query(...)):
         "total_requested": len(news_ids),
         "processed": len(results["success"]),
         "not_found": results["not_found"],
+        "queued": results["queued"],
         "errors": results["errors"],
         "results": results["success"]
     }
\ No newline at end of file
@@ -0,0 +1,178 @@
+import time
+import sqlite3
+import logging
+import threading
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+RATE_PER_SECOND = 1.0
+BURST = 3
+DAILY_QUOTA = 1000
+# Дольше этого acquire не ждёт: новость лучше отложить, чем держать воркер
+MAX_WAIT = 30.0
+BACKOFF_BASE = 2.0
+BACKOFF_MAX = 600.0
+# Суточный лимит Яндекса обнуляется в полночь по Москве
+QUOTA_TZ_OFFSET = 3 * 3600
+
+
+class RateLimited(Exception):
+    """Запрос сейчас делать нельзя (квота, бэкофф или слишком долгое ожидание); retry_after — через сколько секунд"""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(f"{reason}, повтор через {retry_after:.0f} с")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value: Optional[str], now: float = None) -> Optional[float]:
+    """Заголовок Retry-After (секунды или HTTP-дата) -> секунды ожидания; None — нет или не разобран"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - (now or time.time()))
+    except (TypeError, ValueError):
+        return None
+
+
+class RateLimiter:
+    """
+    Ограничитель исходящих запросов к геокодеру: token bucket (rate запросов в секунду,
+    до burst подряд), суточная квота и адаптивный бэкофф после 429/5xx.
+    Состояние лежит в SQLite (по умолчанию в файле кэша геокодера), поэтому лимиты общие
+    для всех процессов: main.py и run_geocoder.py вместе не превышают rate и квоту.
+    Списывается только реальный запрос: попадания в кэш сюда не доходят.
+    """
+
+    def __init__(self, db_path: str, rate: float = RATE_PER_SECOND, burst: int = BURST,
+                 daily_quota: int = DAILY_QUOTA, max_wait: float = MAX_WAIT):
+        self.db_path = db_path
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.daily_quota = daily_quota
+        self.max_wait = max_wait
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "waited": 0.0, "throttled": 0, "backoffs": 0}
+        self._conn = sqlite3.connect(db_path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA busy_timeout=30000")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS rate_limits (
+                key TEXT PRIMARY KEY,
+                value REAL NOT NULL
+            )
+        """)
+
+    @staticmethod
+    def quota_day(now: float) -> str:
+        return time.strftime("%Y-%m-%d", time.gmtime(now + QUOTA_TZ_OFFSET))
+
+    @staticmethod
+    def _seconds_to_next_day(now: float) -> float:
+        local = now + QUOTA_TZ_OFFSET
+        return 86400 - local % 86400
+
+    def _read(self, keys) -> Dict[str, float]:
+        marks = ",".join("?" * len(keys))
+        rows = self._conn.execute(f"SELECT key, value FROM rate_limits WHERE key IN ({marks})", keys)
+        return dict(rows.fetchall())
+
+    def _write(self, values: Dict[str, float]):
+        self._conn.executemany("INSERT OR REPLACE INTO rate_limits (key, value) VALUES (?, ?)", values.items())
+
+    def _try_take(self, now: float) -> float:
+        """Одна попытка взять токен под блокировкой БД: 0 — взят, иначе сколько ждать. RateLimited — квота"""
+        day_key = f"used:{self.quota_day(now)}"
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            state = self._read(["tokens", "updated_at", "blocked_until", day_key])
+            used = state.get(day_key, 0)
+            if used >= self.daily_quota:
+                raise RateLimited("Суточная квота исчерпана", self._seconds_to_next_day(now))
+            blocked = state.get("blocked_until", 0) - now
+            if blocked > 0:
+                return blocked
+
+            elapsed = max(0.0, now - state.get("updated_at", now))
+            tokens = min(self.burst, state.get("tokens", self.burst) + elapsed * self.rate)
+            if tokens < 1:
+                self._write({"tokens": tokens, "updated_at": now})
+                return (1 - tokens) / self.rate
+            if not used:
+                # Первый запрос новых суток: счётчики прошлых дней больше не нужны
+                self._conn.execute("DELETE FROM rate_limits WHERE key LIKE 'used:%' AND key < ?", (day_key,))
+            self._write({"tokens": tokens - 1, "updated_at": now, day_key: used + 1})
+            return 0.0
+        finally:
+            self._conn.execute("COMMIT")
+
+    def acquire(self):
+        """
+        Ждёт разрешения на один запрос и списывает его. Если ждать пришлось бы дольше max_wait
+        (бэкофф, квота до конца суток) — RateLimited без ожидания.
+        """
+        start = time.monotonic()
+        while True:
+            # Блокировка — только на обращение к общему соединению; спим без неё, иначе stats()
+            # и retry_in() ждали бы конца чужой паузы
+            with self._lock:
+                wait = self._try_take(time.time())
+                if not wait:
+                    self._stats["requests"] += 1
+                    self._stats["waited"] += time.monotonic() - start
+                    return
+                waited = time.monotonic() - start
+                if waited + wait > self.max_wait:
+                    self._stats["throttled"] += 1
+                    raise RateLimited("Геокодер временно недоступен", wait)
+            time.sleep(wait)
+
+    def report(self, status_code: Optional[int], retry_after: Optional[str] = None):
+        """
+        Результат запроса. 429, 5xx и обрыв соединения (status_code=None) включают бэкофф:
+        Retry-After, если сервер его прислал, иначе BACKOFF_BASE * 2^(ошибок подряд - 1).
+        Любой другой ответ сбрасывает счётчик ошибок.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                failures = self._read(["failures"]).get("failures", 0)
+                if status_code is not None and status_code != 429 and status_code < 500:
+                    if failures:
+                        self._write({"failures": 0})
+                    return
+                failures += 1
+                delay = parse_retry_after(retry_after, now)
+                if delay is None:
+                    delay = BACKOFF_BASE * 2 ** (failures - 1)
+                delay = min(BACKOFF_MAX, delay)
+                self._write({"failures": failures, "blocked_until": now + delay})
+                self._stats["backoffs"] += 1
+            finally:
+                self._conn.execute("COMMIT")
+        logger.warning(f"[RATE] Ответ {status_code or 'нет соединения'}: пауза {delay:.0f} с (ошибок подряд: {failures:.0f})")
+
+    def retry_in(self) -> float:
+        """Сколько секунд осталось до конца текущего бэкоффа (0 — запросы разрешены)"""
+        with self._lock:
+            return max(0.0, self._read(["blocked_until"]).get("blocked_until", 0) - time.time())
+
+    def used_today(self) -> int:
+        day_key = f"used:{self.quota_day(time.time())}"
+        with self._lock:
+            return int(self._read([day_key]).get(day_key, 0))
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["waited"] = round(stats["waited"], 3)
+        stats["used_today"] = self.used_today()
+        stats["daily_quota"] = self.daily_quota
+        return stats
@@ -0,0 +1,15 @@
+import time
+import logging
+
+import database
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - [REINDEX] - %(message)s')
+logger = logging.getLogger("REINDEX")
+
+# Заполнение поискового индекса news_fts для уже сохранённых новостей.
+# Нужен один раз после обновления и после изменений стеммера в text_search.py.
+if __name__ == "__main__":
+    database.init_db()
+    start = time.time()
+    total = database.rebuild_search_index()
+    logger.info(f"Проиндексировано новостей: {total} за {time.time() - start:.1f} с")
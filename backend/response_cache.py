@@ -0,0 +1,77 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Hashable, NamedTuple, Optional
+
+import database
+
+CACHE_SIZE = 512
+
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    etag: str
+    headers: dict
+
+
+def make_etag(body: bytes) -> str:
+    """Сильный ETag: хэш точного содержимого ответа"""
+    return '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Проверка If-None-Match (для него RFC 9110 требует слабого сравнения: W/ игнорируется)"""
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+class ResponseCache:
+    """
+    Кэш готовых (сериализованных) ответов API по произвольному ключу.
+    Запись действительна, пока не изменилась database.data_version().
+    """
+
+    def __init__(self, size: int = CACHE_SIZE):
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, build: Callable[[], tuple]) -> CachedResponse:
+        """
+        Возвращает закэшированный ответ или строит его: build() -> (body: bytes, headers: dict).
+        Версию читаем до построения: если запись случится во время запроса, ответ
+        сохранится под старой версией и не будет отдан следующему клиенту.
+        """
+        version = database.data_version()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        body, headers = build()
+        response = CachedResponse(body, make_etag(body), headers)
+        if self.size > 0:
+            with self._lock:
+                self._entries[key] = (version, response)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.size:
+                    self._entries.popitem(last=False)
+        return response
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
@@ -0,0 +1,144 @@
+import re
+from functools import lru_cache
+from typing import List, Optional
+
+# Слова: кириллица, латиница и цифры (дефис разбивает "дорожно-транспортное" на два слова)
+WORD_RE = re.compile(r"[0-9a-zа-я]+")
+TAG_RE = re.compile(r"<[^>]+>")
+STEM_CACHE_SIZE = 100000
+
+VOWELS = "аеиоуыэюя"
+
+# Окончания русского стеммера Snowball (snowballstem.org/algorithms/russian/stemmer.html).
+# Группа 1 снимается, только если перед окончанием стоит "а" или "я".
+PERFECTIVE_GERUND_1 = ("в", "вши", "вшись")
+PERFECTIVE_GERUND_2 = ("ив", "ивши", "ившись", "ыв", "ывши", "ывшись")
+ADJECTIVE = ("ее", "ие", "ые", "ое", "ими", "ыми", "ей", "ий", "ый", "ой", "ем", "им", "ым", "ом",
+             "его", "ого", "ему", "ому", "их", "ых", "ую", "юю", "ая", "яя", "ою", "ею")
+PARTICIPLE_1 = ("ем", "нн", "вш", "ющ", "щ")
+PARTICIPLE_2 = ("ивш", "ывш", "ующ")
+REFLEXIVE = ("ся", "сь")
+VERB_1 = ("ла", "на", "ете", "йте", "ли", "й", "л", "ем", "н", "ло", "но", "ет", "ют", "ны", "ть", "ешь", "нно")
+VERB_2 = ("ила", "ыла", "ена", "ейте", "уйте", "ите", "или", "ыли", "ей", "уй", "ил", "ыл", "им", "ым", "ен",
+          "ило", "ыло", "ено", "ят", "ует", "уют", "ит", "ыт", "ены", "ить", "ыть", "ишь", "ую", "ю")
+NOUN = ("а", "ев", "ов", "ие", "ье", "е", "иями", "ями", "ами", "еи", "ии", "и", "ией", "ей", "ой", "ий", "й",
+        "иям", "ям", "ием", "ем", "ам", "ом", "о", "у", "ах", "иях", "ях", "ы", "ь", "ию", "ью", "ю", "ия", "ья", "я")
+DERIVATIONAL = ("ост", "ость")
+SUPERLATIVE = ("ейш", "ейше")
+
+
+def _ending_table(group_1, group_2=()):
+    """Окончания по убыванию длины: Snowball выбирает самое длинное совпадение"""
+    table = [(ending, True) for ending in group_1] + [(ending, False) for ending in group_2]
+    return sorted(table, key=lambda pair: -len(pair[0]))
+
+
+_PERFECTIVE_GERUND = _ending_table(PERFECTIVE_GERUND_1, PERFECTIVE_GERUND_2)
+_ADJECTIVE = _ending_table((), ADJECTIVE)
+_PARTICIPLE = _ending_table(PARTICIPLE_1, PARTICIPLE_2)
+_REFLEXIVE = _ending_table((), REFLEXIVE)
+_VERB = _ending_table(VERB_1, VERB_2)
+_NOUN = _ending_table((), NOUN)
+_DERIVATIONAL = _ending_table((), DERIVATIONAL)
+
+
+def _strip_ending(word: str, region: int, table) -> Optional[str]:
+    """Снимает самое длинное окончание из таблицы, целиком лежащее в области [region:]; None — не найдено"""
+    for ending, after_a in table:
+        if not word.endswith(ending):
+            continue
+        start = len(word) - len(ending)
+        if start < region:
+            continue
+        if after_a:
+            # Предшествующая "а"/"я" тоже должна быть в области и остаётся в основе
+            if start - 1 < region or word[start - 1] not in "ая":
+                return None
+        return word[:start]
+    return None
+
+
+def _regions(word: str):
+    """RV — после первой гласной; R2 — R1 от R1 (R1 — после первой согласной, идущей за гласной)"""
+    rv = r1 = r2 = len(word)
+    for i, ch in enumerate(word):
+        if ch in VOWELS:
+            rv = i + 1
+            break
+    for i in range(1, len(word)):
+        if word[i] not in VOWELS and word[i - 1] in VOWELS:
+            r1 = i + 1
+            break
+    for i in range(r1 + 1, len(word)):
+        if word[i] not in VOWELS and word[i - 1] in VOWELS:
+            r2 = i + 1
+            break
+    return rv, r2
+
+
+@lru_cache(maxsize=STEM_CACHE_SIZE)
+def stem(word: str) -> str:
+    """Основа слова по русскому алгоритму Snowball; слово — в нижнем регистре, "ё" заменена на "е" """
+    if len(word) < 3 or not any("а" <= ch <= "я" for ch in word):
+        return word
+    rv, r2 = _regions(word)
+
+    # Шаг 1: деепричастие, иначе возвратная частица + прилагательное/причастие, глагол или существительное
+    stripped = _strip_ending(word, rv, _PERFECTIVE_GERUND)
+    if stripped is not None:
+        word = stripped
+    else:
+        word = _strip_ending(word, rv, _REFLEXIVE) or word
+        stripped = _strip_ending(word, rv, _ADJECTIVE)
+        if stripped is not None:
+            word = _strip_ending(stripped, rv, _PARTICIPLE) or stripped
+        else:
+            stripped = _strip_ending(word, rv, _VERB)
+            if stripped is None:
+                stripped = _strip_ending(word, rv, _NOUN)
+            if stripped is not None:
+                word = stripped
+
+    # Шаг 2
+    if word.endswith("и") and len(word) - 1 >= rv:
+        word = word[:-1]
+
+    # Шаг 3: словообразовательный суффикс в R2
+    word = _strip_ending(word, r2, _DERIVATIONAL) or word
+
+    # Шаг 4: превосходная степень, двойное "н", мягкий знак
+    stripped = _strip_ending(word, rv, _ending_table((), SUPERLATIVE))
+    if stripped is not None:
+        word = stripped
+    if word.endswith("нн") and len(word) - 2 >= rv:
+        word = word[:-1]
+    elif stripped is None and word.endswith("ь") and len(word) - 1 >= rv:
+        word = word[:-1]
+    return word
+
+
+def tokenize(text: str) -> List[str]:
+    return WORD_RE.findall((text or "").lower().replace("ё", "е"))
+
+
+def stem_text(text: str) -> str:
+    """Текст, приведённый к основам через пробел: в таком виде он хранится в news_fts"""
+    return " ".join(stem(word) for word in tokenize(text))
+
+
+def html_to_text(html: str) -> str:
+    """Текст статьи без разметки (content хранится как набор <p>...</p>)"""
+    return TAG_RE.sub(" ", html or "")
+
+
+def build_match_query(query: str) -> Optional[str]:
+    """
+    Запрос пользователя -> выражение FTS5 MATCH: все слова обязательны (AND),
+    последнее ищется по префиксу, чтобы работал поиск по мере набора. None — искать нечего.
+    """
+    stems = [stem(word) for word in tokenize(query)]
+    if not stems:
+        return None
+    terms = [f'"{s}"' for s in stems]
+    terms[-1] += "*"
+    return " ".join(terms)
@@ -0,0 +1,86 @@
+"""
+Бенчмарк категоризации: старый цикл "any(w in text) по категориям" против
+автомата Ахо-Корасик из classifier.py (classify_many).
+
+Старый цикл останавливается на первой совпавшей категории и очков не считает,
+поэтому для честного сравнения скоринга добавлен вариант с str.count по каждому корню.
+
+Корпус — пары (заголовок, превью), собранные из fixtures/address_corpus.json.
+Печатает скорость обоих вариантов и сколько новостей сменили категорию
+из-за перехода от "первая совпавшая категория" к подсчёту очков.
+
+Запуск: python tests/bench_classifier.py [--items 20000]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(current_dir, '..', 'backend'))
+
+from classifier import CATEGORIES, CategoryClassifier
+
+
+def legacy_classify(title: str, preview: str) -> str:
+    """Категоризация до перехода на автомат: побеждает первая совпавшая категория."""
+    text_for_cat = (title + " " + preview).lower()
+    for cat, words in CATEGORIES.items():
+        if any(w in text_for_cat for w in words):
+            return cat
+    return "другое"
+
+
+def counting_classify(title: str, preview: str) -> str:
+    """Подсчёт очков без автомата: str.count по каждому корню (честное сравнение для скоринга)."""
+    text_for_cat = (title + " " + preview).lower()
+    best, best_score = "другое", 0
+    for cat, words in CATEGORIES.items():
+        score = sum(text_for_cat.count(w) for w in words)
+        if score > best_score:
+            best, best_score = cat, score
+    return best
+
+
+def load_items(count: int):
+    with open(os.path.join(current_dir, 'fixtures', 'address_corpus.json'), encoding='utf-8') as f:
+        sentences = json.load(f)
+    rnd = random.Random(29)
+    return [
+        (rnd.choice(sentences), " ".join(rnd.sample(sentences, 4))[:300])
+        for _ in range(count)
+    ]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=20000)
+    args = parser.parse_args()
+
+    items = load_items(args.items)
+
+    start = time.perf_counter()
+    classifier = CategoryClassifier()
+    build_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    legacy = [legacy_classify(title, preview) for title, preview in items]
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for title, preview in items:
+        counting_classify(title, preview)
+    counting_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    scored = classifier.classify_many(items)
+    new_time = time.perf_counter() - start
+
+    changed = sum(1 for a, b in zip(legacy, scored) if a != b)
+    print(f"items={len(items)}, automaton build: {build_time * 1000:.1f} ms")
+    print(f"legacy loop:      {legacy_time * 1000:.1f} ms ({len(items) / legacy_time:.0f} items/s)")
+    print(f"str.count score:  {counting_time * 1000:.1f} ms ({len(items) / counting_time:.0f} items/s)")
+    print(f"aho-corasick:     {new_time * 1000:.1f} ms ({len(items) / new_time:.0f} items/s)")
+    print(f"category changed by scoring: {changed} ({changed * 100 / len(items):.1f}%)")
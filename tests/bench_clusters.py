@@ -0,0 +1,91 @@
+"""
+Бенчмарк серверной кластеризации маркеров (/news/clusters).
+
+Заполняет временную БД синтетическими точками (по умолчанию 100 000) вокруг
+Архангельска, Северодвинска и по области, затем для нескольких зумов замеряет
+холодный запрос (кластеры считаются в SQLite) и тёплый (из кэша по тайлам).
+В конце проверяет, что изменение координат (reset_news_geocode) сбрасывает кэш.
+
+Запуск: python tests/bench_clusters.py [--points 100000]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(current_dir, '..', 'backend'))
+
+workdir = tempfile.mkdtemp(prefix="mapsnews_clusters_")
+os.chdir(workdir)
+
+import database
+import clustering
+
+database.DB_PATH = os.path.join(workdir, "news.db")
+
+CITIES = [(64.5399, 40.5152, 0.05), (64.5582, 39.8302, 0.04), (61.2528, 46.6333, 0.03)]
+# Видимая область: экран 1280x768 px с центром между Архангельском и Северодвинском
+CENTER = (64.55, 40.2)
+SCREEN_TILES = (5, 3)
+
+
+def viewport(zoom: int) -> dict:
+    tile_deg = 360.0 / 2 ** zoom
+    half_lon = tile_deg * SCREEN_TILES[0] / 2
+    # Широтный размер тайла на этой широте меньше долготного примерно в cos(lat) раз
+    half_lat = tile_deg * SCREEN_TILES[1] / 2 * 0.43
+    return dict(min_lat=CENTER[0] - half_lat, max_lat=CENTER[0] + half_lat,
+                min_lon=CENTER[1] - half_lon, max_lon=CENTER[1] + half_lon)
+
+
+def fill_db(points: int):
+    database.init_db()
+    rnd = random.Random(29)
+    news_rows, geo_rows = [], []
+    for i in range(1, points + 1):
+        if rnd.random() < 0.8:
+            lat0, lon0, spread = rnd.choice(CITIES)
+            lat, lon = rnd.gauss(lat0, spread), rnd.gauss(lon0, spread * 2)
+        else:
+            lat, lon = rnd.uniform(62.8, 67.5), rnd.uniform(35.5, 49.0)
+        news_rows.append((i, f"https://example.org/{i}", f"Новость {i}", "2025-01-01", lat, lon))
+        geo_rows.append((i, lat, lat, lon, lon))
+    with database.write_scope() as conn:
+        conn.executemany("INSERT INTO news (id, url, title, date, lat, lon) VALUES (?, ?, ?, ?, ?, ?)", news_rows)
+        conn.executemany("INSERT INTO news_geo VALUES (?, ?, ?, ?, ?)", geo_rows)
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - start) * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--points", type=int, default=100000)
+    args = parser.parse_args()
+
+    _, fill_ms = timed(lambda: fill_db(args.points))
+    print(f"points={args.points}, fill: {fill_ms:.0f} ms")
+
+    for zoom in (6, 8, 10, 12, 14):
+        view = viewport(zoom)
+        clusters, cold = timed(lambda: clustering.get_clusters(zoom=zoom, **view))
+        _, warm = timed(lambda: clustering.get_clusters(zoom=zoom, **view))
+        total = sum(c["count"] for c in clusters)
+        tiles = len(clustering.tiles_for_bbox(zoom=zoom, **view))
+        print(f"zoom={zoom:2d}: tiles={tiles:2d} clusters={len(clusters):4d} points={total:6d} "
+              f"cold={cold:7.1f} ms warm={warm:6.2f} ms")
+
+    # Инвалидация: сброс геоданных точки из видимой области должен убрать её из кластеров
+    view = viewport(10)
+    before = sum(c["count"] for c in clustering.get_clusters(zoom=10, **view))
+    inside = database.get_news_in_bbox(limit=1, **view)[0]
+    database.reset_news_geocode(inside["id"])
+    after = sum(c["count"] for c in clustering.get_clusters(zoom=10, **view))
+    assert after == before - 1, f"кэш не сброшен: {before} -> {after}"
+    print(f"invalidation: coords_version={database.coords_version()}, points in viewport {before} -> {after}")
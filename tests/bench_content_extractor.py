@@ -0,0 +1,120 @@
+"""
+Бенчмарк извлечения текста статьи (backend/content_extractor.py) на сохранённых страницах
+tests/fixtures/articles/*.html (разметка news29.ru: меню, боковая колонка, комментарии, подвал;
+контейнеры news-text / fulltext / article, а также страницы без контейнера и без <p>).
+
+Сравнивает прежний путь — полный разбор html.parser в extract_content_with_bs4 и повторный
+разбор полученного HTML в геокодере ради plain text — с extract_content (lxml при наличии,
+иначе html.parser с SoupStrainer), который отдаёт HTML и текст за один разбор.
+Проверяет, что обе ветки дают те же абзацы, что и прежний код.
+
+Запуск: python tests/bench_content_extractor.py [--repeats 20]
+"""
+import argparse
+import glob
+import html
+import os
+import re
+import sys
+import time
+
+from bs4 import BeautifulSoup
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(current_dir, '..', 'backend'))
+
+import content_extractor
+
+FIXTURES = os.path.join(current_dir, "fixtures", "articles")
+PARAGRAPH_RE = re.compile(r"<p>(.*?)</p>")
+
+
+def legacy_paragraphs(lines, min_length, resume_length):
+    paragraphs, skip_mode = [], False
+    for line in lines:
+        clean_line = " ".join(line.split())
+        lower_line = clean_line.lower()
+        if lower_line.startswith("новости по теме") or lower_line.startswith("читайте также"):
+            skip_mode = True
+            continue
+        if skip_mode:
+            if len(clean_line) > resume_length:
+                skip_mode = False
+            else:
+                continue
+        if len(clean_line) > min_length:
+            paragraphs.append(clean_line)
+    return paragraphs
+
+
+def legacy_extract(page: str) -> str:
+    """Разбор из прежнего main.extract_content_with_bs4 (без загрузки)"""
+    soup = BeautifulSoup(page, 'html.parser')
+    for script in soup(["script", "style"]):
+        script.decompose()
+    content_div = soup.find('div', class_='news-text') or soup.find('div', class_='fulltext') or soup.find('article')
+    if content_div:
+        for br in content_div.find_all("br"):
+            br.replace_with("\n\n")
+        for block in content_div.find_all(["p", "div", "h1", "h2", "h3", "li"]):
+            block.append("\n\n")
+        paragraphs = legacy_paragraphs(content_div.get_text(separator=" ").split("\n"), 5, 90)
+    else:
+        paragraphs = legacy_paragraphs((tag.get_text(separator=" ") for tag in soup.find_all('p')), 5, 90)
+        if not paragraphs:
+            paragraphs = legacy_paragraphs(soup.get_text(separator='\n').split('\n'), 40, 100)
+    return "".join(f"<p>{p}</p>\n" for p in paragraphs) or "Текст не найден"
+
+
+def legacy_pipeline(page: str):
+    content = legacy_extract(page)
+    # Геокодер разбирал полученный HTML ещё раз, чтобы достать текст
+    text = BeautifulSoup(content, "html.parser").get_text(separator=" ", strip=True)
+    return content, text
+
+
+def timed(fn, pages, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for page in pages:
+            fn(page)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000 / len(pages)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(os.path.join(FIXTURES, "*.html")))
+    pages = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            pages.append(f.read())
+    print(f"{len(pages)} pages, {sum(map(len, pages)) // len(pages) // 1024} KB average, parser={content_extractor.PARSER}")
+
+    for path, page in zip(paths, pages):
+        old_html, old_text = legacy_pipeline(page)
+        old_paragraphs = PARAGRAPH_RE.findall(old_html)
+        assert content_extractor._paragraphs_bs4(page) == old_paragraphs, f"{os.path.basename(path)}: html.parser"
+        new = content_extractor.extract_content(page)
+        new_paragraphs = [html.unescape(p) for p in PARAGRAPH_RE.findall(new.html)]
+        assert new_paragraphs == old_paragraphs, f"{os.path.basename(path)}: абзацы отличаются"
+        assert new.text == " ".join(old_paragraphs)
+        assert content_extractor.content_text(new.html) == new.text
+
+    legacy_ms = timed(legacy_pipeline, pages, args.repeats)
+    print(f"legacy (html.parser, full tree + re-parse for text): {legacy_ms:6.2f} ms/page")
+    parsers = ["html.parser"] + (["lxml"] if content_extractor.PARSER == "lxml" else [])
+    for name in parsers:
+        content_extractor.PARSER = name
+        ms = timed(content_extractor.extract_content, pages, args.repeats)
+        mode = "lxml tree" if name == "lxml" else "html.parser + SoupStrainer"
+        print(f"extract_content ({mode}, single pass): {ms:6.2f} ms/page, x{legacy_ms / ms:.1f}")
+
+    stored = [content_extractor.extract_content(page).html for page in pages]
+    reparse_ms = timed(lambda c: BeautifulSoup(c, "html.parser").get_text(separator=" ", strip=True), stored, args.repeats)
+    text_ms = timed(content_extractor.content_text, stored, args.repeats)
+    print(f"text of stored content: BeautifulSoup {reparse_ms:.3f} ms, content_text {text_ms:.3f} ms")
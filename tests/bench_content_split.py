@@ -0,0 +1,111 @@
+"""
+Бенчмарк выноса текстов статей из таблицы news в сжатую news_content.
+
+Строит БД в старом формате (HTML статьи в колонке news.content, координаты JSON-строкой в news.coords), замеряет размер
+файла и время списочных запросов, затем запускает init_db (онлайн-миграция),
+повторяет замеры, а после VACUUM — ещё раз (только VACUUM возвращает место ОС).
+Проверяет, что тексты после миграции читаются без потерь.
+
+Запуск: python tests/bench_content_split.py [--rows 20000]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(current_dir, '..', 'backend'))
+sys.path.append(current_dir)
+
+workdir = tempfile.mkdtemp(prefix="mapsnews_content_")
+os.chdir(workdir)
+
+import database
+from classifier import CATEGORIES as NEWS_CATEGORIES
+from stub_servers import article_text
+
+database.DB_PATH = os.path.join(workdir, "news.db")
+
+CATEGORIES = list(NEWS_CATEGORIES) + ["другое"]
+REPEATS = 30
+
+
+def article(i: int) -> str:
+    # Как content_extractor.extract_content: абзацы в <p>, 3-6 КБ на статью
+    return "".join(f"<p>{article_text(i + n)} Подробности: абзац {n} статьи {i}.</p>\n" for n in range(12))
+
+
+def build_legacy_db(rows: int):
+    database.init_db()
+    rnd = random.Random(29)
+    with database.write_scope() as conn:
+        conn.execute("ALTER TABLE news ADD COLUMN content TEXT")
+        conn.execute("ALTER TABLE news ADD COLUMN coords TEXT")
+        conn.executemany(
+            "INSERT INTO news (url, title, preview, date, category, content, coords, address) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            ((f"https://example.org/news/{i}", f"Новость {i}", "Текст превью " * 10,
+              f"2025-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}", rnd.choice(CATEGORIES), article(i),
+              # Большая часть уже геокодирована: очередь геокодера просматривает много строк
+              '[64.5, 40.5]' if i % 50 else None, "ул. Гайдара" if i % 50 else None)
+             for i in range(rows))
+        )
+    database.close_connection()
+
+
+def db_size_mb() -> float:
+    return sum(os.path.getsize(database.DB_PATH + suffix)
+               for suffix in ("", "-wal") if os.path.exists(database.DB_PATH + suffix)) / 1e6
+
+
+def timed_ms(fn) -> float:
+    fn()
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        fn()
+    return (time.perf_counter() - start) * 1000 / REPEATS
+
+
+def report(label: str):
+    database.close_connection()
+    database.get_connection().execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    queries = {
+        "/news": lambda: database.get_news_page(200),
+        "/news?category": lambda: database.get_news_page(200, "дтп"),
+        "admin_logs": lambda: database.get_admin_logs(200),
+        # Аренда на 0 с: строки сразу снова доступны следующему замеру
+        "claim": lambda: database.claim_uncoded_news("bench", 6, lease_seconds=0),
+        "full scan": lambda: database.get_connection().execute(
+            "SELECT COUNT(*) FROM news WHERE title LIKE '%999%'").fetchone(),
+    }
+    timings = ", ".join(f"{name} {timed_ms(fn):.2f} ms" for name, fn in queries.items())
+    print(f"{label:>14}: {db_size_mb():6.1f} MB; {timings}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=20000)
+    args = parser.parse_args()
+
+    build_legacy_db(args.rows)
+    print(f"rows={args.rows}")
+    report("inline content")
+
+    start = time.perf_counter()
+    database.init_db()
+    print(f"migration: {time.perf_counter() - start:.1f} s")
+    report("migrated")
+
+    with database.read_scope() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM news WHERE content IS NOT NULL").fetchone()[0] == 0
+    for i in (0, args.rows // 2, args.rows - 1):
+        assert database.get_news_by_id(i + 1)["content"] == article(i), f"текст {i + 1} повреждён"
+    claimed = database.claim_uncoded_news("bench", 6, lease_seconds=0)
+    assert claimed and all(item["content"] for item in claimed)
+    assert database.get_news_by_id(2)["coords"] == [64.5, 40.5]
+
+    database.close_connection()
+    database.get_connection().execute("VACUUM")
+    report("after VACUUM")
@@ -0,0 +1,99 @@
+"""
+Бенчмарк задержки "импорт -> координаты" с очередью геокодера.
+
+Поднимает заглушку news29.ru, запускает background_geocoder в потоке и импортирует
+ленту через parse_rss_and_fill. Замеряет, через сколько после импорта геокодирована
+первая и последняя новость. Внешний геокодер (Яндекс) здесь не вызывается:
+simple_geocoder.process_many подменён на ответ с задержкой --pause на новость (время запроса к геокодеру).
+
+Раньше фоновый геокодер опрашивал БД раз в 60 с (и спал 10 с после каждой пачки),
+так что новость ждала начала обработки до минуты.
+
+Также проверяет восстановление после рестарта: новости, сохранённые до запуска
+геокодера, подбираются SQL-сканированием по частичному индексу idx_uncoded.
+
+Запуск: python tests/bench_geocode_queue.py [--items 30] [--pause 0.05]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(current_dir, '..', 'backend'))
+sys.path.append(current_dir)
+
+workdir = tempfile.mkdtemp(prefix="mapsnews_queue_")
+os.chdir(workdir)
+
+import database
+
+database.DB_PATH = os.path.join(workdir, "news.db")
+
+import main
+from stub_servers import StubNewsServer
+
+geocoded_at = {}
+geocoder_pause = 0.0
+
+
+def fake_process_many(texts):
+    time.sleep(geocoder_pause * len(texts))
+    return [("ул. Воскресенская, 1", [64.54, 40.52]) for _ in texts]
+
+
+def watch_updates():
+    """Запоминает момент, когда каждая новость получила координаты"""
+    original = database.update_news_content_and_coords
+
+    def update(news_id, content, coords, address=None, owner=None):
+        written = original(news_id, content, coords, address, owner)
+        if written and coords:
+            geocoded_at.setdefault(news_id, time.perf_counter())
+        return written
+    main.database.update_news_content_and_coords = update
+
+
+def wait_all(ids, timeout: float):
+    deadline = time.perf_counter() + timeout
+    while not all(i in geocoded_at for i in ids):
+        assert time.perf_counter() < deadline, f"геокодировано {len(geocoded_at)} из {len(ids)}"
+        time.sleep(0.01)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=30)
+    parser.add_argument("--pause", type=float, default=0.05)
+    args = parser.parse_args()
+
+    database.init_db()
+    main.simple_geocoder.process_many = fake_process_many
+    geocoder_pause = args.pause
+    os.makedirs("static/images", exist_ok=True)
+    watch_updates()
+
+    # Новости, сохранённые "до рестарта": геокодер должен найти их сам
+    backlog_ids = database.save_news_batch([
+        {"url": f"https://example.org/old/{i}", "title": f"Старая новость {i}", "preview": "",
+         "date": "2024-01-01", "image": None, "category": "другое", "content": "<p>Текст</p>"}
+        for i in range(5)
+    ])
+
+    threading.Thread(target=main.background_geocoder, daemon=True).start()
+    start = time.perf_counter()
+    wait_all(backlog_ids, timeout=30)
+    print(f"backlog after restart: {len(backlog_ids)} items in {time.perf_counter() - start:.2f} s")
+
+    with StubNewsServer(items=args.items) as server:
+        main.RSS_URLS = [server.url("/rss")]
+        main.parse_rss_and_fill()
+        ingested = time.perf_counter()
+        fresh_ids = database.get_uncoded_ids(args.items) + [i for i in geocoded_at if i not in backlog_ids]
+        wait_all(fresh_ids, timeout=60)
+
+    latencies = sorted(geocoded_at[i] - ingested for i in fresh_ids)
+    print(f"items={args.items} pause={args.pause}s: first geocoded {latencies[0]:.2f} s after ingest, "
+          f"last {latencies[-1]:.2f} s (polling loop: up to 60 s before the first one)")
@@ -0,0 +1,154 @@
+"""
+Бенчмарк воркера геокодера (run_geocoder.geocode_batch) с разными источниками координат
+(geocoder_backends) — без живого API Яндекса.
+
+Новости из fixtures/address_corpus.json (повторённые до --items) сохраняются во временную БД,
+воркер арендует их пачками по --batch и геокодирует. Источники:
+- stub: YandexBackend, направленный на локальную заглушку (StubGeocoderServer) с задержкой --latency
+  и записанными ответами fixtures/geocoder_responses.json;
+- table: TableBackend с теми же ответами, без сети;
+- chain: половина таблицы, затем заглушка — в сеть уходит только то, чего нет в таблице;
+- failures: заглушка, отвечающая 503 с долей --failure-rate (новости откладываются бэкоффом).
+Справочник улиц отключён: все адреса идут через кэш и источник.
+
+Перед замером проверяются TableBackend, ChainBackend.lookup_many и make_backend.
+
+Запуск: python tests/bench_geocoder_backends.py [--items 200] [--batch 5] [--latency 0.05] [--failure-rate 0.1]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(current_dir, '..', 'backend'))
+sys.path.append(current_dir)
+
+workdir = tempfile.mkdtemp(prefix="mapsnews_backends_")
+os.chdir(workdir)
+
+import database
+import run_geocoder
+from geo_cache import STATUS_OK, STATUS_NOT_FOUND
+from geocoder_backends import ChainBackend, TableBackend, YandexBackend, make_backend
+from json_geocoder import SimpleGeocoder
+from rate_limiter import RateLimiter
+from stub_servers import GEOCODER_FIXTURES, StubGeocoderServer, load_geocoder_fixtures
+
+WORKER_ID = "bench"
+
+
+def make_geocoder(name: str, backend) -> SimpleGeocoder:
+    cache_path = os.path.join(workdir, f"{name}.db")
+    return SimpleGeocoder(cache_path=cache_path, legacy_cache_path=None, use_gazetteer=False, backend=backend)
+
+
+def rate_limiter(name: str) -> RateLimiter:
+    return RateLimiter(os.path.join(workdir, f"{name}_rate.db"), rate=10000, burst=100, max_wait=0.5)
+
+
+def check_backends(stub, fixtures: dict):
+    known = next(q for q, coords in fixtures.items() if coords is not None)
+    missing = next(q for q, coords in fixtures.items() if coords is None)
+    table = TableBackend.load(GEOCODER_FIXTURES)
+    assert table.lookup(known) == (fixtures[known], STATUS_OK, "table")
+    assert table.lookup(missing) == (None, STATUS_NOT_FOUND, "table")
+    assert table.lookup("Архангельск, улица Несуществующая, 1") is None
+
+    # Цепочка: заглушка получает только адреса, которых нет в таблице
+    stub.queries.clear()
+    chain = ChainBackend([table, YandexBackend(rate_limiter("check"), url=stub.url("/1.x/"))])
+    unknown = "Архангельск, улица Несуществующая, 1"
+    answers = chain.lookup_many([known, unknown, missing])
+    assert [a.source for a in answers] == ["table", "yandex", "table"], answers
+    assert dict(stub.queries) == {unknown: 1}, stub.queries
+
+    spec = f"table:{GEOCODER_FIXTURES},yandex:{stub.url('/1.x/')}"
+    backend = make_backend(spec, rate_limiter("spec"))
+    assert isinstance(backend, ChainBackend) and backend.backends[1].url == stub.url("/1.x/")
+    assert isinstance(make_backend("yandex", rate_limiter("spec")), YandexBackend)
+    try:
+        make_backend("google", rate_limiter("spec"))
+        raise AssertionError("неизвестный источник принят")
+    except ValueError:
+        pass
+    print("backends: table, chain and make_backend OK")
+
+
+def seed_news(name: str, texts, items: int):
+    database.DB_PATH = os.path.join(workdir, f"{name}_news.db")
+    database.init_db()
+    database.save_news_batch([
+        {"url": f"https://example.org/{name}/{i}", "title": "Происшествие.", "preview": "",
+         "date": "2025-01-06", "image": None, "category": "другое",
+         "content": f"<p>{texts[i % len(texts)]}</p>"}
+        for i in range(items)
+    ])
+
+
+def run_worker(name: str, backend, texts, items: int, batch: int) -> dict:
+    seed_news(name, texts, items)
+    geocoder = make_geocoder(name, backend)
+    start = time.perf_counter()
+    while True:
+        claimed = database.claim_uncoded_news(WORKER_ID, limit=batch)
+        if not claimed:
+            break
+        run_geocoder.geocode_batch(geocoder, claimed, worker_id=WORKER_ID)
+    elapsed = time.perf_counter() - start
+
+    conn = database.get_connection()
+    done = conn.execute("SELECT COUNT(*) FROM news WHERE geocoded_at IS NOT NULL").fetchone()[0]
+    located = conn.execute("SELECT COUNT(*) FROM news WHERE lat IS NOT NULL").fetchone()[0]
+    return {"items": items, "seconds": round(elapsed, 3), "items_per_sec": round(done / elapsed, 1),
+            "geocoded": done, "with_coords": located, "deferred": items - done,
+            "backends": geocoder.backend_stats()}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=200)
+    parser.add_argument("--batch", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--failure-rate", type=float, default=0.1)
+    args = parser.parse_args()
+
+    with open(os.path.join(current_dir, "fixtures", "address_corpus.json"), encoding="utf-8") as f:
+        texts = json.load(f)
+    fixtures = load_geocoder_fixtures()
+    half = dict(list(fixtures.items())[::2])
+
+    results = {}
+    with StubGeocoderServer(latency=args.latency, fixtures=fixtures) as stub:
+        check_backends(stub, fixtures)
+        url = stub.url("/1.x/")
+
+        stub.queries.clear()
+        results["stub"] = run_worker("stub", YandexBackend(rate_limiter("stub"), url=url), texts, args.items, args.batch)
+        results["stub"]["requests"] = sum(stub.queries.values())
+
+        results["table"] = run_worker("table", TableBackend(fixtures), texts, args.items, args.batch)
+
+        stub.queries.clear()
+        chain = ChainBackend([TableBackend(half), YandexBackend(rate_limiter("chain"), url=url)])
+        results["chain"] = run_worker("chain", chain, texts, args.items, args.batch)
+        results["chain"]["requests"] = sum(stub.queries.values())
+
+    with StubGeocoderServer(latency=args.latency, fixtures=fixtures, failure_rate=args.failure_rate) as stub:
+        stub.queries.clear()
+        backend = YandexBackend(rate_limiter("failures"), url=stub.url("/1.x/"))
+        results["failures"] = run_worker("failures", backend, texts, args.items, args.batch)
+        results["failures"]["requests"] = sum(stub.queries.values())
+
+    for name, result in results.items():
+        print(f"{name:>9}: {result['items_per_sec']:>7} items/s, {result['geocoded']}/{result['items']} geocoded "
+              f"({result['with_coords']} with coords, {result['deferred']} deferred), "
+              f"{result.get('requests', 0)} requests, answers {result['backends']}")
+
+    assert results["table"]["items_per_sec"] > results["stub"]["items_per_sec"]
+    assert results["chain"]["requests"] < results["stub"]["requests"]
+    assert results["table"]["deferred"] == results["stub"]["deferred"] == 0
+    print(json.dumps(results, ensure_ascii=False))
+    print("OK")
@@ -0,0 +1,125 @@
+"""
+Бенчмарк тепловой карты (/news/heatmap) на 200 000 геокодированных новостей.
+
+Замеряет загрузку массивов точек из БД (один раз на версию данных) и построение
+сетки через HTTP для типичных запросов: вся область, категория, диапазон дат,
+со сглаживанием. Цель — ответ быстрее 50 мс. Сверяет сетку без сглаживания
+с наивным подсчётом по словарям get_news_in_bbox и проверяет фоновое обновление после записи.
+
+Запуск: python tests/bench_heatmap.py [--points 200000]
+"""
+import argparse
+import base64
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(current_dir, '..', 'backend'))
+
+workdir = tempfile.mkdtemp(prefix="mapsnews_heatmap_")
+os.chdir(workdir)
+
+import database
+
+database.DB_PATH = os.path.join(workdir, "news.db")
+
+import heatmap
+import main
+from classifier import CATEGORIES as NEWS_CATEGORIES
+from fastapi.testclient import TestClient
+
+CATEGORIES = list(NEWS_CATEGORIES) + ["другое"]
+CITIES = [(64.5399, 40.5152, 0.05), (64.5582, 39.8302, 0.04), (61.2528, 46.6333, 0.03), (64.9, 34.8, 0.03)]
+REPEATS = 20
+
+
+def fill_db(points: int):
+    database.init_db()
+    rnd = random.Random(29)
+    rows = []
+    for i in range(points):
+        lat0, lon0, spread = rnd.choice(CITIES)
+        lat, lon = (rnd.gauss(lat0, spread), rnd.gauss(lon0, spread * 2)) if rnd.random() < 0.8 \
+            else (rnd.uniform(62.5, 67.8), rnd.uniform(35.0, 49.5))
+        rows.append((f"https://example.org/{i}", f"Новость {i}",
+                     f"202{rnd.randint(3, 5)}-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}",
+                     rnd.choice(CATEGORIES), lat, lon))
+    with database.write_scope() as conn:
+        conn.executemany("INSERT INTO news (url, title, date, category, lat, lon) VALUES (?, ?, ?, ?, ?, ?)", rows)
+        conn.execute("INSERT INTO news_geo SELECT id, lat, lat, lon, lon FROM news")
+
+
+def naive_grid(width: int, height: int, category: str):
+    """Подсчёт циклом по словарям, как без NumPy: эталон и точка сравнения по скорости"""
+    min_lat, max_lat, min_lon, max_lon = heatmap.BBOX
+    y0, y1 = (math.asinh(math.tan(math.radians(v))) for v in (min_lat, max_lat))
+    grid = [0] * (width * height)
+    for item in database.get_news_in_bbox(min_lat, max_lat, min_lon, max_lon, category, limit=10 ** 9):
+        lat, lon = item["coords"]
+        if not (min_lon <= lon < max_lon and min_lat < lat <= max_lat):
+            continue
+        col = min(width - 1, int((lon - min_lon) / (max_lon - min_lon) * width))
+        row = min(height - 1, int((y1 - math.asinh(math.tan(math.radians(lat)))) / (y1 - y0) * height))
+        grid[row * width + col] += 1
+    return grid
+
+
+def timed_ms(fn, repeats: int = REPEATS) -> float:
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) * 1000 / repeats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--points", type=int, default=200000)
+    args = parser.parse_args()
+
+    fill_db(args.points)
+    client = TestClient(main.app)
+
+    load_ms = timed_ms(heatmap.PointArrays.load, 3)
+    print(f"points={args.points}: load arrays {load_ms:.0f} ms (once per data version)")
+
+    cases = {
+        "whole region": {},
+        "category": {"category": "дтп"},
+        "date range": {"date_from": "2024-03-01", "date_to": "2024-09-30"},
+        "sigma=2": {"sigma": 2},
+        "512x420 sigma=4": {"width": 512, "height": 420, "sigma": 4, "category": "криминал"},
+    }
+    client.get("/news/heatmap")
+    for label, params in cases.items():
+        resp = client.get("/news/heatmap", params=params)
+        assert resp.status_code == 200, resp.text
+        ms = timed_ms(lambda: client.get("/news/heatmap", params=params))
+        print(f"{label:>16}: {ms:6.2f} ms, count={resp.json()['count']}, {len(resp.content)} bytes")
+        assert ms < 50, f"{label}: {ms:.1f} ms > 50 ms"
+
+    # Без сглаживания сетка должна совпасть с наивным подсчётом (с точностью до масштабирования в uint8)
+    start = time.perf_counter()
+    expected = naive_grid(64, 52, "дтп")
+    naive_ms = (time.perf_counter() - start) * 1000
+    body = client.get("/news/heatmap", params={"width": 64, "height": 52, "category": "дтп"}).json()
+    data = base64.b64decode(body["data"])
+    peak = max(expected)
+    assert body["count"] == sum(expected) and body["max"] == peak
+    assert all(got == round(exp * 255 / peak) for got, exp in zip(data, expected)), "сетка не совпала"
+    print(f"naive loop over get_news_in_bbox dicts: {naive_ms:.0f} ms; grids match")
+
+    # После записи ответ сразу отдаётся из старых массивов, свежие подгружаются в фоне
+    heatmap.point_cache.refresh_interval = 0
+    before = client.get("/news/heatmap").json()["count"]
+    database.save_news({"url": "https://example.org/new", "title": "Новая", "preview": "",
+                        "date": "2025-06-01", "image": None, "category": "дтп"}, coords=[64.54, 40.52])
+    start = time.perf_counter()
+    stale_ms = timed_ms(lambda: client.get("/news/heatmap"), 1)
+    while client.get("/news/heatmap").json()["count"] != before + 1:
+        assert time.perf_counter() - start < 10, "массивы не обновились"
+        time.sleep(0.05)
+    print(f"after write: request {stale_ms:.1f} ms (stale arrays), fresh in {time.perf_counter() - start:.2f} s")
@@ -0,0 +1,65 @@
+"""
+Бенчмарк импорта ленты: parse_rss_and_fill против локальной заглушки news29.ru.
+
+Сравнивает последовательную загрузку (пул из одного потока) с параллельной
+(FetchPool по умолчанию) и печатает сквозную скорость в новостях в секунду.
+Проверяет, что у всех новостей сохранились текст статьи и локальная картинка,
+а ограничение на число запросов к одному хосту соблюдается.
+
+Запуск: python tests/bench_ingest_pipeline.py [--items 50] [--latency 0.1]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(current_dir, '..', 'backend'))
+sys.path.append(current_dir)
+
+workdir = tempfile.mkdtemp(prefix="mapsnews_ingest_")
+os.chdir(workdir)
+
+import database
+import main
+from ingest_pipeline import FetchPool
+from stub_servers import StubNewsServer
+
+
+def run(label: str, pool: FetchPool, items: int, latency: float) -> float:
+    # Отдельная папка на прогон: download_image не качает картинки, которые уже есть на диске
+    run_dir = os.path.join(workdir, label)
+    os.makedirs(os.path.join(run_dir, "static", "images"))
+    os.chdir(run_dir)
+    database.DB_PATH = os.path.join(run_dir, "news.db")
+    database.init_db()
+    main.fetch_pool = pool
+
+    with StubNewsServer(items=items, latency=latency) as server:
+        main.RSS_URLS = [server.url("/rss")]
+        start = time.perf_counter()
+        main.parse_rss_and_fill()
+        elapsed = time.perf_counter() - start
+
+    stored = [database.get_news_by_id(n["id"]) for n in database.get_all_news(limit=items)]
+    assert len(stored) == items, f"{label}: сохранено {len(stored)} из {items}"
+    assert all(n["content"] and "Происшествие" in n["content"] for n in stored), f"{label}: нет текста статьи"
+    assert all(n["image"].startswith("/static/images/") for n in stored), f"{label}: картинки не скачаны"
+    assert server.max_concurrency <= pool._hosts.per_host, f"{label}: превышен лимит на хост"
+
+    rate = items / elapsed
+    print(f"{label:>10}: {elapsed:.2f} s, {rate:.1f} items/s, requests={server.requests}, "
+          f"max concurrency={server.max_concurrency}")
+    return rate
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.1)
+    args = parser.parse_args()
+
+    sequential = run("sequential", FetchPool(max_workers=1, per_host=1), args.items, args.latency)
+    concurrent = run("concurrent", FetchPool(), args.items, args.latency)
+    print(f"speedup: x{concurrent / sequential:.2f}")
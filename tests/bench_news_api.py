@@ -0,0 +1,164 @@
+"""
+Бенчмарк эндпоинта /news.
+
+Создаёт временную БД с синтетическими новостями и замеряет запросы в секунду
+через FastAPI TestClient: сначала со старой схемой "новое соединение на каждый вызов",
+затем с общим соединением потока из database.get_connection (оба прогона без кэша ответов),
+затем с кэшем готовых ответов и с условными запросами If-None-Match (304).
+
+Отдельно замеряется сам get_all_news без HTTP-слоя.
+
+Запуск: python tests/bench_news_api.py [--rows 5000] [--requests 2000] [--limit 200]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(current_dir, '..', 'backend'))
+
+# main.py создаёт static/ и кэш геокодера в текущей папке — работаем во временной
+workdir = tempfile.mkdtemp(prefix="mapsnews_bench_")
+os.chdir(workdir)
+
+import database
+
+database.DB_PATH = os.path.join(workdir, "news.db")
+
+import main
+from classifier import CATEGORIES as NEWS_CATEGORIES
+from fastapi.testclient import TestClient
+from response_cache import ResponseCache
+
+CATEGORIES = list(NEWS_CATEGORIES) + ["другое"]
+
+
+def fill_db(rows: int):
+    database.init_db()
+    rnd = random.Random(29)
+    with database.write_scope() as conn:
+        for i in range(rows):
+            lat, lon = (64.5 + rnd.random() / 10, 40.5 + rnd.random() / 10) if i % 3 else (None, None)
+            conn.execute(
+                "INSERT INTO news (url, title, preview, date, category, lat, lon) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (f"https://example.org/news/{i}", f"Новость {i}", "Текст превью " * 10,
+                 f"2025-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}", rnd.choice(CATEGORIES), lat, lon)
+            )
+
+
+def legacy_get_all_news(limit: int = 200, category: str = None):
+    """Копия get_all_news до перехода на переиспользуемые соединения (колонки — по текущей схеме)."""
+    conn = sqlite3.connect(database.DB_PATH)
+    cursor = conn.cursor()
+    query = "SELECT id, title, url, preview, date, source, image, category, lat, lon FROM news"
+    params = []
+    if category and category.lower() != "все":
+        query += " WHERE category = ?"
+        params.append(category.lower())
+    query += " ORDER BY date DESC, id DESC LIMIT ?"
+    params.append(limit)
+    cursor.execute(query, params)
+    rows = cursor.fetchall()
+    conn.close()
+    return [
+        {
+            "id": r[0], "title": r[1], "url": r[2], "preview": r[3],
+            "date": r[4], "source": r[5], "image": r[6], "category": r[7],
+            "coords": [r[8], r[9]] if r[8] is not None else None
+        }
+        for r in rows
+    ]
+
+
+def run_direct(func, calls: int, limit: int) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        func(limit, None)
+    return calls / (time.perf_counter() - start)
+
+
+def run(client: TestClient, requests_count: int, limit: int, conditional: bool = False) -> float:
+    rnd = random.Random(1)
+    etags = {}
+    start = time.perf_counter()
+    for _ in range(requests_count):
+        category = rnd.choice(CATEGORIES + [None, None])
+        params = {"limit": limit}
+        if category:
+            params["category"] = category
+        headers = {"If-None-Match": etags[category]} if conditional and category in etags else {}
+        resp = client.get("/news", params=params, headers=headers)
+        assert resp.status_code == (304 if headers else 200)
+        etags[category] = resp.headers["ETag"]
+    return requests_count / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--limit", type=int, default=200)
+    args = parser.parse_args()
+
+    fill_db(args.rows)
+    client = TestClient(main.app)
+    cache = main.news_cache
+    main.news_cache = ResponseCache(size=0)
+
+    pooled_get_news_page = database.get_news_page
+    database.get_news_page = lambda limit, category=None, cursor=None: (legacy_get_all_news(limit, category), None)
+    before = run(client, args.requests, args.limit)
+    database.get_news_page = pooled_get_news_page
+    after = run(client, args.requests, args.limit)
+
+    print(f"rows={args.rows} requests={args.requests} limit={args.limit}")
+    print(f"before (connect per call): {before:.0f} req/s")
+    print(f"after  (thread connection): {after:.0f} req/s")
+    print(f"speedup: x{after / before:.2f}")
+
+    main.news_cache = cache
+    cached = run(client, args.requests, args.limit)
+    revalidated = run(client, args.requests, args.limit, conditional=True)
+    print(f"response cache: {cached:.0f} req/s (x{cached / after:.2f}), "
+          f"If-None-Match -> 304: {revalidated:.0f} req/s, {cache.stats()}")
+
+    # Сам обработчик без HTTP-слоя TestClient: промах (построение ответа) против попадания в кэш
+    handler = lambda: main.news(category=None, limit=args.limit, cursor=None, if_none_match=None)
+    start = time.perf_counter()
+    for _ in range(args.requests):
+        main.news_cache.clear()
+        handler()
+    miss_us = (time.perf_counter() - start) / args.requests * 1e6
+    start = time.perf_counter()
+    for _ in range(args.requests):
+        handler()
+    hit_us = (time.perf_counter() - start) / args.requests * 1e6
+    print(f"/news handler: miss {miss_us:.0f} us, hit {hit_us:.1f} us")
+
+    # Любая запись в БД сбрасывает кэш: тот же запрос снова строится из SQLite
+    etag = client.get("/news", params={"limit": args.limit}).headers["ETag"]
+    database.save_news({"url": "https://example.org/news/new", "title": "Свежая новость",
+                        "preview": "", "date": "2099-01-01", "image": None, "category": "другое"})
+    fresh = client.get("/news", params={"limit": args.limit}, headers={"If-None-Match": etag})
+    assert fresh.status_code == 200 and fresh.json()[0]["title"] == "Свежая новость", "кэш не сброшен записью"
+
+    # Запись из другого соединения (как из run_geocoder.py) видна через PRAGMA data_version
+    etag = fresh.headers["ETag"]
+    other = sqlite3.connect(database.DB_PATH)
+    other.execute("UPDATE news SET title = 'Правка из другого процесса' WHERE url = 'https://example.org/news/new'")
+    other.commit()
+    other.close()
+    fresh = client.get("/news", params={"limit": args.limit}, headers={"If-None-Match": etag})
+    assert fresh.status_code == 200 and fresh.json()[0]["title"] == "Правка из другого процесса", \
+        "кэш не увидел запись другого соединения"
+    print("invalidation: local write and external write both refresh /news")
+
+    # Без HTTP-слоя: видно чистую стоимость открытия соединения на каждый вызов
+    direct_before = run_direct(legacy_get_all_news, args.requests, args.limit)
+    direct_after = run_direct(database.get_all_news, args.requests, args.limit)
+    print(f"get_all_news() before: {direct_before:.0f} calls/s, after: {direct_after:.0f} calls/s "
+          f"(x{direct_after / direct_before:.2f})")
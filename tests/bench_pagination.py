@@ -0,0 +1,99 @@
+"""
+Бенчмарк постраничной выдачи /news: keyset-курсор против LIMIT/OFFSET.
+
+Заполняет временную БД синтетическими новостями и замеряет время получения
+страницы на разной глубине ленты — с фильтром по категории и без. При курсоре
+время не должно зависеть от номера страницы; OFFSET приведён для сравнения.
+Заодно проверяет, что обход по курсорам отдаёт всю ленту без пропусков и повторов.
+
+Запуск: python tests/bench_pagination.py [--rows 200000] [--limit 50]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(current_dir, '..', 'backend'))
+
+workdir = tempfile.mkdtemp(prefix="mapsnews_pages_")
+os.chdir(workdir)
+
+import database
+from classifier import CATEGORIES as NEWS_CATEGORIES
+
+database.DB_PATH = os.path.join(workdir, "news.db")
+
+CATEGORIES = list(NEWS_CATEGORIES) + ["другое"]
+REPEATS = 50
+
+
+def fill_db(rows: int):
+    database.init_db()
+    rnd = random.Random(29)
+    with database.write_scope() as conn:
+        conn.executemany(
+            "INSERT INTO news (url, title, preview, date, category) VALUES (?, ?, ?, ?, ?)",
+            ((f"https://example.org/news/{i}", f"Новость {i}", "Текст превью " * 10,
+              # Много совпадающих дат: порядок внутри дня задаёт id
+              f"2025-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}", rnd.choice(CATEGORIES))
+             for i in range(rows))
+        )
+
+
+def offset_page(limit: int, category: str, offset: int):
+    query = "SELECT id, title, url, preview, date, source, image, category, lat, lon FROM news"
+    params = []
+    if category:
+        query += " WHERE category = ?"
+        params.append(category)
+    query += " ORDER BY date DESC, id DESC LIMIT ? OFFSET ?"
+    params += [limit, offset]
+    with database.read_scope() as conn:
+        return conn.execute(query, params).fetchall()
+
+
+def cursors_by_page(limit: int, category: str, pages: set) -> dict:
+    """Проходит ленту по курсорам, запоминая курсоры нужных страниц; проверяет полноту обхода"""
+    seen, found, cursor, page = [], {}, None, 0
+    while True:
+        if page in pages:
+            found[page] = cursor
+        items, cursor = database.get_news_page(limit, category, cursor)
+        seen.extend(n["id"] for n in items)
+        page += 1
+        if not cursor:
+            break
+    assert len(seen) == len(set(seen)), "повторы при обходе по курсорам"
+    expected = database.get_news_count() if not category else None
+    assert expected is None or len(seen) == expected, f"обход по курсорам: {len(seen)} из {expected}"
+    return found
+
+
+def timed_ms(fn) -> float:
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        fn()
+    return (time.perf_counter() - start) * 1000 / REPEATS
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--limit", type=int, default=50)
+    args = parser.parse_args()
+
+    fill_db(args.rows)
+    print(f"rows={args.rows} limit={args.limit}")
+
+    for category in (None, "дтп"):
+        total = args.rows if not category else len(database.get_all_news(1000000, category))
+        last_page = (total - 1) // args.limit
+        pages = sorted({0, 10, last_page // 2, last_page})
+        cursors = cursors_by_page(args.limit, category, set(pages))
+        for page in pages:
+            keyset = timed_ms(lambda: database.get_news_page(args.limit, category, cursors[page]))
+            offset = timed_ms(lambda: offset_page(args.limit, category, page * args.limit))
+            print(f"category={category or 'все':>5} page={page:5d}: cursor {keyset:6.2f} ms, offset {offset:7.2f} ms")
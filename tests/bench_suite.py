@@ -0,0 +1,264 @@
+"""
+Сквозной набор бенчмарков на записанном корпусе — без news29.ru и Яндекса.
+
+Корпус: лента fixtures/news29/rss.xml, страницы статей fixtures/articles/*.html и картинка
+fixtures/news29/image.jpg (их отдаёт RecordedNewsServer), ответы геокодера
+fixtures/geocoder_responses.json (StubGeocoderServer). Обе заглушки — с задержкой --latency.
+
+Замеры:
+- ingest: parse_rss_and_fill (лента, картинки, статьи, запись в БД), новостей в секунду — медиана
+  --runs прогонов, каждый на чистой БД;
+- extraction: content_extractor.extract_content (бывший extract_content_with_bs4) по страницам
+  статей, задержка на страницу в мс;
+- address: extract_address по заголовкам и текстам статей, текстов в секунду;
+- worker: run_geocoder.geocode_batch на импортированных новостях (кэш пуст, справочник улиц
+  включён, Яндекс — заглушка), новостей в секунду;
+- news_api: задержка GET /news через TestClient на БД с --rows новостями, перцентили в мс —
+  без кэша ответов (cold) и с ним (cached).
+
+Результат — JSON (печатается и пишется в --output) с коммитом и версией Python, чтобы сравнивать
+релизы. --compare прежний.json печатает изменения метрик; просадка больше --tolerance — код выхода 1.
+
+Запуск: python tests/bench_suite.py [--runs 3] [--latency 0.02] [--rows 5000] [--requests 500]
+                                    [--output bench.json] [--compare baseline.json] [--tolerance 0.2]
+"""
+import argparse
+import glob
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+repo_dir = os.path.join(current_dir, '..')
+sys.path.append(os.path.join(repo_dir, 'backend'))
+sys.path.append(current_dir)
+
+# main.py создаёт static/ и кэш геокодера в текущей папке — работаем во временной;
+# пути --output и --compare — относительно папки запуска
+start_dir = os.getcwd()
+workdir = tempfile.mkdtemp(prefix="mapsnews_suite_")
+os.chdir(workdir)
+
+import database
+
+database.DB_PATH = os.path.join(workdir, "news.db")
+
+import content_extractor
+import main
+import run_geocoder
+from address_extractor import extract_address
+from classifier import CATEGORIES as NEWS_CATEGORIES
+from fastapi.testclient import TestClient
+from geocoder_backends import YandexBackend
+from json_geocoder import SimpleGeocoder
+from rate_limiter import RateLimiter
+from stub_servers import FIXTURES_DIR, RecordedNewsServer, StubGeocoderServer, load_geocoder_fixtures
+
+CATEGORIES = list(NEWS_CATEGORIES) + ["другое"]
+WORKER_ID = "bench"
+
+# Метрики для --compare: путь в results -> больше лучше (True) или меньше лучше (False)
+TRACKED = {
+    "ingest.items_per_sec": True,
+    "extraction.p50_ms": False,
+    "extraction.p95_ms": False,
+    "address.texts_per_sec": True,
+    "worker.items_per_sec": True,
+    "news_api.cold.p50_ms": False,
+    "news_api.cold.p99_ms": False,
+    "news_api.cached.p50_ms": False,
+    "news_api.cached.p99_ms": False,
+}
+
+
+def percentiles(samples, points=(50, 90, 95, 99)) -> dict:
+    ordered = sorted(samples)
+    result = {f"p{p}_ms": round(ordered[min(len(ordered) - 1, len(ordered) * p // 100)] * 1000, 3) for p in points}
+    result["mean_ms"] = round(sum(ordered) / len(ordered) * 1000, 3)
+    result["max_ms"] = round(ordered[-1] * 1000, 3)
+    return result
+
+
+def count_news() -> int:
+    return database.get_connection().execute("SELECT COUNT(*) FROM news").fetchone()[0]
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=repo_dir, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def bench_ingest(server, runs: int) -> dict:
+    rates = []
+    for run in range(runs):
+        # Отдельная папка на прогон: download_image не качает картинки, которые уже есть на диске
+        run_dir = os.path.join(workdir, f"ingest_{run}")
+        os.makedirs(os.path.join(run_dir, "static", "images"))
+        os.chdir(run_dir)
+        database.DB_PATH = os.path.join(run_dir, "news.db")
+        database.init_db()
+        start = time.perf_counter()
+        main.parse_rss_and_fill()
+        elapsed = time.perf_counter() - start
+        items = count_news()
+        assert items > 0, "лента не импортирована"
+        rates.append(items / elapsed)
+    return {"items": items, "runs": runs, "items_per_sec": round(sorted(rates)[len(rates) // 2], 2),
+            "requests": dict(server.requests)}
+
+
+def bench_extraction(repeats: int) -> dict:
+    pages = []
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, "articles", "*.html"))):
+        with open(path, encoding="utf-8") as f:
+            pages.append(f.read())
+    samples = []
+    for _ in range(repeats):
+        for page in pages:
+            start = time.perf_counter()
+            article = content_extractor.extract_content(page)
+            samples.append(time.perf_counter() - start)
+            assert article.text, "текст статьи не найден"
+    return {"parser": content_extractor.PARSER, "pages": len(pages), "samples": len(samples), **percentiles(samples)}
+
+
+def bench_address(texts, repeats: int) -> dict:
+    found = sum(1 for text in texts if extract_address(text))
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for text in texts:
+            extract_address(text)
+    elapsed = time.perf_counter() - start
+    return {"texts": len(texts), "found": found, "texts_per_sec": round(len(texts) * repeats / elapsed, 1)}
+
+
+def bench_worker(geocoder_url: str, stub) -> dict:
+    cache_path = os.path.join(workdir, "worker_cache.db")
+    rate_limiter = RateLimiter(cache_path, rate=10000, burst=100, max_wait=0.5)
+    geocoder = SimpleGeocoder(cache_path=cache_path, legacy_cache_path=None, rate_limiter=rate_limiter,
+                              backend=YandexBackend(rate_limiter, url=geocoder_url))
+    # Статьи уже скачаны при импорте — как в проде, воркер их не перекачивает
+    with database.write_scope() as conn:
+        conn.execute("UPDATE news SET geocoded_at = NULL, address = NULL, lat = NULL, lon = NULL")
+    start = time.perf_counter()
+    items = 0
+    while True:
+        claimed = database.claim_uncoded_news(WORKER_ID, limit=5)
+        if not claimed:
+            break
+        run_geocoder.geocode_batch(geocoder, claimed, worker_id=WORKER_ID)
+        items += len(claimed)
+    elapsed = time.perf_counter() - start
+    located = database.get_connection().execute("SELECT COUNT(*) FROM news WHERE lat IS NOT NULL").fetchone()[0]
+    return {"items": items, "with_coords": located, "items_per_sec": round(items / elapsed, 2),
+            "requests": sum(stub.queries.values()), "gazetteer": geocoder.local_stats()}
+
+
+def fill_news(rows: int):
+    rnd = random.Random(29)
+    with database.write_scope() as conn:
+        for i in range(rows):
+            lat, lon = (64.5 + rnd.random() / 10, 40.5 + rnd.random() / 10) if i % 3 else (None, None)
+            conn.execute(
+                "INSERT INTO news (url, title, preview, date, category, lat, lon) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (f"https://example.org/news/{i}", f"Новость {i}", "Текст превью " * 10,
+                 f"2025-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}", rnd.choice(CATEGORIES), lat, lon)
+            )
+
+
+def bench_news_api(rows: int, requests_count: int) -> dict:
+    fill_news(rows)
+    client = TestClient(main.app)
+    results = {"rows": count_news(), "requests": requests_count}
+    for mode in ("cold", "cached"):
+        rnd = random.Random(1)
+        samples = []
+        for _ in range(requests_count):
+            category = rnd.choice(CATEGORIES + [None, None])
+            params = {"limit": 200, **({"category": category} if category else {})}
+            if mode == "cold":
+                main.news_cache.clear()
+            start = time.perf_counter()
+            resp = client.get("/news", params=params)
+            samples.append(time.perf_counter() - start)
+            assert resp.status_code == 200
+        results[mode] = percentiles(samples)
+    return results
+
+
+def metric(results: dict, path: str):
+    value = results
+    for key in path.split("."):
+        value = value.get(key) if isinstance(value, dict) else None
+    return value
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Печатает изменения отслеживаемых метрик; возвращает просевшие больше чем на tolerance"""
+    regressions = []
+    for path, higher_is_better in TRACKED.items():
+        old, new = metric(baseline["results"], path), metric(results, path)
+        if not old or new is None:
+            continue
+        change = (new - old) / old
+        worse = -change if higher_is_better else change
+        flag = "REGRESSION" if worse > tolerance else ""
+        print(f"{path:>26}: {old} -> {new} ({change:+.0%}) {flag}")
+        if flag:
+            regressions.append(path)
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--output")
+    parser.add_argument("--compare")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    results = {}
+    with RecordedNewsServer(latency=args.latency) as news_server, \
+            StubGeocoderServer(latency=args.latency, fixtures=load_geocoder_fixtures()) as geocoder_server:
+        main.RSS_URLS = [news_server.url("/rss")]
+        results["ingest"] = bench_ingest(news_server, args.runs)
+        results["extraction"] = bench_extraction(args.repeats)
+
+        stored = [database.get_news_by_id(n["id"]) for n in database.get_all_news(limit=1000)]
+        texts = [f"{n['title']} {content_extractor.content_text(n['content'])}" for n in stored]
+        results["address"] = bench_address(texts, args.repeats)
+        results["worker"] = bench_worker(geocoder_server.url("/1.x/"), geocoder_server)
+    results["news_api"] = bench_news_api(args.rows, args.requests)
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": vars(args),
+        "results": results,
+    }
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    print(output)
+    if args.output:
+        with open(os.path.join(start_dir, args.output), "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+
+    if args.compare:
+        with open(os.path.join(start_dir, args.compare), encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            sys.exit(1)
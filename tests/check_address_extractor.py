@@ -0,0 +1,217 @@
+"""
+Проверка эквивалентности и бенчмарк движка извлечения адресов.
+
+Сравнивает address_extractor.extract_address с замороженной копией старой
+реализации SimpleGeocoder.extract_address_from_text на корпусе fixtures/address_corpus.json
+(и на склейках текстов из него), затем замеряет скорость обеих реализаций.
+
+Запуск: python tests/check_address_extractor.py
+"""
+import json
+import os
+import random
+import re
+import sys
+import time
+from typing import Optional
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(current_dir, '..', 'backend'))
+
+from address_extractor import extract_address, rank_candidates
+
+
+# Копия реализации до перехода на предкомпилированные шаблоны (эталон для сравнения)
+def legacy_extract_address(text: str) -> Optional[str]:
+    """
+    Ищет адрес в тексте. Собирает все упоминания улиц и возвращает приоритетно тот адрес,
+    в котором указан номер дома. Если с номером дома нет, берет первый найденный.
+    """
+    # Маркеры с обязательным пробелом после сокращений (чтобы "пр" не захватывалось в "проблема")
+    # \s? после сокращений означает опциональный пробел (для конца текста/предложения)
+    # Расширенные окончания для разных падежей (у, е, ом, у и т.д.)
+    markers = r"(?i:улиц[а-я]{1,4}\s?|ул\.\s?|проспект[а-я]{0,3}\s?|пр-?т?\.\s?|набережн[а-я]{2,4}\s?|наб\.\s?|переул[а-я]{2,3}\s?|пер\.\s?|площад[ьи]\s?|пл\.\s?|шоссе\s?|ш\.\s?|алле[яие]\s?|проезд[а-я]{0,3}\s?|дворец\s+спорта\s?|дворц[а-я]{1,2}\s+спорта\s?|стадион[а-я]{0,3}\s?|парк[а-я]{0,2}\s?|сквер[а-я]{0,2}\s?|театр[а-я]{0,2}\s?|музе[йяю]\s?|тц\s?|трц\s?)"
+    # Название улицы: 1-3 слова (первое с большой буквы, остальные могут быть с маленькой - для "Обуховской обороны")
+    name = r"((?:[А-ЯЁ][а-яё]+(?:-[а-яё]+)?|[0-9]{1,3}-?[а-яё]{0,2})(?:\s+[а-яА-Яё]+(?:-[а-яё]+)?){0,2})"
+
+    # Захват "дома №33 по " или "д. 5 на " или "у дома №441"
+    prefix_house = r"(?:(?i:д\.|дом[а-я]{0,2}|д|у\s+дома)\s*(?:№)?\s*(\d+[а-яА-ЯёЁ]?(?:[/\-]\d+)?)\s+(?:по\s+|на\s+)?)?"
+
+    # Захват номера дома после: "ул. Ленина, д. 5", "ул. Ленина №33", "ул. Вологодская, 1/2"
+    # Также захватываем просто цифру после названия улицы (например "Ленинградский проспект 441")
+    # И конструкцию "у дома №441" в конце
+    # \s* в начале потому что маркер уже включает пробел после себя
+    suffix_house = r"(?:\s*(?:[,]\s*(?:(?i:д\.|дом[а-я]{0,2}|д\.?|№))?\s*|(?i:д\.|дом[а-я]{0,2}|д\.?|№|у\s+дома)\s*)(\d+[а-яА-ЯёЁ]?(?:[/\-]\d+)?))?"
+
+    pattern1 = r"\b" + prefix_house + r"(?:" + markers + r")\s+" + name + suffix_house
+    pattern2 = r"\b" + prefix_house + name + r"\s+(?:" + markers + r")\b" + suffix_house
+    # Паттерн 3: для случаев типа "Ленинградский проспект 441" (название + маркер + номер)
+    # Требует номер дома после маркера, чтобы избежать ложных срабатываний типа "Автобус пр..."
+    pattern3 = r"\b" + name + r"\s+(?:" + markers + r")(\d+[а-яА-ЯёЁ]?(?:[/\-]\d+)?)"
+    # Паттерн 3c: для случаев типа "на улице Ленина 5" (предлог + маркер + название + номер)
+    pattern3c = r"(?i:на|у)\s+(?:" + markers + r")" + name + r"\s+(\d+[а-яА-ЯёЁ]?(?:[/\-]\d+)?)"
+    # Паттерн 3b: для случаев типа "улица Ленина", "проспект Обуховской обороны" (маркер + название БЕЗ номера)
+    # Здесь название должно быть минимум 2 слова или второе слово с большой буквы
+    pattern3b = r"\b(?:" + markers + r")([А-ЯЁ][а-яё]+(?:\s+[А-ЯЁ][а-яё]+)?)(?:\s|$)"
+    # Паттерн 3d: для случаев типа "ул. Ленина 5", "проспект Обуховской обороны 12" (маркер + название + номер)
+    pattern3d = r"\b(?:" + markers + r")([А-ЯЁ][а-яё]+(?:\s+[а-яА-Яё]+)?)\s+(\d+[а-яА-ЯёЁ]?(?:[/\-]\d+)?)"
+    # Паттерн 4: для случаев типа "у дома 441 на Ленинградском проспекте"
+    pattern4 = r"(?i:у\s+дома)\s*(?:№)?\s*(\d+[а-яА-ЯёЁ]?(?:[/\-]\d+)?)\s+(?:на\s+)?" + r"(?:" + markers + r")\s+" + name
+    # Паттерн 5: для случаев типа "На Ленинградском проспекте у дома 441" (маркер + название + у дома)
+    pattern5 = r"(?:" + markers + r")\s+" + name + r"\s+(?i:у\s+дома)\s*(?:№)?\s*(\d+[а-яА-ЯёЁ]?(?:[/\-]\d+)?)?"
+    # Паттерн 6: для случаев типа "на/На Ленинградском проспекте у дома 441" (предлог + название + маркер + у дома)
+    # \b в начале чтобы не захватывать "Авария на..."
+    pattern6 = r"\b(?i:на\s+)" + name + r"\s+(?:" + markers + r")\s+(?i:у\s+дома)\s*(?:№)?\s*(\d+[а-яА-ЯёЁ]?(?:[/\-]\d+)?)?"
+
+    all_matches = []
+
+    # Поиск по шаблону 1: ул. Ленина
+    for match in re.finditer(pattern1, text):
+        found_str = match.group(0).strip()
+        if "архангельск" in match.group(2).lower(): continue
+        house_num = match.group(1) or match.group(3)
+        all_matches.append((found_str, house_num))
+
+    # Поиск по шаблону 2: Троицкий проспект
+    for match in re.finditer(pattern2, text):
+        found_str = match.group(0).strip()
+        if "архангельск" in match.group(2).lower(): continue
+        house_num = match.group(1) or match.group(3)
+        all_matches.append((found_str, house_num))
+
+    # Поиск по шаблону 3: Ленинградский проспект 441 (название + маркер + номер)
+    for match in re.finditer(pattern3, text):
+        found_str = match.group(0).strip()
+        if "архангельск" in match.group(1).lower(): continue
+        house_num = match.group(2)
+        all_matches.append((found_str, house_num))
+
+    # Поиск по шаблону 3c: на улице Ленина 5 (предлог + маркер + название + номер)
+    for match in re.finditer(pattern3c, text):
+        found_str = match.group(0).strip()
+        if "архангельск" in match.group(1).lower(): continue  # Группа 1 - название улицы
+        house_num = match.group(2)  # Группа 2 - номер дома
+        all_matches.append((found_str, house_num))
+
+    # Поиск по шаблону 3b: улица Ленина, проспект Обуховской обороны (маркер + название БЕЗ номера)
+    for match in re.finditer(pattern3b, text):
+        found_str = match.group(0).strip()
+        if "архангельск" in match.group(1).lower(): continue
+        # Нет номера дома, добавляем без приоритета
+        all_matches.append((found_str, None))
+
+    # Поиск по шаблону 3d: ул. Ленина 5, проспект Обуховской обороны 12 (маркер + название + номер)
+    for match in re.finditer(pattern3d, text):
+        found_str = match.group(0).strip()
+        if "архангельск" in match.group(1).lower(): continue
+        house_num = match.group(2)
+        all_matches.append((found_str, house_num))
+
+    # Поиск по шаблону 4: у дома 441 на Ленинградском проспекте
+    for match in re.finditer(pattern4, text):
+        found_str = match.group(0).strip()
+        if "архангельск" in match.group(3).lower(): continue
+        house_num = match.group(1)
+        all_matches.append((found_str, house_num))
+
+    # Поиск по шаблону 5: На Ленинградском проспекте у дома 441
+    for match in re.finditer(pattern5, text):
+        found_str = match.group(0).strip()
+        if "архангельск" in match.group(2).lower(): continue
+        house_num = match.group(3)
+        all_matches.append((found_str, house_num))
+
+    # Поиск по шаблону 6: на/На Ленинградском проспекте у дома 441
+    for match in re.finditer(pattern6, text):
+        found_str = match.group(0).strip()
+        if "архангельск" in match.group(1).lower(): continue
+        house_num = match.group(2)
+        all_matches.append((found_str, house_num))
+
+    if not all_matches:
+        return None
+
+    # 1. Приоритет: ищем адрес, у которого захвачен логичный номер дома
+    for found_str, house_num in all_matches:
+        if house_num:
+            # Фильтруем ложные срабатывания типа "ул. Ленина 2024" (год)
+            if not re.match(r'^(19|20)\d{2}$', house_num):
+                return found_str
+
+    # 2. Если номеров домов нет, ищем адрес с маркером + название (паттерн 3b)
+    for found_str, house_num in all_matches:
+        # Проверяем, что это не ложное срабатывание (маркер + короткое слово)
+        if not house_num and found_str:
+            # Проверяем, содержит ли адрес маркер улицы (с пробелом после!)
+            markers_pattern = r"(?i:улиц[а-я]{1,3}\s|ул\.\s|проспект[а-я]{0,2}\s|пр-?т?\.\s|набережн[а-я]{2,3}\s|наб\.\s|переул[а-я]{2}\s|пер\.\s|площад[ьи]\s|пл\.\s|шоссе\s|ш\.\s)"
+            if re.search(markers_pattern, found_str):
+                # Проверяем, что название не слишком короткое (минимум 4 символа)
+                words = found_str.split()
+                for word in words:
+                    if len(word) > 3 and word[0].isupper():
+                        return found_str
+
+    # 3. Если ничего не найдено, берем первый попавшийся адрес
+    first_match = all_matches[0][0]
+    # Если случайно захватился год в конце первого адреса, отрежем его для надежности
+    year_match = re.search(r'\s+(19|20)\d{2}$', first_match)
+    if year_match:
+        first_match = first_match[:year_match.start()]
+
+    return first_match
+
+
+def load_corpus():
+    with open(os.path.join(current_dir, 'fixtures', 'address_corpus.json'), encoding='utf-8') as f:
+        texts = json.load(f)
+    # Склеиваем случайные тексты в "статьи", чтобы проверить приоритеты между несколькими адресами
+    rnd = random.Random(29)
+    articles = [" ".join(rnd.sample(texts, rnd.randint(2, 6))) for _ in range(300)]
+    return texts + articles
+
+
+def check_equivalence(corpus):
+    mismatches = 0
+    legacy_errors = 0
+    for text in corpus:
+        try:
+            expected = legacy_extract_address(text)
+        except IndexError:
+            # Старая реализация падала на шаблонах 4 и 5 (неверные номера групп)
+            legacy_errors += 1
+            continue
+        actual = extract_address(text)
+        ranked = rank_candidates(text)
+        first_ranked = ranked[0].text if ranked else None
+        if actual != expected or first_ranked != expected:
+            mismatches += 1
+            print(f"MISMATCH: {text!r}\n  legacy={expected!r}\n  new={actual!r}\n  ranked={first_ranked!r}")
+    print(f"Texts: {len(corpus)}, mismatches: {mismatches}, legacy IndexError: {legacy_errors}")
+    return mismatches == 0
+
+
+def bench(func, corpus, rounds=5):
+    best = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for text in corpus:
+            try:
+                func(text)
+            except IndexError:
+                pass
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+if __name__ == "__main__":
+    corpus = load_corpus()
+    ok = check_equivalence(corpus)
+
+    legacy_time = bench(legacy_extract_address, corpus)
+    new_time = bench(extract_address, corpus)
+    print(f"legacy: {legacy_time * 1000:.1f} ms ({len(corpus) / legacy_time:.0f} texts/s)")
+    print(f"new:    {new_time * 1000:.1f} ms ({len(corpus) / new_time:.0f} texts/s)")
+    print(f"speedup: x{legacy_time / new_time:.2f}")
+
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,139 @@
+"""
+Проверка нормализации адресов (backend/address_normalizer.py) — полностью без сети.
+
+- разные падежи, сокращения типа, "д."/"№"/"у дома" дают один канонический адрес
+  (город, тип улицы полным словом, название в именительном падеже, номер дома);
+- названия-фамилии и "прилагательное + существительное" ("Северной Двины") не склоняются;
+- адреса без улицы (ТЦ, парки, театры) не нормализуются — для них прежний ключ кэша;
+- улица из справочника берётся с его написанием, но город, названный в адресе, не подменяется;
+- прежние записи кэша переносятся под канонический ключ без запроса к Яндексу;
+- повтор корпуса fixtures/address_corpus.json и других написаний тех же адресов через
+  SimpleGeocoder без справочника улиц: доля попаданий в кэш и число запросов к Яндексу
+  с нормализацией и без неё.
+
+Ответы Яндекса подменяются в geocoder_backends._session.
+
+Запуск: python tests/check_address_normalizer.py
+"""
+import json
+import os
+import sys
+import tempfile
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(current_dir, '..', 'backend'))
+
+import geocoder_backends
+import json_geocoder
+from address_extractor import extract_address
+from address_normalizer import normalize_address
+from gazetteer import Gazetteer
+from geo_cache import GeoCacheStore
+from rate_limiter import RateLimiter
+
+workdir = tempfile.mkdtemp(prefix="mapsnews_normalizer_")
+
+# Канонический адрес -> написания из новостей
+SPELLINGS = {
+    "Архангельск, проспект Ленинградский, 441": [
+        "на Ленинградском проспекте 441", "Ленинградский проспект, д. 441", "пр. Ленинградский 441",
+        "У дома 441 на Ленинградском проспекте", "Ленинградского проспекта, 441", "по Ленинградскому проспекту, 441",
+    ],
+    "Архангельск, улица Садовая, 12а": ["Садовой улице, 12а", "ул. Садовая, д. 12А", "улицу Садовую, 12а"],
+    "Архангельск, улица Тимме, 33": ["дома №33 по улице Тимме обнаружили", "ул. Тимме, 33", "улицы Тимме 33"],
+    "Архангельск, проспект Московский, 10": ["На Московском проспекте, д. 10", "Московским проспектом 10",
+                                            "пр-т Московский, 10"],
+    "Архангельск, шоссе Окружное": ["Шоссе Окружное закроют на", "Окружного шоссе", "Окружному шоссе"],
+    "Архангельск, набережная Северной Двины, 30": ["Набережная Северной Двины, 30", "набережной Северной Двины 30",
+                                                 "наб. Северной Двины, д. 30"],
+    "Архангельск, проспект Чумбарова-Лучинского, 5": ["на пр. Чумбарова-Лучинского 5",
+                                                      "проспекте Чумбарова-Лучинского, 5"],
+    "Архангельск, улица Урицкого": ["улице Урицкого", "улицы Урицкого", "Ул. Урицкого"],
+    "Архангельск, улица Верхняя, 2": ["Верхней улице, 2", "ул. Верхняя, 2"],
+    "Архангельск, проспект Советских космонавтов, 181": ["на проспекте Советских космонавтов 181",
+                                                         "у дома 181 на проспекте Советских космонавтов"],
+    "Архангельск, улица 23-й Гвардейской дивизии, 8": ["ул. 23-й Гвардейской дивизии, д. 8",
+                                                      "улице 23-й Гвардейской дивизии, 8"],
+    "Северодвинск, улица Ломоносова, 5": ["в Северодвинске на улице Ломоносова, 5"],
+}
+NOT_STREETS = ["ТЦ Титан Арена открылся", "сквере Победы откроют новую", "театре Драмы пройдёт 15",
+               "шоссе 12 ограничат скорость", "Уборка снега на улицах", "Сквер у театра"]
+
+
+class CountingSession:
+    """Отвечает на любой запрос одной точкой в центре Архангельска и считает запросы"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def get(self, url, timeout=None):
+        self.calls += 1
+        return self
+
+    status_code = 200
+    headers = {}
+
+    def json(self):
+        return {"response": {"GeoObjectCollection": {"featureMember": [{"GeoObject": {"Point": {"pos": "40.5152 64.5399"}}}]}}}
+
+
+def check_spellings():
+    for expected, spellings in SPELLINGS.items():
+        for address in spellings:
+            normalized = normalize_address(address)
+            assert normalized is not None and normalized.query == expected, (address, normalized)
+    for address in NOT_STREETS:
+        assert normalize_address(address) is None, address
+
+    # Улица из справочника — с его написанием и городом
+    gazetteer = Gazetteer.load()
+    assert normalize_address("проспекте Морском, 35", gazetteer).query == "Северодвинск, проспект Морской, 35"
+    assert normalize_address("Обводном канале, 12а", gazetteer).query == "Архангельск, проспект Обводный канал, 12а"
+    # Названный в адресе город справочник не подменяет, объект с названием улицы улицей не становится
+    assert normalize_address("в Северодвинске на улице Тимме 5", gazetteer).query == "Северодвинск, улица Тимме, 5"
+    assert normalize_address("ТЦ Троицкий", gazetteer) is None
+    print(f"spellings: {sum(map(len, SPELLINGS.values()))} -> {len(SPELLINGS)} canonical addresses")
+
+
+def check_legacy_keys():
+    """Кэш, заполненный до нормализации: координаты берутся из него, а не из сети"""
+    cache_path = os.path.join(workdir, "legacy.db")
+    GeoCacheStore(cache_path, legacy_json_path=None).set("Архангельск, Ленинградском проспекте 441", [64.51, 40.66])
+    session = geocoder_backends._session = CountingSession()
+    geocoder = json_geocoder.SimpleGeocoder(cache_path=cache_path, legacy_cache_path=None, use_gazetteer=False)
+    assert geocoder.geocode_with_yandex("на Ленинградском проспекте 441") == [64.51, 40.66]
+    assert geocoder.geocode_with_yandex("пр. Ленинградский, д. 441") == [64.51, 40.66]
+    assert session.calls == 0, session.calls
+    print("legacy cache keys: reused without requests")
+
+
+def replay(normalize: bool, addresses):
+    cache_path = os.path.join(workdir, f"replay_{normalize}.db")
+    geocoder = json_geocoder.SimpleGeocoder(
+        cache_path=cache_path, legacy_cache_path=None, use_gazetteer=False, normalize_addresses=normalize,
+        rate_limiter=RateLimiter(cache_path, rate=10000, burst=100),
+    )
+    session = geocoder_backends._session = CountingSession()
+    for address in addresses:
+        geocoder.geocode_with_yandex(address)
+    stats = geocoder.cache_stats()
+    lookups = stats["hits"] + stats["misses"] + stats["negative_hits"]
+    return stats["hits"] / lookups, session.calls, len({geocoder.query_for(a) for a in addresses})
+
+
+if __name__ == "__main__":
+    check_spellings()
+    check_legacy_keys()
+
+    with open(os.path.join(current_dir, "fixtures", "address_corpus.json"), encoding="utf-8") as f:
+        addresses = [a for a in map(extract_address, json.load(f)) if a]
+    addresses += [address for spellings in SPELLINGS.values() for address in spellings]
+
+    results = {}
+    for normalize in (False, True):
+        hit_rate, calls, keys = replay(normalize, addresses)
+        results[normalize] = hit_rate
+        print(f"{'normalized' if normalize else 'raw':>10}: {len(addresses)} addresses, {keys} cache keys, "
+              f"hit rate {hit_rate:.0%}, {calls} requests to Yandex")
+    assert results[True] > results[False] + 0.2, results
+    print("OK")
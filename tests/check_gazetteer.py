@@ -0,0 +1,163 @@
+"""
+Проверка локального справочника улиц (backend/gazetteer.py) — полностью без сети.
+
+- падежные формы, сокращения типов ("пр-т.", "ул.") и мусор вокруг адреса находят улицу;
+- тип улицы и город разрешают одноимённые улицы, неизвестный тип ("сквер Победы") — не угадывается;
+  улица другого города вместо названного не подставляется, объект ("ТЦ Троицкий") улицей не считается,
+  название без типа улицы принимается, только если оно и есть весь адрес;
+- номер дома берётся рядом с названием ("дома №33 по улице Тимме", "у дома 441 на ..."), год — не номер;
+- build_gazetteer.py переносит подтверждённые дома из кэша геокодера в справочник;
+- SimpleGeocoder.geocode идёт в Яндекс только за адресами, которых нет в справочнике, и запоминает
+  дома знакомых улиц: на корпусе fixtures/address_corpus.json и других написаниях тех же адресов
+  считается число исходящих запросов с ним и без него.
+
+Ответы Яндекса подменяются в geocoder_backends._session.
+
+Запуск: python tests/check_gazetteer.py
+"""
+import json
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+backend_dir = os.path.join(current_dir, '..', 'backend')
+sys.path.append(backend_dir)
+
+import geocoder_backends
+import json_geocoder
+from address_extractor import extract_address
+from gazetteer import Gazetteer, GAZETTEER_PATH, TokenTrie
+from rate_limiter import RateLimiter
+
+workdir = tempfile.mkdtemp(prefix="mapsnews_gazetteer_")
+
+
+class CountingSession:
+    """Отвечает на любой запрос одной точкой в центре Архангельска и считает запросы"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def get(self, url, timeout=None):
+        self.calls += 1
+        return self
+
+    status_code = 200
+    headers = {}
+
+    def json(self):
+        return {"response": {"GeoObjectCollection": {"featureMember": [{"GeoObject": {"Point": {"pos": "40.5152 64.5399"}}}]}}}
+
+
+def check_matching(gazetteer: Gazetteer):
+    cases = {
+        "на Ленинградском проспекте у дома 441": ("проспект Ленинградский", "441"),
+        "У дома 441 на Ленинградском проспекте": ("проспект Ленинградский", "441"),
+        "дома №33 по улице Тимме обнаружили подозрительный": ("улица Тимме", "33"),
+        "пр-т. Ломоносова, 93": ("проспект Ломоносова", "93"),
+        "ул. Карла Маркса, 1/2": ("улица Карла Маркса", "1/2"),
+        "Воскресенскую улицу": ("улица Воскресенская", None),
+        "Троицким проспектом": ("проспект Троицкий", None),
+        "обводном канале, 12а": ("проспект Обводный канал", "12а"),
+        "проспекте Чумбарова": ("проспект Чумбарова-Лучинского", None),
+        "в Северодвинске на улице Ломоносова, 5": ("улица Ломоносова", "5"),
+        "улица Попова 2024": ("улица Попова", None),
+    }
+    for address, (street, house) in cases.items():
+        match = gazetteer.match(address)
+        assert match is not None, address
+        assert f"{match.street.type} {match.street.name}" == street and match.house == house, (address, match)
+    assert gazetteer.match("в Северодвинске на улице Ломоносова, 5").street.city == "Северодвинск"
+    # Без типа и города одноимённые улицы разрешает город по умолчанию
+    assert gazetteer.match("Ломоносова 5").street.full_name == "Архангельск, проспект Ломоносова"
+
+    for address in ("сквере Победы", "улице Неизвестной, 3", "Уборка снега на улицах",
+                    "улица Садовая в Северодвинске", "Северодвинск, проспект Троицкий",
+                    "ТЦ Троицкий", "театр Ломоносова", "возле ТЦ «Троицкий», 5", "Открытие Троицкий"):
+        assert gazetteer.match(address) is None, address
+
+    # Центр улицы — только если номер дома не указан; незнакомый дом уходит в Яндекс
+    assert gazetteer.match("Троицкий проспект").resolved
+    assert not gazetteer.match("Троицкий проспект, 64").resolved
+
+    trie = TokenTrie()
+    trie.add(["северной", "двины"], 1)
+    trie.add(["северной"], 2)
+    assert trie.longest_match(["на", "северной", "двины"], 1) == (3, [1])
+    print(f"matching: {len(cases)} addresses, {len(gazetteer.streets)} streets, trie nodes: {len(gazetteer.trie)}")
+
+
+def check_builder() -> str:
+    """Справочник с домами: копия data/streets.json, пополненная из кэша геокодера"""
+    path = os.path.join(workdir, "streets.json")
+    shutil.copy(GAZETTEER_PATH, path)
+    cache_path = os.path.join(workdir, "geo_cache.db")
+    conn = sqlite3.connect(cache_path)
+    conn.execute("CREATE TABLE geo_cache (query TEXT PRIMARY KEY, lat REAL, lon REAL, updated_at REAL, status TEXT, expires_at REAL)")
+    conn.executemany("INSERT INTO geo_cache VALUES (?, ?, ?, 0, ?, NULL)", [
+        ("Архангельск, Ленинградский проспект 441", 64.5102, 40.6651, "ok"),
+        ("Архангельск, улица Воскресенская, д. 95", 64.5301, 40.5605, "ok"),
+        ("Архангельск, улица Гайдара 52", 64.5291, 40.5702, "ok"),
+        ("Архангельск, Троицкий проспект, 64", 55.75, 37.61, "ok"),  # Москва: ошибка геокодера
+        ("Архангельск, улица Тимме 33", None, None, "not_found"),
+    ])
+    conn.commit()
+    conn.close()
+    subprocess.run([sys.executable, os.path.join(backend_dir, "build_gazetteer.py"),
+                    "--cache", cache_path, "--gazetteer", path], check=True, capture_output=True)
+
+    with open(path, encoding="utf-8") as f:
+        houses = {s["name"]: s["houses"] for s in json.load(f)["streets"] if s["houses"]}
+    assert houses == {"Ленинградский": {"441": [64.5102, 40.6651]}, "Воскресенская": {"95": [64.5301, 40.5605]},
+                      "Гайдара": {"52": [64.5291, 40.5702]}}, houses
+    print(f"build_gazetteer: {sum(map(len, houses.values()))} houses from cache, far-away answer rejected")
+    return path
+
+
+def replay(geocoder, addresses):
+    session = geocoder_backends._session = CountingSession()
+    start = time.perf_counter()
+    for address in addresses:
+        geocoder.geocode(address)
+    return session.calls, (time.perf_counter() - start) * 1000 / len(addresses)
+
+
+def check_geocoder(path: str):
+    with open(os.path.join(current_dir, "fixtures", "address_corpus.json"), encoding="utf-8") as f:
+        addresses = [a for a in map(extract_address, json.load(f)) if a]
+    # Те же дома в других падежах и написаниях: без справочника каждое — отдельный запрос
+    addresses += ["Ленинградский проспект, д. 441", "улица Воскресенская 95", "ул. Гайдара, дом 52",
+                  "улицы Тимме, 33", "Тимме ул. 33", "у дома 181 на проспекте Советских космонавтов",
+                  "пр. Ломоносова 270", "Ломоносова пр-т, 93"]
+
+    results = {}
+    # Нормализация адресов сама сокращает запросы (tests/check_address_normalizer.py); здесь — вклад справочника
+    for name, gazetteer in (("without gazetteer", None), ("with gazetteer", Gazetteer.load(path))):
+        cache_path = os.path.join(workdir, f"cache_{len(results)}.db")
+        geocoder = json_geocoder.SimpleGeocoder(
+            cache_path=cache_path, legacy_cache_path=None, gazetteer=gazetteer, use_gazetteer=False,
+            normalize_addresses=False, rate_limiter=RateLimiter(cache_path, rate=10000, burst=100),
+        )
+        calls, per_item = replay(geocoder, addresses)
+        results[name] = calls
+        print(f"{name}: {len(addresses)} addresses -> {calls} requests to Yandex, {per_item:.3f} ms/address, "
+              f"local: {geocoder.local_stats()}")
+
+    geocoder = json_geocoder.SimpleGeocoder(cache_path=os.path.join(workdir, "cache_x.db"), legacy_cache_path=None,
+                                            gazetteer=Gazetteer.load(path))
+    assert geocoder.geocode("у дома 441 на Ленинградском проспекте") == [64.5102, 40.6651]
+    assert geocoder.geocode("Садовой улице") == [64.5355, 40.561]
+    # Остаток — объекты (ТЦ, театры, парки), улицы вне справочника и первые упоминания домов
+    assert results["with gazetteer"] < results["without gazetteer"] * 0.7, results
+
+
+if __name__ == "__main__":
+    gazetteer = Gazetteer.load()
+    check_matching(gazetteer)
+    check_geocoder(check_builder())
+    print("OK")
@@ -0,0 +1,146 @@
+"""
+Проверка объединения одинаковых запросов к геокодеру (SimpleGeocoder) на локальной заглушке
+Геокодера Яндекса (stub_servers.StubGeocoderServer), которая считает запросы по адресам.
+
+- одновременные поиски одного адреса (в разных написаниях) — один HTTP-запрос, ответ получают все;
+- ошибка запроса (429 -> RateLimited) достаётся всем, кто ждал того же адреса;
+- geocode_many убирает повторы пачки до сети: запросов столько, сколько разных канонических адресов,
+  результаты — в порядке входа и совпадают с поштучным geocode;
+- разные адреса параллельно не ждут друг друга.
+
+Для сравнения те же одновременные поиски прогоняются с отключённым объединением.
+
+Запуск: python tests/check_geocode_coalescing.py [--latency 0.2] [--threads 8]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(current_dir, '..', 'backend'))
+sys.path.append(current_dir)
+
+import geocoder_backends
+import json_geocoder
+from address_extractor import extract_address
+from rate_limiter import RateLimiter, RateLimited
+from stub_servers import StubGeocoderServer
+
+workdir = tempfile.mkdtemp(prefix="mapsnews_coalescing_")
+SPELLINGS = ["на Ленинградском проспекте 441", "Ленинградский проспект, д. 441", "пр. Ленинградский 441",
+             "У дома 441 на Ленинградском проспекте", "по Ленинградскому проспекту, 441"]
+
+
+def make_geocoder(name: str) -> json_geocoder.SimpleGeocoder:
+    # Без справочника улиц: все адреса идут через кэш и сеть
+    cache_path = os.path.join(workdir, f"{name}.db")
+    return json_geocoder.SimpleGeocoder(cache_path=cache_path, legacy_cache_path=None, use_gazetteer=False,
+                                        rate_limiter=RateLimiter(cache_path, rate=10000, burst=100, max_wait=0.5))
+
+
+def concurrent_lookups(geocoder, addresses, threads: int):
+    barrier = threading.Barrier(len(addresses))
+
+    def lookup(address):
+        barrier.wait()
+        try:
+            return geocoder.geocode_with_yandex(address)
+        except Exception as e:
+            return e
+
+    with ThreadPoolExecutor(threads) as pool:
+        return list(pool.map(lookup, addresses))
+
+
+def without_coalescing(geocoder):
+    """Поведение до объединения: каждый промах кэша сразу идёт в сеть"""
+    def geocode_query(query_address, address):
+        cached = geocoder._lookup_cache(query_address, address)
+        if cached is not None:
+            return cached.coords
+        return geocoder._store(query_address, geocoder.backend.lookup(query_address))
+    geocoder._geocode_query = geocode_query
+    return geocoder
+
+
+def check_concurrent(stub, threads: int):
+    addresses = [SPELLINGS[i % len(SPELLINGS)] for i in range(threads)]
+
+    stub.queries.clear()
+    results = concurrent_lookups(without_coalescing(make_geocoder("plain")), addresses, threads)
+    plain = sum(stub.queries.values())
+
+    stub.queries.clear()
+    geocoder = make_geocoder("coalesced")
+    start = time.perf_counter()
+    results = concurrent_lookups(geocoder, addresses, threads)
+    elapsed = time.perf_counter() - start
+    assert dict(stub.queries) == {"Архангельск, проспект Ленинградский, 441": 1}, stub.queries
+    assert all(r == results[0] and r is not None for r in results), results
+    stats = geocoder.cache_stats()
+    assert stats["coalesced"] + stats["hits"] == threads - 1, stats
+    print(f"{threads} concurrent lookups of one address: {plain} requests -> 1 "
+          f"({stats['coalesced']} waited for it, {stats['hits']} late cache hits), {elapsed:.2f} s")
+
+    # Разные адреса параллельно: по запросу на каждый, без очереди друг за другом
+    stub.queries.clear()
+    distinct = [f"улица Тимме, {n}" for n in range(threads)]
+    start = time.perf_counter()
+    concurrent_lookups(geocoder, distinct, threads)
+    elapsed = time.perf_counter() - start
+    assert sum(stub.queries.values()) == threads and elapsed < stub.latency * 3, (stub.queries, elapsed)
+    print(f"{threads} different addresses in parallel: {threads} requests, {elapsed:.2f} s")
+
+
+def check_shared_error(stub, threads: int):
+    stub.queries.clear()
+    stub.failures = {"Садовая": 429}
+    results = concurrent_lookups(make_geocoder("errors"), ["улице Садовой, 5"] * threads, threads)
+    stub.failures = {}
+    assert all(isinstance(r, RateLimited) for r in results), results
+    # Первая попытка — 429, повтор не дожидается бэкоффа (max_wait=0.5 с): один запрос на всех
+    assert sum(stub.queries.values()) == 1, stub.queries
+    print(f"429 for {threads} waiting lookups: 1 request, RateLimited for all")
+
+
+def check_batch(stub):
+    with open(os.path.join(current_dir, "fixtures", "address_corpus.json"), encoding="utf-8") as f:
+        addresses = [extract_address(text) for text in json.load(f)]
+    addresses += SPELLINGS + [None, ""]
+
+    stub.queries.clear()
+    geocoder = make_geocoder("batch")
+    results = geocoder.geocode_many(addresses)
+    requests_made = sum(stub.queries.values())
+    keys = {geocoder.query_for(a) for a in addresses if a}
+    assert requests_made == len(keys) and max(stub.queries.values()) == 1, stub.queries
+    assert len(results) == len(addresses) and results[-1] is None and results[-2] is None
+
+    # Поштучно (из кэша) — те же координаты в том же порядке
+    assert results == [geocoder.geocode(a) for a in addresses]
+    stats = geocoder.cache_stats()
+    print(f"geocode_many: {sum(1 for a in addresses if a)} addresses -> {requests_made} requests "
+          f"({stats['deduplicated']} duplicates folded before the network)")
+
+    # Второй раз вся пачка — из кэша
+    stub.queries.clear()
+    assert geocoder.geocode_many(addresses) == results and not stub.queries
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+
+    with StubGeocoderServer(latency=args.latency) as stub:
+        geocoder_backends.GEOCODER_URL = stub.url("/1.x/")
+        check_concurrent(stub, args.threads)
+        check_shared_error(stub, args.threads)
+        check_batch(stub)
+    print("OK")
@@ -0,0 +1,191 @@
+"""
+Проверка ограничителя запросов к геокодеру (backend/rate_limiter.py) и его использования
+в SimpleGeocoder.geocode_with_yandex.
+
+- token bucket: N запросов при rate=R занимают не меньше (N - burst) / R секунд;
+- лимит общий для процессов: два процесса на одном файле вместе не превышают rate;
+- суточная квота: сверх неё RateLimited со временем до полуночи по Москве;
+- 429 с Retry-After и 5xx включают бэкофф, успешный ответ сбрасывает его;
+- stats() и retry_in() не ждут, пока другой поток спит в acquire; счётчики прошлых суток удаляются;
+- попадания в кэш геокодера не тратят токены, исчерпанный лимит не пишется в негативный кэш.
+
+Ответы Яндекса подменяются сценарием в geocoder_backends._session (сеть не нужна).
+
+Запуск: python tests/check_rate_limiter.py
+"""
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(current_dir, '..', 'backend'))
+
+import geocoder_backends
+import json_geocoder
+import rate_limiter
+from rate_limiter import RateLimiter, RateLimited
+
+workdir = tempfile.mkdtemp(prefix="mapsnews_rate_")
+
+
+def path(name: str) -> str:
+    return os.path.join(workdir, name)
+
+
+def take(db_path: str, count: int, rate: float):
+    limiter = RateLimiter(db_path, rate=rate, burst=1)
+    for _ in range(count):
+        limiter.acquire()
+
+
+class FakeResponse:
+    def __init__(self, status_code: int, retry_after: str = None, coords=None):
+        self.status_code = status_code
+        self.headers = {"Retry-After": retry_after} if retry_after else {}
+        self._coords = coords
+
+    def json(self):
+        members = []
+        if self._coords:
+            lat, lon = self._coords
+            members = [{"GeoObject": {"Point": {"pos": f"{lon} {lat}"}}}]
+        return {"response": {"GeoObjectCollection": {"featureMember": members}}}
+
+
+class ScriptedSession:
+    """Отдаёт заранее заданные ответы по очереди и запоминает моменты запросов"""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = []
+
+    def get(self, url, timeout=None):
+        self.calls.append(time.monotonic())
+        return self.responses.pop(0)
+
+
+def check_token_bucket():
+    limiter = RateLimiter(path("bucket.db"), rate=20, burst=5)
+    start = time.monotonic()
+    for _ in range(25):
+        limiter.acquire()
+    elapsed = time.monotonic() - start
+    # Первые 5 — сразу (burst), остальные 20 — по одному в 50 мс
+    assert 0.9 <= elapsed < 1.5, elapsed
+    assert limiter.stats()["requests"] == 25
+    print(f"token bucket: 25 requests at 20 rps, burst 5: {elapsed:.2f} s")
+
+
+def check_shared_between_processes():
+    db_path = path("shared.db")
+    RateLimiter(db_path)
+    start = time.monotonic()
+    workers = [multiprocessing.Process(target=take, args=(db_path, 10, 20)) for _ in range(2)]
+    for p in workers:
+        p.start()
+    for p in workers:
+        p.join()
+    elapsed = time.monotonic() - start
+    # 20 запросов на общий лимит 20 rps (burst 1) — около секунды, а не 0.5 с на процесс
+    assert elapsed >= 0.9, elapsed
+    assert RateLimiter(db_path).used_today() == 20
+    print(f"two processes, 10 requests each, shared 20 rps: {elapsed:.2f} s")
+
+
+def check_quota():
+    limiter = RateLimiter(path("quota.db"), rate=1000, burst=10, daily_quota=3)
+    for _ in range(3):
+        limiter.acquire()
+    try:
+        limiter.acquire()
+        raise AssertionError("квота не сработала")
+    except RateLimited as e:
+        assert 0 < e.retry_after <= 86400
+        print(f"daily quota: 4th request refused, retry in {e.retry_after / 3600:.1f} h")
+
+
+def check_backoff():
+    limiter = RateLimiter(path("backoff.db"), rate=1000, burst=10, max_wait=5)
+    limiter.report(429, "0.3")  # не число секунд и не дата — берётся экспоненциальный бэкофф
+    assert 1.9 <= limiter.retry_in() <= 2.0
+    limiter.report(200)
+    limiter.report(503, "1")
+    start = time.monotonic()
+    limiter.acquire()
+    waited = time.monotonic() - start
+    assert 0.9 <= waited < 1.5, waited
+
+    limiter.report(429, "60")
+    try:
+        limiter.acquire()
+        raise AssertionError("бэкофф дольше max_wait должен давать RateLimited")
+    except RateLimited as e:
+        assert 55 <= e.retry_after <= 60
+    assert rate_limiter.parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    print(f"backoff: Retry-After 1 s honored ({waited:.2f} s), 60 s -> RateLimited")
+
+
+def check_no_blocking():
+    limiter = RateLimiter(path("blocking.db"), rate=1000, burst=10, max_wait=5)
+    limiter.report(503, "1")
+    sleeper = threading.Thread(target=limiter.acquire)
+    sleeper.start()
+    time.sleep(0.1)
+    start = time.monotonic()
+    limiter.stats()
+    limiter.retry_in()
+    elapsed = time.monotonic() - start
+    sleeper.join()
+    assert elapsed < 0.2, elapsed
+    assert limiter.stats()["requests"] == 1
+
+    # Вчерашний счётчик квоты удаляется первым запросом новых суток
+    old_key = f"used:{RateLimiter.quota_day(time.time() - 86400)}"
+    limiter = RateLimiter(path("prune.db"), rate=1000, burst=10)
+    limiter._write({old_key: 5})
+    limiter.acquire()
+    keys = [r[0] for r in limiter._conn.execute("SELECT key FROM rate_limits WHERE key LIKE 'used:%'")]
+    assert keys == [f"used:{RateLimiter.quota_day(time.time())}"], keys
+    print(f"stats() while another thread waits out a backoff: {elapsed * 1000:.1f} ms; old quota days pruned")
+
+
+def check_geocoder():
+    limiter = RateLimiter(path("geo.db"), rate=1000, burst=10, max_wait=5)
+    geocoder = json_geocoder.SimpleGeocoder(cache_path=path("geo.db"), legacy_cache_path=None,
+                                            rate_limiter=limiter)
+
+    session = geocoder_backends._session = ScriptedSession([
+        FakeResponse(429, "1"), FakeResponse(200, coords=(64.54, 40.51)),
+    ])
+    coords = geocoder.geocode_with_yandex("улица Воскресенская, 10")
+    assert coords == [64.54, 40.51]
+    assert session.calls[1] - session.calls[0] >= 0.9, "повтор после 429 раньше Retry-After"
+
+    # Повтор адреса — из кэша: ни запроса, ни токена
+    used = limiter.used_today()
+    for _ in range(100):
+        assert geocoder.geocode_with_yandex("улица Воскресенская, 10") == coords
+    assert limiter.used_today() == used and len(session.calls) == 2
+
+    # Лимит исчерпан: RateLimited, а адрес не попадает в негативный кэш
+    geocoder_backends._session = ScriptedSession([FakeResponse(429, "60")])
+    try:
+        geocoder.geocode_with_yandex("улица Гайдара, 5")
+        raise AssertionError("ожидался RateLimited")
+    except RateLimited:
+        pass
+    assert geocoder.cache.lookup("Архангельск, улица Гайдара, 5") is None
+    print(f"geocoder: retry after 429, 100 cache hits without requests, stats {geocoder.rate_stats()}")
+
+
+if __name__ == "__main__":
+    check_token_bucket()
+    check_shared_between_processes()
+    check_quota()
+    check_backoff()
+    check_no_blocking()
+    check_geocoder()
+    print("OK")
@@ -0,0 +1,116 @@
+"""
+Проверка полнотекстового поиска (/news/search) на временной БД.
+
+- словоформы находят друг друга ("пожар" -> "пожаре", "пожаров");
+- индекс поддерживается функциями записи: save_news_batch, update_news_content_and_coords;
+- фильтры category и geo_only, пагинация через X-Next-Offset;
+- rebuild_search_index восстанавливает индекс с нуля.
+
+В конце печатает время поиска на синтетической ленте.
+
+Запуск: python tests/check_search.py [--rows 20000]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(current_dir, '..', 'backend'))
+sys.path.append(current_dir)
+
+workdir = tempfile.mkdtemp(prefix="mapsnews_search_")
+os.chdir(workdir)
+
+import database
+
+database.DB_PATH = os.path.join(workdir, "news.db")
+
+import main
+from fastapi.testclient import TestClient
+from stub_servers import STREETS, article_html
+
+client = TestClient(main.app)
+
+
+def news_item(i: int, title: str, category: str = "другое") -> dict:
+    return {"url": f"https://example.org/news/{i}", "title": title, "preview": "",
+            "date": f"2025-01-{i % 28 + 1:02d}", "image": None, "category": category}
+
+
+def search(**params) -> list:
+    resp = client.get("/news/search", params=params)
+    assert resp.status_code == 200, resp.text
+    return resp.json()
+
+
+def check_behaviour():
+    ids = database.save_news_batch([
+        news_item(1, "Пожар на Троицком проспекте", "происшествия"),
+        news_item(2, "В Северодвинске прошли учения по тушению пожаров", "происшествия"),
+        news_item(3, "Хоккеисты «Водника» выиграли матч", "спорт"),
+    ])
+    assert len(ids) == 3
+
+    found = {n["id"] for n in search(q="пожары")}
+    assert found == {ids[0], ids[1]}, f"словоформы: {found}"
+    assert [n["id"] for n in search(q="Северодвинск")] == [ids[1]]
+    assert [n["id"] for n in search(q="водн")] == [ids[2]], "префиксный поиск по последнему слову"
+    assert search(q="пожар", category="спорт") == []
+
+    # Текст статьи попадает в индекс при обновлении контента геокодером
+    assert search(q="Гайдара") == []
+    main_text = "<p>Возгорание произошло в доме на улице Гайдара, 5.</p>"
+    database.update_news_content_and_coords(ids[2], main_text, [64.53, 40.55])
+    assert [n["id"] for n in search(q="гайдара")] == [ids[2]]
+    assert [n["id"] for n in search(q="пожар", geo_only=True)] == []
+    database.update_news_content_and_coords(ids[0], None, [64.54, 40.52])
+    assert [n["id"] for n in search(q="пожар", geo_only=True)] == [ids[0]]
+
+    # Заголовок важнее текста: совпадение в title выше совпадения в content
+    database.update_news_content_and_coords(ids[1], "<p>Проспект Ломоносова перекрыт</p>", None)
+    database.save_news(news_item(4, "Ремонт на проспекте Ломоносова"))
+    assert search(q="ломоносова")[0]["title"] == "Ремонт на проспекте Ломоносова"
+
+    page = client.get("/news/search", params={"q": "пожар", "limit": 1})
+    assert len(page.json()) == 1 and page.headers["X-Next-Offset"] == "1"
+    assert "X-Next-Offset" not in client.get("/news/search", params={"q": "пожар", "offset": 1}).headers
+
+    with database.write_scope() as conn:
+        conn.execute("DELETE FROM news_fts")
+    assert search(q="пожар") == []
+    assert database.rebuild_search_index(batch_size=2) == 4
+    assert len(search(q="пожар")) == 2
+    print("behaviour: OK")
+
+
+def bench(rows: int):
+    rnd = random.Random(29)
+    words = ["пожар", "авария", "ремонт", "концерт", "матч", "суд", "отопление", "снегопад"]
+    items = [news_item(100 + i, f"{rnd.choice(words).capitalize()} на {rnd.choice(STREETS)}")
+             for i in range(rows)]
+    start = time.perf_counter()
+    database.save_news_batch(items)
+    index_ms = (time.perf_counter() - start) * 1000
+    for i in range(0, rows, 10):
+        database.update_news_content_and_coords(100 + i + 4, article_html(i), None)
+
+    queries = ["пожары", "улица Гайдара", "аварии на проспекте", "отопления"]
+    start = time.perf_counter()
+    for _ in range(50):
+        for q in queries:
+            database.search_news(q, limit=20)
+    per_query = (time.perf_counter() - start) * 1000 / (50 * len(queries))
+    print(f"rows={rows}: batch insert + index {index_ms:.0f} ms, search {per_query:.2f} ms/query")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=20000)
+    args = parser.parse_args()
+
+    database.init_db()
+    check_behaviour()
+    bench(args.rows)
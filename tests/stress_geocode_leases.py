@@ -0,0 +1,146 @@
+"""
+Стресс-тест аренды новостей геокодерами: несколько процессов делят одну очередь.
+
+Создаёт временную БД с N необработанными новостями и запускает K процессов-воркеров
+с тем же циклом, что у run_geocoder.py (claim_uncoded_news -> геокодирование ->
+update_news_content_and_coords / release_news_lease), но с подставным геокодером:
+он ждёт несколько миллисекунд, иногда падает (повтор с паузой) и пишет в журнал
+процесса каждый успешный вызов. Один воркер "падает" посреди пачки, не вернув
+аренду, — его новости должны достаться другим после истечения аренды.
+
+Проверяется, что каждая новость получила координаты и успешно геокодирована ровно
+один раз, а ошибки повторялись с ростом счётчика попыток. Отдельно: воркер, чья аренда
+истекла и перешла к другому, не может перезаписать результат.
+
+Запуск: python tests/stress_geocode_leases.py [--rows 400] [--workers 4]
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(current_dir, '..', 'backend'))
+
+import database
+
+LEASE_SECONDS = 2.0
+FAILURE_RATE = 0.1
+
+
+def setup(db_path: str):
+    database.DB_PATH = db_path
+    database.GEO_RETRY_BASE = 0.05
+    database.GEO_MAX_ATTEMPTS = 50
+
+
+def worker(db_path: str, log_dir: str, index: int, crash_after: int):
+    """Цикл воркера; crash_after > 0 — выйти без освобождения аренды после стольких пачек"""
+    setup(db_path)
+    owner = f"stress:{index}:{os.getpid()}"
+    rnd = random.Random(index)
+    batches, idle_since = 0, None
+    with open(os.path.join(log_dir, f"{index}.log"), "a") as log:
+        while True:
+            items = database.claim_uncoded_news(owner, limit=5, lease_seconds=LEASE_SECONDS)
+            if not items:
+                # Очередь пуста дольше аренды: всё обработано (или ждёт повтора у других)
+                idle_since = idle_since or time.monotonic()
+                if time.monotonic() - idle_since > LEASE_SECONDS * 2:
+                    return
+                time.sleep(0.05)
+                continue
+            idle_since = None
+            batches += 1
+            if crash_after and batches > crash_after:
+                os._exit(1)
+            for item in items:
+                time.sleep(rnd.uniform(0.001, 0.005))
+                if rnd.random() < FAILURE_RATE:
+                    database.release_news_lease(item["id"], owner, failed=True)
+                    continue
+                log.write(f"{item['id']} {owner} {item['attempts']}\n")
+                log.flush()
+                database.update_news_content_and_coords(item["id"], item["content"], [64.5, 40.5],
+                                                        address="ул. Тестовая, 1", owner=owner)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=400)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="mapsnews_leases_")
+    db_path = os.path.join(workdir, "news.db")
+    setup(db_path)
+    database.init_db()
+    database.save_news_batch([
+        {"url": f"https://example.org/news/{i}", "title": f"Новость {i}", "preview": "",
+         "date": f"2025-01-{i % 28 + 1:02d}", "image": None, "category": "другое", "content": f"<p>Текст {i}</p>"}
+        for i in range(args.rows)
+    ])
+
+    start = time.perf_counter()
+    processes = [
+        multiprocessing.Process(target=worker, args=(db_path, workdir, i, 3 if i == 0 else 0))
+        for i in range(args.workers)
+    ]
+    for p in processes:
+        p.start()
+    for p in processes:
+        p.join(timeout=120)
+    elapsed = time.perf_counter() - start
+
+    calls = Counter()
+    retried = 0
+    for name in os.listdir(workdir):
+        if name.endswith(".log"):
+            with open(os.path.join(workdir, name)) as f:
+                for line in f:
+                    news_id, _, attempts = line.split()
+                    calls[int(news_id)] += 1
+                    retried += int(attempts) > 1
+
+    with database.read_scope() as conn:
+        uncoded = conn.execute("SELECT COUNT(*) FROM news WHERE lat IS NULL").fetchone()[0]
+        leased = conn.execute("SELECT COUNT(*) FROM news WHERE lease_owner IS NOT NULL").fetchone()[0]
+
+    duplicates = {news_id: n for news_id, n in calls.items() if n > 1}
+    print(f"rows={args.rows} workers={args.workers}: {elapsed:.1f} s, exit codes {[p.exitcode for p in processes]}")
+    print(f"geocoded once: {len(calls)}, duplicates: {len(duplicates)}, succeeded after retry: {retried}, "
+          f"left uncoded: {uncoded}, leases held: {leased}")
+    assert processes[0].exitcode == 1, "воркер 0 должен был упасть"
+    assert not duplicates, f"повторная обработка: {list(duplicates.items())[:10]}"
+    assert len(calls) == args.rows and uncoded == 0 and leased == 0
+
+    # Аренда "slow" истекла, новость взял "fresh": запись "slow" отклоняется, запись "fresh" проходит
+    news_id = database.save_news_batch([{"url": "https://example.org/news/late", "title": "Новость", "preview": "",
+                                         "date": "2025-02-01", "image": None, "category": "другое"}])[0]
+    assert database.claim_uncoded_news("slow", 1, news_ids=[news_id], lease_seconds=-1)
+    assert database.claim_uncoded_news("fresh", 1, news_ids=[news_id])
+    assert not database.update_news_content_and_coords(news_id, None, [64.5, 40.5], address="slow", owner="slow")
+    assert database.update_news_content_and_coords(news_id, None, [64.5, 40.5], address="fresh", owner="fresh")
+    assert database.get_news_by_id(news_id)["address"] == "fresh"
+
+    # "fresh" успел закончить и снял аренду до того, как "slow" прислал результат — запись "slow" всё равно отклоняется
+    news_id = database.save_news_batch([{"url": "https://example.org/news/finished", "title": "Новость", "preview": "",
+                                         "date": "2025-02-01", "image": None, "category": "другое"}])[0]
+    assert database.claim_uncoded_news("slow", 1, news_ids=[news_id], lease_seconds=-1)
+    assert database.claim_uncoded_news("fresh", 1, news_ids=[news_id])
+    assert database.update_news_content_and_coords(news_id, None, [64.5, 40.5], address="fresh", owner="fresh")
+    assert not database.update_news_content_and_coords(news_id, None, [64.6, 40.6], address="slow", owner="slow")
+    assert database.get_news_by_id(news_id)["address"] == "fresh"
+
+    # Админ сбросил новость, пока её держал воркер: результат воркера не записывается поверх сброса
+    assert database.reset_news_geocode(news_id)
+    assert database.claim_uncoded_news("slow", 1, news_ids=[news_id])
+    assert database.reset_news_geocode(news_id)
+    assert not database.update_news_content_and_coords(news_id, None, [64.6, 40.6], address="slow", owner="slow")
+    assert database.get_news_by_id(news_id)["address"] is None
+    print("expired lease: stale write rejected")
+    print("OK")
@@ -0,0 +1,276 @@
+"""
+Локальные заглушки внешних сервисов для бенчмарков и проверок.
+
+StubNewsServer отдаёт RSS-ленту, HTML статей и картинки в формате news29.ru,
+RecordedNewsServer — записанную ленту и страницы статей из tests/fixtures, StubGeocoderServer — ответы HTTP Геокодера Яндекса. Обе с настраиваемой задержкой
+ответа и считают запросы и пиковую параллельность.
+
+Пример:
+    with StubNewsServer(items=50, latency=0.1) as server:
+        main.RSS_URLS = [server.url("/rss")]
+
+Заглушку геокодера можно запустить отдельным процессом для ручной проверки воркера:
+    python tests/stub_servers.py --port 8081 --latency 0.2 --fixtures tests/fixtures/geocoder_responses.json
+    GEOCODER_URL=http://127.0.0.1:8081/1.x/ python backend/run_geocoder.py
+"""
+import argparse
+import glob
+import json
+import os
+import random
+import threading
+import time
+import zlib
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# Минимальный валидный JPEG-заголовок: содержимое картинки для тестов не важно
+JPEG_BYTES = b"\xff\xd8\xff\xe0" + b"\x00" * 256 + b"\xff\xd9"
+
+STREETS = ["улице Воскресенской", "Троицком проспекте", "улице Гайдара", "Ленинградском проспекте",
+           "улице Тимме", "набережной Северной Двины", "улице Логинова", "проспекте Ломоносова"]
+
+
+def article_text(index: int) -> str:
+    street = STREETS[index % len(STREETS)]
+    return (f"Происшествие #{index} произошло на {street}, {index % 90 + 1}. "
+            f"На месте работали сотрудники ГИБДД и скорой помощи, движение было ограничено.")
+
+
+def article_html(index: int) -> str:
+    paragraphs = "".join(
+        f"<p>{article_text(index)} Абзац {n}: подробности уточняются, жителей просят быть внимательнее.</p>"
+        for n in range(6)
+    )
+    return (
+        "<html><head><title>news29.ru</title><script>var x = 1;</script><style>p {}</style></head><body>"
+        "<div class='header'><a href='/'>Главная</a><ul>" + "".join(f"<li>Пункт меню {n}</li>" for n in range(30)) + "</ul></div>"
+        f"<div class='news-text'><h1>Новость {index}</h1>{paragraphs}<br>"
+        "<p>Новости по теме</p><p>Короткий чужой заголовок</p></div>"
+        "<div class='footer'>" + "".join(f"<p>Подвал {n}</p>" for n in range(20)) + "</div>"
+        "</body></html>"
+    )
+
+
+class StubServer:
+    """
+    HTTP-сервер в фоновом потоке: задержка ответа, счётчики запросов по первому сегменту пути
+    и пиковая параллельность. Ответ формирует respond(path) -> (статус, тело, Content-Type[, заголовки]).
+    """
+
+    def __init__(self, latency: float = 0.0, host: str = "127.0.0.1", port: int = 0):
+        self.latency = latency
+        self.requests = {}
+        self.max_concurrency = 0
+        self._active = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def url(self, path: str) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}{path}"
+
+    def respond(self, path: str):
+        return 404, b"not found", "text/plain"
+
+    def _track(self, kind: str, delta: int):
+        with self._lock:
+            if delta > 0:
+                self.requests[kind] = self.requests.get(kind, 0) + 1
+            self._active += delta
+            self.max_concurrency = max(self.max_concurrency, self._active)
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                kind = self.path.strip("/").split("/")[0].split("?")[0] or "root"
+                stub._track(kind, 1)
+                try:
+                    if stub.latency:
+                        time.sleep(stub.latency)
+                    self._send(*stub.respond(self.path))
+                finally:
+                    stub._track(kind, -1)
+
+            def _send(self, status: int, body: bytes, content_type: str, headers: dict = None):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class StubNewsServer(StubServer):
+    def __init__(self, items: int = 50, latency: float = 0.0, host: str = "127.0.0.1"):
+        self.items = items
+        super().__init__(latency, host)
+
+    def rss(self) -> bytes:
+        entries = "".join(
+            f"<item><title>Новость {i}: авария на {STREETS[i % len(STREETS)]}</title>"
+            f"<link>{self.url(f'/news/{i}')}</link>"
+            f"<description>&lt;p&gt;{article_text(i)}&lt;/p&gt;</description>"
+            f"<pubDate>Mon, 06 Jan 2025 {i % 24:02d}:00:00 +0300</pubDate>"
+            f"<enclosure url=\"{self.url(f'/img/{i}.jpg')}\" type=\"image/jpeg\" length=\"{len(JPEG_BYTES)}\"/>"
+            "</item>"
+            for i in range(self.items)
+        )
+        return ('<?xml version="1.0" encoding="utf-8"?><rss version="2.0"><channel>'
+                f"<title>news29.ru</title>{entries}</channel></rss>").encode("utf-8")
+
+    def respond(self, path: str):
+        if path == "/rss":
+            return 200, self.rss(), "application/rss+xml; charset=utf-8"
+        if path.startswith("/news/"):
+            index = int(path.rsplit("/", 1)[-1])
+            return 200, article_html(index).encode("utf-8"), "text/html; charset=utf-8"
+        if path.startswith("/img/"):
+            return 200, JPEG_BYTES, "image/jpeg"
+        return super().respond(path)
+
+
+class RecordedNewsServer(StubServer):
+    """
+    Записанная лента news29.ru (fixtures/news29/rss.xml) со ссылками, переписанными на эту заглушку.
+    Статьи — страницы fixtures/articles по кругу (по номеру новости), картинки — fixtures/news29/image.jpg.
+    """
+
+    SITE = "https://www.news29.ru"
+
+    def __init__(self, latency: float = 0.0, host: str = "127.0.0.1", port: int = 0):
+        super().__init__(latency, host, port)
+        with open(os.path.join(FIXTURES_DIR, "news29", "rss.xml"), encoding="utf-8") as f:
+            self.feed = f.read().replace(self.SITE, self.url("")).encode("utf-8")
+        self.articles = []
+        for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, "articles", "*.html"))):
+            with open(path, "rb") as f:
+                self.articles.append(f.read())
+        with open(os.path.join(FIXTURES_DIR, "news29", "image.jpg"), "rb") as f:
+            self.image = f.read()
+
+    def respond(self, path: str):
+        if path == "/rss":
+            return 200, self.feed, "application/rss+xml; charset=utf-8"
+        if path.startswith("/novosti/"):
+            news_id = int(path.strip("/").rsplit("/", 1)[-1])
+            return 200, self.articles[news_id % len(self.articles)], "text/html; charset=utf-8"
+        if path.startswith("/upload/"):
+            return 200, self.image, "image/jpeg"
+        return super().respond(path)
+
+
+def stub_coords(query: str):
+    """Детерминированная точка в Архангельске для адреса: одинаковый запрос — одинаковый ответ"""
+    h = zlib.crc32(query.encode("utf-8"))
+    return [round(64.50 + (h % 1000) / 10000, 6), round(40.45 + (h // 1000 % 2000) / 10000, 6)]
+
+
+GEOCODER_FIXTURES = os.path.join(FIXTURES_DIR, "geocoder_responses.json")
+
+
+def load_geocoder_fixtures(path: str = GEOCODER_FIXTURES) -> dict:
+    """Записанные ответы: канонический адрес -> [lat, lon] или null (не найден)"""
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+class StubGeocoderServer(StubServer):
+    """
+    Заглушка HTTP Геокодера Яндекса (/1.x/?geocode=...&format=json): отвечает в его формате и
+    считает запросы по адресам (queries). Адрес из fixtures получает записанный ответ (null — не
+    найден), остальные — stub_coords. Адреса, содержащие строку из not_found, не находятся;
+    из failures {строка: статус} — получают этот статус (429 — с Retry-After). failure_rate —
+    доля случайных ответов со статусом failure_status (генератор с seed: прогоны повторяемы).
+
+    Пример:
+        with StubGeocoderServer(latency=0.2) as geocoder:
+            geocoder_backends.GEOCODER_URL = geocoder.url("/1.x/")
+    """
+
+    def __init__(self, latency: float = 0.0, not_found=(), failures: dict = None, fixtures: dict = None,
+                 failure_rate: float = 0.0, failure_status: int = 503, seed: int = 0,
+                 host: str = "127.0.0.1", port: int = 0):
+        self.not_found = tuple(not_found)
+        self.failures = dict(failures or {})
+        self.fixtures = dict(fixtures or {})
+        self.failure_rate = failure_rate
+        self.failure_status = failure_status
+        self.queries = Counter()
+        self._random = random.Random(seed)
+        super().__init__(latency, host, port)
+
+    def _error(self, status: int):
+        return status, b"{}", "application/json", {"Retry-After": "60"} if status == 429 else None
+
+    def respond(self, path: str):
+        if not path.startswith("/1.x/"):
+            return super().respond(path)
+        query = parse_qs(urlsplit(path).query).get("geocode", [""])[0]
+        with self._lock:
+            self.queries[query] += 1
+            injected = self.failure_rate and self._random.random() < self.failure_rate
+        if injected:
+            return self._error(self.failure_status)
+        for marker, status in self.failures.items():
+            if marker in query:
+                return self._error(status)
+        members = []
+        if query in self.fixtures:
+            coords = self.fixtures[query]
+        elif any(marker in query for marker in self.not_found):
+            coords = None
+        else:
+            coords = stub_coords(query)
+        if coords is not None:
+            lat, lon = coords
+            members.append({"GeoObject": {"name": query, "Point": {"pos": f"{lon} {lat}"}}})
+        body = {"response": {"GeoObjectCollection": {"featureMember": members}}}
+        return 200, json.dumps(body, ensure_ascii=False).encode("utf-8"), "application/json; charset=utf-8"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Локальная заглушка Геокодера Яндекса")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--fixtures", default=GEOCODER_FIXTURES)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--failure-status", type=int, default=503)
+    args = parser.parse_args()
+
+    stub = StubGeocoderServer(latency=args.latency, fixtures=load_geocoder_fixtures(args.fixtures),
+                              failure_rate=args.failure_rate, failure_status=args.failure_status,
+                              host=args.host, port=args.port)
+    print(f"GEOCODER_URL={stub.url('/1.x/')}")
+    try:
+        stub._server.serve_forever()
+    except KeyboardInterrupt:
+        stub._server.server_close()